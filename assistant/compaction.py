@@ -0,0 +1,231 @@
+import os
+import json
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio for JSON and CLI text, good enough for budgeting
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 8000
+MAX_TRUNCATION_PASSES = 32
+# Room left in the budget for the summary header added when output is truncated
+SUMMARY_RESERVE_CHARS = 1200
+# Truncations listed in the summary, the rest are only counted
+MAX_SUMMARY_TRUNCATIONS = 8
+
+# Per-tool record lists and the fields the model needs from each record
+TOOL_PROJECTIONS = {
+    "librenms_bgp": ("bgp_sessions", [
+        "device_id", "bgpPeerIdentifier", "bgpPeerRemoteAs", "bgpPeerRemoteAddr", "bgpLocalAddr",
+        "bgpPeerState", "bgpPeerAdminStatus", "bgpPeerDescr", "bgpPeerFsmEstablishedTime", "astext"
+    ]),
+    "librenms_get_device_info": ("devices", [
+        "device_id", "hostname", "sysName", "ip", "hardware", "os", "version", "serial",
+        "status", "status_reason", "uptime", "location", "last_polled"
+    ]),
+    "librenms_arp": ("arp", [
+        "port_id", "device_id", "mac_address", "ipv4_address", "context_name"
+    ]),
+    "librenms_syslog": ("logs", [
+        "device_id", "timestamp", "program", "priority", "level", "msg"
+    ]),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_dumps(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+def project_records(tool_name: str, result: Any) -> Any:
+    projection = TOOL_PROJECTIONS.get(tool_name)
+    if not projection or not isinstance(result, dict):
+        return result
+    key, fields = projection
+    records = result.get(key)
+    if not isinstance(records, list):
+        return result
+    projected = dict(result)
+    projected[key] = [
+        {field: record[field] for field in fields if field in record} if isinstance(record, dict) else record
+        for record in records
+    ]
+    return projected
+
+
+def dedupe_records(value: Any) -> Tuple[Any, int]:
+    """Drop exact duplicate records from every list of records in the result."""
+    removed = 0
+    if isinstance(value, dict):
+        deduped = {}
+        for key, item in value.items():
+            deduped[key], count = dedupe_records(item)
+            removed += count
+        return deduped, removed
+    if isinstance(value, list):
+        seen = set()
+        deduped = []
+        for item in value:
+            item, count = dedupe_records(item)
+            removed += count
+            if isinstance(item, dict):
+                fingerprint = compact_dumps(item)
+                if fingerprint in seen:
+                    removed += 1
+                    continue
+                seen.add(fingerprint)
+            deduped.append(item)
+        return deduped, removed
+    return value, 0
+
+
+def _containers(value: Any, path: str = "", inside: bool = False) -> List[Tuple[int, Any, Any, str, bool]]:
+    """
+    List (serialised size, parent, key, path, inside) for every list and string worth
+    truncating; `inside` is True when it sits within another one of them.
+    """
+    found = []
+    items = value.items() if isinstance(value, dict) else enumerate(value) if isinstance(value, list) else []
+    for key, item in items:
+        item_path = f"{path}.{key}" if path else str(key)
+        if isinstance(item, str) and len(item) > 200:
+            found.append((len(compact_dumps(item)), value, key, item_path, inside))
+        elif isinstance(item, list) and len(item) > 1:
+            found.append((len(compact_dumps(item)), value, key, item_path, inside))
+            found.extend(_containers(item, item_path, True))
+        elif isinstance(item, (dict, list)):
+            found.extend(_containers(item, item_path, inside))
+    return found
+
+
+def truncate_to_budget(
+    value: Any,
+    budget_chars: int,
+    notes: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    Shrink record lists and strings until the serialised result fits the budget. Lists
+    keep their leading records, strings keep their head. Each pass caps every outermost
+    list and string at one common size chosen so together they absorb the excess, so
+    ten routers' outputs each keep a tenth and short lists are left alone; whatever is
+    still over after MAX_TRUNCATION_PASSES is cut outright, largest first, down to the
+    serialised result itself as a last resort. Pass the `notes` of an
+    earlier call to keep cutting an already truncated value.
+    """
+    truncations: Dict[str, Dict[str, Any]] = {} if notes is None else notes
+    # Hold the value in a dict so a top-level list or string can be truncated too
+    holder = {"result": value}
+
+    def shrink(parent, key, path: str, fraction: float):
+        item = parent[key]
+        note = truncations.setdefault(path, {"path": path, "original": len(item)})
+        if isinstance(item, str) and "kept" in note:
+            # Cut again from the kept text, not the previous marker
+            item = item[:note["kept"]]
+        keep = max(0, min(int(len(item) * fraction), len(item) - 1))
+        if isinstance(item, list):
+            parent[key] = item[:keep]
+            note["unit"] = "records"
+        else:
+            parent[key] = item[:keep] + f"\n...[truncated {note['original'] - keep} chars]"
+            note["unit"] = "chars"
+        note["kept"] = keep
+
+    for _ in range(MAX_TRUNCATION_PASSES):
+        excess = len(compact_dumps(holder["result"])) - budget_chars
+        if excess <= 0:
+            break
+        # Outermost only: record lists lose whole records, and nothing is cut twice in a pass
+        outer = [c for c in _containers(holder) if not c[4]]
+        if not outer:
+            break
+        # The largest common cap that leaves room for everything else
+        remaining, cap = sum(c[0] for c in outer) - excess, 0.0
+        sizes = sorted(c[0] for c in outer)
+        for index, size in enumerate(sizes):
+            if remaining <= 0:
+                break
+            if size * (len(sizes) - index) >= remaining:
+                cap = remaining / (len(sizes) - index)
+                break
+            remaining -= size
+        for size, parent, key, path, _ in outer:
+            if size > cap:
+                shrink(parent, key, path, cap / size)
+
+    while len(compact_dumps(holder["result"])) > budget_chars:
+        containers = _containers(holder)
+        if containers:
+            size, parent, key, path, _ = max(containers, key=lambda c: c[0])
+            shrink(parent, key, path, 0.0)
+            continue
+        # Nothing left to shrink, e.g. thousands of small fields: keep the head of the JSON text
+        text = compact_dumps(holder["result"])
+        note = truncations.setdefault("result", {"path": "result", "original": len(text)})
+        keep = budget_chars
+        while keep > 0 and len(compact_dumps(text[:keep] + "...[truncated]")) > budget_chars:
+            keep = keep * budget_chars // len(compact_dumps(text[:keep] + "...[truncated]")) - 1
+        holder["result"] = text[:max(keep, 0)] + "...[truncated]"
+        note.update(kept=max(keep, 0), unit="chars")
+        break
+    return holder["result"], list(truncations.values())
+
+
+def compact_tool_output(tool_name: str, result: Any, token_budget: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Turn a tool result into the string submitted to the model: project tool-specific
+    fields, drop duplicate records, serialise compactly and truncate to the token
+    budget, prefixing a summary when anything was cut. Returns the output and the
+    byte and token savings against the old indent=2 output.
+    """
+    if token_budget is None:
+        token_budget = int(os.environ.get('TOOL_OUTPUT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET))
+
+    original = json.dumps(result, indent=2, default=str)
+    # Round-trip through JSON so truncation never touches cached or shared objects
+    value = json.loads(compact_dumps(result))
+    value = project_records(tool_name, value)
+    value, duplicates = dedupe_records(value)
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    notes: Dict[str, Dict[str, Any]] = {}
+    value, truncations = truncate_to_budget(value, max(budget_chars - SUMMARY_RESERVE_CHARS, budget_chars // 2), notes)
+
+    output = compact_dumps(value)
+    if truncations:
+        def summarized(value, truncations):
+            summary = {
+                "truncated": True,
+                "token_budget": token_budget,
+                "original_tokens": estimate_tokens(original),
+                "truncations": truncations[:MAX_SUMMARY_TRUNCATIONS],
+                "note": "Output was truncated to fit the token budget. Narrow the query for full detail."
+            }
+            if len(truncations) > MAX_SUMMARY_TRUNCATIONS:
+                summary["more_truncations"] = len(truncations) - MAX_SUMMARY_TRUNCATIONS
+            return compact_dumps({"_summary": summary, "result": value})
+
+        output = summarized(value, truncations)
+        if len(output) > budget_chars:
+            # The summary outgrew its reserve: fit the result to what it leaves
+            value, truncations = truncate_to_budget(value, budget_chars - (len(output) - len(compact_dumps(value))) - 32, notes)
+            output = summarized(value, truncations)
+
+    stats = {
+        "original_bytes": len(original.encode('utf-8')),
+        "output_bytes": len(output.encode('utf-8')),
+        "original_tokens": estimate_tokens(original),
+        "output_tokens": estimate_tokens(output),
+        "duplicates_removed": duplicates,
+        "truncated": bool(truncations),
+    }
+    stats["bytes_saved"] = stats["original_bytes"] - stats["output_bytes"]
+    stats["tokens_saved"] = stats["original_tokens"] - stats["output_tokens"]
+    logger.info(
+        f"Compacted {tool_name} output from {stats['original_bytes']} to {stats['output_bytes']} bytes "
+        f"(~{stats['tokens_saved']} tokens saved)"
+    )
+    return output, stats
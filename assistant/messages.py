@@ -0,0 +1,36 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+
+
+def message_text(message) -> str:
+    """Join the text blocks of an assistant message."""
+    return "\n\n".join(block.text.value for block in message.content if block.type == "text")
+
+
+def fetch_new_messages(
+    client,
+    thread_id: str,
+    after: Optional[str] = None,
+    run_id: Optional[str] = None,
+    page_size: int = DEFAULT_PAGE_SIZE
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch only the thread messages newer than the `after` cursor, oldest first, and
+    optionally only those produced by `run_id`. The run filter is applied server-side,
+    so the cost of a turn depends on what that turn added rather than on the length
+    of the thread. Returns the messages and the cursor to store for the next call.
+    """
+    params: Dict[str, Any] = {"thread_id": thread_id, "order": "asc", "limit": page_size}
+    if after:
+        params["after"] = after
+    if run_id:
+        params["run_id"] = run_id
+
+    messages = list(client.beta.threads.messages.list(**params))
+    cursor = messages[-1].id if messages else after
+    logger.info(f"Fetched {len(messages)} new messages from thread {thread_id}")
+    return messages, cursor
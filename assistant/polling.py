@@ -0,0 +1,71 @@
+import time
+import logging
+from typing import Dict, Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_POLL_TIMEOUT = 300
+# Run statuses after which polling stops
+SETTLED_STATUSES = {"completed", "requires_action", "failed", "cancelled", "expired", "incomplete"}
+
+
+def poll_run(client, thread_id: str, run_id: str, timeout: float = DEFAULT_POLL_TIMEOUT,
+             run_metrics: Optional[Dict[str, Any]] = None, poll_interval: float = DEFAULT_POLL_INTERVAL):
+    """Poll a run until it settles, adding the time it spent queued to run_metrics."""
+    start_time = time.time()
+    queued = True
+    while time.time() - start_time < timeout:
+        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+        if queued and run.status != 'queued' and run_metrics is not None:
+            queued = False
+            run_metrics["queued_seconds"] = round(run_metrics["queued_seconds"] + time.time() - start_time, 3)
+        if run.status in SETTLED_STATUSES:
+            return run
+        time.sleep(poll_interval)
+    raise TimeoutError("Run polling timed out")
+
+
+def poll_run_loop(
+    client,
+    thread_id: str,
+    assistant_id: str,
+    model: Optional[str],
+    run_tools: Callable[[List[Any]], List[Dict[str, Any]]],
+    poll_interval: float = DEFAULT_POLL_INTERVAL
+) -> Dict[str, Any]:
+    """
+    Drive one assistant run by polling, the fallback when streaming is disabled. Tool
+    calls are handed to `run_tools` on every requires_action and their outputs
+    submitted. Returns the final run and the same metrics as stream_run, without
+    time_to_first_token.
+    """
+    run_start = time.perf_counter()
+    run_metrics: Dict[str, Any] = {"queued_seconds": 0.0, "tool_rounds": []}
+    run = client.beta.threads.runs.create(
+        thread_id=thread_id,
+        assistant_id=assistant_id,
+        model=model
+    )
+    run = poll_run(client, thread_id, run.id, run_metrics=run_metrics, poll_interval=poll_interval)
+
+    while run.status == 'requires_action':
+        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+        tool_start = time.perf_counter()
+        tool_outputs = run_tools(tool_calls)
+        tool_round = {"tool_calls": len(tool_calls), "tool_seconds": round(time.perf_counter() - tool_start, 3)}
+        run_metrics["tool_rounds"].append(tool_round)
+
+        # Submit tool outputs and poll again
+        run = client.beta.threads.runs.submit_tool_outputs(
+            thread_id=thread_id,
+            run_id=run.id,
+            tool_outputs=tool_outputs
+        )
+        model_start = time.perf_counter()
+        run = poll_run(client, thread_id, run.id, run_metrics=run_metrics, poll_interval=poll_interval)
+        tool_round["model_seconds"] = round(time.perf_counter() - model_start, 3)
+
+    run_metrics["total_seconds"] = round(time.perf_counter() - run_start, 3)
+    logger.info(f"Run {run.id} finished with status {run.status} in {run_metrics['total_seconds']}s")
+    return {"run": run, "metrics": run_metrics}
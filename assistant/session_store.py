@@ -0,0 +1,296 @@
+import os
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Chat text and tool output (configs, ARP tables) are not for other local users: the
+# spill file lives in a directory only the owner can read, not the shared temp dir
+DEFAULT_SPILL_PATH = os.path.join(os.path.expanduser('~'), '.network_assistant', 'session_spill.db')
+# Spilled payloads of sessions that were never closed (the browser just went away) expire
+# once the session has gone this long without being used
+DEFAULT_SPILL_TTL = 24 * 3600
+PRUNE_INTERVAL = 600
+# A session's last use is written at most this often
+TOUCH_INTERVAL = 60
+# Tool results and messages kept in memory as they are; older ones above SPILL_BYTES go to disk
+DEFAULT_TOOL_WINDOW = 10
+DEFAULT_MESSAGE_WINDOW = 40
+DEFAULT_SPILL_BYTES = 2048
+# Older tool results are forgotten entirely, their index entry and blob included
+DEFAULT_MAX_TOOL_RESULTS = 200
+DEFAULT_TIMINGS_LIMIT = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    session TEXT NOT NULL,
+    key TEXT NOT NULL,
+    created REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (session, key)
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    session TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL
+);
+"""
+
+
+class SpillStore:
+    """
+    zlib-compressed payloads spilled from chat sessions, in one SQLite file shared by
+    every session of the process. Blobs are deleted with their session, or once the
+    session has not been used for `ttl` seconds (abandoned without a restart); a
+    long-running session keeps its oldest blobs as long as it stays active.
+    """
+
+    def __init__(self, path: str = DEFAULT_SPILL_PATH, ttl: float = DEFAULT_SPILL_TTL):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        # Created owner-only before SQLite opens it; its -wal and -shm files inherit the mode
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(path, 0o600)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._pruned = 0.0
+        self.prune()
+
+    def prune(self) -> int:
+        """Delete the blobs of sessions unused for `ttl` seconds."""
+        with self._lock:
+            self._pruned = time.time()
+            cutoff = self._pruned - self.ttl
+            # Blobs without a sessions row predate last-use tracking and go by age
+            removed = self._db.execute(
+                "DELETE FROM blobs WHERE session IN (SELECT session FROM sessions WHERE last_seen < ?) "
+                "OR (created < ? AND session NOT IN (SELECT session FROM sessions))", (cutoff, cutoff)).rowcount
+            self._db.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,))
+            self._db.commit()
+        if removed:
+            logger.info(f"Pruned {removed} expired session blobs")
+        return removed
+
+    def touch(self, session: str):
+        """Record that the session is in use, keeping its blobs from being pruned."""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sessions(session, last_seen) VALUES (?, ?)", (session, time.time()))
+            self._db.commit()
+
+    def put(self, session: str, key: str, text: str) -> int:
+        """Store `text` compressed, returning its compressed size."""
+        data = zlib.compress(text.encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO blobs(session, key, created, size, data) VALUES (?, ?, ?, ?, ?)",
+                             (session, key, now, len(data), data))
+            self._db.execute("INSERT OR REPLACE INTO sessions(session, last_seen) VALUES (?, ?)", (session, now))
+            self._db.commit()
+        if time.time() - self._pruned > PRUNE_INTERVAL:
+            self.prune()
+        return len(data)
+
+    def get(self, session: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM blobs WHERE session = ? AND key = ?", (session, key)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def delete(self, session: str, key: Optional[str] = None):
+        """Delete one blob, or every blob of the session when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._db.execute("DELETE FROM blobs WHERE session = ?", (session,))
+                self._db.execute("DELETE FROM sessions WHERE session = ?", (session,))
+            else:
+                self._db.execute("DELETE FROM blobs WHERE session = ? AND key = ?", (session, key))
+            self._db.commit()
+
+
+_spill_store: Optional[SpillStore] = None
+_spill_store_lock = threading.Lock()
+
+
+def get_spill_store() -> SpillStore:
+    """The process-wide spill store at SESSION_SPILL_PATH, expiring blobs after SESSION_SPILL_TTL seconds."""
+    global _spill_store
+    with _spill_store_lock:
+        if _spill_store is None:
+            _spill_store = SpillStore(
+                os.environ.get('SESSION_SPILL_PATH', DEFAULT_SPILL_PATH),
+                ttl=float(os.environ.get('SESSION_SPILL_TTL', DEFAULT_SPILL_TTL))
+            )
+        return _spill_store
+
+
+class SessionStore:
+    """
+    Bounded per-session chat state: the messages shown in the chat, the outputs of the
+    session's tool calls and their timings.
+
+    The last `tool_window` tool outputs and `message_window` messages are held in memory
+    as they are. Anything older and at least `spill_bytes` long is compressed into the
+    spill store and its entry keeps only the size and blob key; message_content() and
+    tool_output() load it back on demand. Beyond `max_tool_results` the oldest tool
+    results are dropped, and timings are kept for the last `timings_limit` calls.
+    Messages are never dropped so the whole chat stays readable.
+
+    Tool results are added from the event loop running tool calls while the script
+    thread renders, so every change happens under a lock. Adding and loading entries
+    marks the session as in use in the spill store, at most every TOUCH_INTERVAL seconds,
+    so an active session's spilled payloads are never pruned.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        spill: Optional[SpillStore] = None,
+        tool_window: int = DEFAULT_TOOL_WINDOW,
+        message_window: int = DEFAULT_MESSAGE_WINDOW,
+        spill_bytes: int = DEFAULT_SPILL_BYTES,
+        max_tool_results: int = DEFAULT_MAX_TOOL_RESULTS,
+        timings_limit: int = DEFAULT_TIMINGS_LIMIT
+    ):
+        self.session_id = session_id
+        self.spill = spill
+        self.tool_window = tool_window
+        self.message_window = message_window
+        self.spill_bytes = spill_bytes
+        self.max_tool_results = max_tool_results
+        self.messages: List[Dict[str, Any]] = []
+        self.tool_results: deque = deque()
+        self.tool_timings: deque = deque(maxlen=timings_limit)
+        self.user_messages = 0
+        self.dropped_tool_results = 0
+        self._sequence = 0
+        self._touched = 0.0
+        self._lock = threading.Lock()
+
+    def _touch(self):
+        if self.spill is None or time.monotonic() - self._touched < TOUCH_INTERVAL:
+            return
+        self._touched = time.monotonic()
+        try:
+            self.spill.touch(self.session_id)
+        except Exception as e:
+            logger.warning(f"Could not mark session {self.session_id} as in use: {e}")
+
+    def _spill_entry(self, entry: Dict[str, Any], field: str, prefix: str):
+        """Move entry[field] to the spill store when it is large enough, keeping it in memory if that fails."""
+        if self.spill is None or entry.get("blob") or entry["bytes"] < self.spill_bytes:
+            return
+        key = f"{prefix}{entry['seq']}"
+        try:
+            entry["stored_bytes"] = self.spill.put(self.session_id, key, entry[field])
+        except Exception as e:
+            logger.warning(f"Could not spill {key} of session {self.session_id}: {e}")
+            return
+        entry["blob"] = key
+        entry[field] = None
+
+    def _load(self, entry: Dict[str, Any], field: str) -> Optional[str]:
+        if entry.get(field) is not None or not entry.get("blob"):
+            return entry.get(field)
+        self._touch()
+        text = self.spill.get(self.session_id, entry["blob"]) if self.spill else None
+        if text is None:
+            logger.warning(f"Spilled {entry['blob']} of session {self.session_id} is gone")
+        return text
+
+    def add_message(self, role: str, content: str) -> Dict[str, Any]:
+        with self._lock:
+            self._sequence += 1
+            message = {"seq": self._sequence, "role": role, "content": content, "bytes": len(content.encode("utf-8"))}
+            self.messages.append(message)
+            if role == "user":
+                self.user_messages += 1
+            # Only the message that just left the window needs a decision
+            if len(self.messages) > self.message_window:
+                self._spill_entry(self.messages[-self.message_window - 1], "content", "message-")
+        self._touch()
+        return message
+
+    def message_content(self, message: Dict[str, Any]) -> str:
+        text = self._load(message, "content")
+        return text if text is not None else "_(message no longer available)_"
+
+    def add_tool_result(self, tool_name: str, call_id: str, output: str) -> Dict[str, Any]:
+        with self._lock:
+            self._sequence += 1
+            entry = {"seq": self._sequence, "tool": tool_name, "call_id": call_id, "time": time.time(),
+                     "output": output, "bytes": len(output.encode("utf-8"))}
+            self.tool_results.append(entry)
+            if len(self.tool_results) > self.tool_window:
+                self._spill_entry(self.tool_results[-self.tool_window - 1], "output", "tool-")
+            dropped = []
+            while len(self.tool_results) > self.max_tool_results:
+                dropped.append(self.tool_results.popleft())
+            self.dropped_tool_results += len(dropped)
+        for old in dropped:
+            if old.get("blob") and self.spill is not None:
+                try:
+                    self.spill.delete(self.session_id, old["blob"])
+                except Exception as e:
+                    logger.warning(f"Could not delete {old['blob']} of session {self.session_id}: {e}")
+        self._touch()
+        return entry
+
+    def tool_output(self, entry: Dict[str, Any]) -> Optional[str]:
+        return self._load(entry, "output")
+
+    def add_tool_timing(self, timing: Dict[str, Any]):
+        with self._lock:
+            self.tool_timings.append(timing)
+
+    def memory(self) -> Dict[str, Any]:
+        """Bytes of message and tool output text held in memory and spilled to disk (raw and compressed)."""
+        with self._lock:
+            entries = [(m, "content") for m in self.messages] + [(t, "output") for t in self.tool_results]
+            stats = {
+                "messages": len(self.messages),
+                "tool_results": len(self.tool_results),
+                "dropped_tool_results": self.dropped_tool_results,
+                "in_memory_bytes": sum(e["bytes"] for e, field in entries if e[field] is not None),
+                "spilled": sum(1 for e, field in entries if e[field] is None),
+                "spilled_bytes": sum(e["bytes"] for e, field in entries if e[field] is None),
+                "spilled_stored_bytes": sum(e.get("stored_bytes", 0) for e, field in entries if e[field] is None),
+            }
+        return stats
+
+    def close(self):
+        """Delete the session's spilled payloads, e.g. when the session is restarted."""
+        if self.spill is not None:
+            try:
+                self.spill.delete(self.session_id)
+            except Exception as e:
+                logger.warning(f"Could not delete the spilled payloads of session {self.session_id}: {e}")
+
+
+def new_session_store(session_id: str) -> SessionStore:
+    """
+    A session store spilling to the process-wide spill store, sized by SESSION_TOOL_WINDOW,
+    SESSION_MESSAGE_WINDOW, SESSION_SPILL_BYTES and SESSION_MAX_TOOL_RESULTS. SESSION_SPILL=0
+    keeps everything in memory, still within the tool result and timing limits.
+    """
+    spill = None
+    if os.environ.get('SESSION_SPILL', '1') != '0':
+        try:
+            spill = get_spill_store()
+        except Exception as e:
+            logger.warning(f"Session spill store unavailable, keeping payloads in memory: {e}")
+    return SessionStore(
+        session_id,
+        spill=spill,
+        tool_window=int(os.environ.get('SESSION_TOOL_WINDOW', DEFAULT_TOOL_WINDOW)),
+        message_window=int(os.environ.get('SESSION_MESSAGE_WINDOW', DEFAULT_MESSAGE_WINDOW)),
+        spill_bytes=int(os.environ.get('SESSION_SPILL_BYTES', DEFAULT_SPILL_BYTES)),
+        max_tool_results=int(os.environ.get('SESSION_MAX_TOOL_RESULTS', DEFAULT_MAX_TOOL_RESULTS))
+    )
@@ -0,0 +1,104 @@
+import time
+import logging
+from typing import Dict, Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Run events after which the stream carries nothing more for this run
+TERMINAL_EVENTS = {
+    "thread.run.completed",
+    "thread.run.failed",
+    "thread.run.cancelled",
+    "thread.run.expired",
+    "thread.run.incomplete",
+}
+
+
+def stream_run(
+    client,
+    thread_id: str,
+    assistant_id: str,
+    model: Optional[str],
+    run_tools: Callable[[List[Any]], List[Dict[str, Any]]],
+    on_text: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Drive one assistant run over the Assistants streaming API. Text deltas are passed
+    to `on_text` as they arrive and tool calls are handed to `run_tools` as soon as
+    `thread.run.requires_action` is emitted, with no polling in between.
+
+    Returns the final run object, the streamed text and timing metrics:
+    time_to_first_token, queued_seconds (time until the run went in_progress, summed
+    over every round) and, per tool round, the tool execution time and the time from
+    submitting outputs until the model's next token or action.
+    """
+    start_time = time.perf_counter()
+    metrics: Dict[str, Any] = {"time_to_first_token": None, "queued_seconds": 0.0, "tool_rounds": []}
+    text_parts: List[str] = []
+
+    stream = client.beta.threads.runs.stream(
+        thread_id=thread_id,
+        assistant_id=assistant_id,
+        model=model
+    )
+    while True:
+        run = None
+        round_start = time.perf_counter()
+        first_response = None
+        queued = True
+        with stream as events:
+            for event in events:
+                if event.event == "thread.run.in_progress" and queued:
+                    queued = False
+                    metrics["queued_seconds"] = round(metrics["queued_seconds"] + time.perf_counter() - round_start, 3)
+                elif event.event == "thread.message.created" and text_parts:
+                    text_parts.append("\n\n")
+                elif event.event == "thread.message.delta":
+                    for block in event.data.delta.content or []:
+                        if block.type != "text" or not block.text or not block.text.value:
+                            continue
+                        now = time.perf_counter()
+                        if first_response is None:
+                            first_response = now - round_start
+                        if metrics["time_to_first_token"] is None:
+                            metrics["time_to_first_token"] = round(now - start_time, 3)
+                            logger.info(f"Time to first token: {metrics['time_to_first_token']}s")
+                        text_parts.append(block.text.value)
+                        if on_text:
+                            on_text("".join(text_parts))
+                elif event.event == "thread.run.requires_action":
+                    run = event.data
+                    # Start the tools now instead of waiting for the stream to close
+                    break
+                elif event.event in TERMINAL_EVENTS:
+                    run = event.data
+                elif event.event == "error":
+                    raise RuntimeError(f"Assistant stream error: {event.data}")
+
+        if run is None:
+            raise RuntimeError("Assistant stream ended without a final run status")
+        if first_response is None:
+            first_response = time.perf_counter() - round_start
+        if metrics["tool_rounds"]:
+            metrics["tool_rounds"][-1]["model_seconds"] = round(first_response, 3)
+            logger.info(f"Model responded {first_response:.3f}s after tool outputs were submitted")
+
+        if run.status != "requires_action":
+            break
+
+        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+        tool_start = time.perf_counter()
+        tool_outputs = run_tools(tool_calls)
+        metrics["tool_rounds"].append({
+            "tool_calls": len(tool_calls),
+            "tool_seconds": round(time.perf_counter() - tool_start, 3)
+        })
+        stream = client.beta.threads.runs.submit_tool_outputs_stream(
+            thread_id=thread_id,
+            run_id=run.id,
+            tool_outputs=tool_outputs
+        )
+
+    metrics["total_seconds"] = round(time.perf_counter() - start_time, 3)
+    logger.info(f"Run {run.id} finished with status {run.status} in {metrics['total_seconds']}s")
+    return {"run": run, "text": "".join(text_parts), "metrics": metrics}
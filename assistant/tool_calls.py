@@ -0,0 +1,87 @@
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Dict, Any, List, Optional, Tuple
+
+from tools import metrics
+from tools.registry import get_tool_registry
+from assistant.compaction import compact_tool_output
+from assistant.session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+# Per-tool timeouts in seconds, SSH tools get longer than the LibreNMS lookups
+TOOL_TIMEOUTS = {
+    "show_commands": 180,
+    "config_commands": 300,
+}
+DEFAULT_TOOL_TIMEOUT = 60
+
+
+def run_tool(tool_name: str, arguments: Dict[str, Any], session_id: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Blocking tool dispatch, run on the tool executor. Tool modules are imported on first
+    use. Results are compacted to the tool output token budget before submission, and
+    the call's wall time, SSH/HTTP phases and payload sizes are recorded.
+    """
+    with metrics.tool_call(tool_name, session_id) as call:
+        result = get_tool_registry().call(tool_name, arguments)
+        if isinstance(result, dict) and (result.get("status") == "error" or "error" in result):
+            call.status = "error"
+        output, compaction = compact_tool_output(tool_name, result)
+        call.output_bytes = compaction["output_bytes"]
+        call.output_tokens = compaction["output_tokens"]
+    return output, compaction
+
+
+async def execute_tool(
+    tool_call,
+    executor: Executor,
+    session_id: Optional[str] = None,
+    session_store: Optional[SessionStore] = None
+) -> Dict[str, Any]:
+    """
+    Run one Assistants API tool call on `executor` within its per-tool timeout and return
+    its tool output. The compacted output and the call's wall time are added to
+    `session_store`.
+    """
+    tool_name = tool_call.function.name
+    arguments = json.loads(tool_call.function.arguments)
+    logger.info(f"Processing tool: {tool_name} with args: {arguments}")
+
+    timeout = TOOL_TIMEOUTS.get(tool_name, DEFAULT_TOOL_TIMEOUT)
+    compaction = None
+    start_time = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, run_tool, tool_name, arguments, session_id)
+        # On timeout the await is cancelled and the run moves on; the worker thread
+        # finishes in the background because blocking calls cannot be interrupted
+        output, compaction = await asyncio.wait_for(future, timeout=timeout)
+
+        # Store tool result
+        if session_store is not None:
+            session_store.add_tool_result(tool_name, tool_call.id, output)
+        return {"tool_call_id": tool_call.id, "output": output}
+    except asyncio.TimeoutError:
+        logger.error(f"Tool {tool_name} timed out after {timeout}s")
+        return {"tool_call_id": tool_call.id, "output": f"Error: Tool {tool_name} timed out after {timeout} seconds"}
+    except Exception as e:
+        logger.error(f"Error executing tool {tool_name}: {str(e)}")
+        return {"tool_call_id": tool_call.id, "output": f"Error: {str(e)}"}
+    finally:
+        elapsed = time.perf_counter() - start_time
+        if session_store is not None:
+            session_store.add_tool_timing({"tool": tool_name, "seconds": round(elapsed, 3), "compaction": compaction})
+        logger.info(f"Tool {tool_name} finished in {elapsed:.3f}s")
+
+
+async def execute_tools(tool_calls, executor: Executor, **kwargs) -> List[Dict[str, Any]]:
+    """Run all tool calls of one round concurrently and log the round's wall time."""
+    start_time = time.perf_counter()
+    tool_outputs = await asyncio.gather(*[execute_tool(tool_call, executor, **kwargs) for tool_call in tool_calls])
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"Executed {len(tool_calls)} tool calls in {elapsed:.3f}s wall time")
+    return tool_outputs
@@ -0,0 +1,213 @@
+"""
+Offline end-to-end benchmark of the assistant's run loop, tools and fan-out.
+
+Everything the app talks to is replaced by the stand-ins in benchmarks.standins: a
+scripted Assistants API (MockOpenAI), a LibreNMS HTTP server whose data set grows with
+the fleet (FakeLibreNMS) and an SSH farm answering like IOS routers (SSHFarm). For
+each --devices count a fresh Python process plays --turns chat turns through the same
+code the app runs, assistant.streaming.stream_run (or assistant.polling.poll_run_loop
+with --polling) and assistant.tool_calls.execute_tools, cycling through scenarios:
+
+    inventory       librenms_get_device_info for every device
+    bgp_down        librenms_bgp filtered to idle sessions
+    troubleshoot    ARP and syslog lookups, then show commands and an interface lookup
+    fleet_show      show ip interface brief on every router
+    config_change   a config push to four routers, then the config diff
+
+The report shows per-turn latency percentiles (including the simulated model time),
+fleet_show fan-out throughput (cold/warm, devices per second), tool errors, bytes of tool output sent to the model
+per turn, the session store's memory (kept in memory and spilled to disk, compressed)
+at the end, and the process's peak RSS and thread count. Requires paramiko and asyncssh.
+
+Usage: python -m benchmarks.bench_e2e [--devices 10 100 1000 5000] [--turns 10] [--backend asyncssh]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_NAME = "bench"
+CONFIG_ROUTERS = ["r0", "r1", "r2", "r3"]
+
+SCENARIOS = {
+    "inventory": ([[("librenms_get_device_info", {})]], "Here is the device inventory."),
+    "bgp_down": ([[("librenms_bgp", {"bgp_state": "idle"})]], "These BGP sessions are down."),
+    "troubleshoot": ([
+        [("librenms_arp", {"query": "10.0.0.10"}), ("librenms_syslog", {"hostname": "r0"})],
+        [("show_commands", {"commands": ["show version", "show ip interface brief"], "routers": ["r0", "r1"]}),
+         ("librenms_get_interface_info", {"device_id": 1, "interface_name": "Gi0/1"})],
+    ], "GigabitEthernet0/1 on r0 is administratively down."),
+    "fleet_show": ([[("show_commands", {"command": "show ip interface brief", "routers": ["*"]})]],
+                   "Interface summary for the whole fleet."),
+    "config_change": ([
+        [("config_commands", {"commands": ["configure terminal", "interface GigabitEthernet0/1",
+                                           "description bench uplink", "end"], "target_routers": CONFIG_ROUTERS})],
+        [("router_config", {"routers": CONFIG_ROUTERS, "action": "changes", "since": "1h"})],
+    ], "The description was applied, here is the diff."),
+}
+ORDER = ["inventory", "bgp_down", "troubleshoot", "fleet_show", "config_change"]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def child(args):
+    """Play the turns in this fresh process and print the measurements as JSON."""
+    logging.basicConfig(level=logging.CRITICAL)
+    from benchmarks.bench_ssh_backends import ThreadPeak
+    from benchmarks.standins import MockOpenAI
+    from assistant.streaming import stream_run
+    from assistant.polling import poll_run_loop
+    from assistant.messages import fetch_new_messages
+    from assistant.tool_calls import execute_tools
+    from assistant.session_store import new_session_store
+    from tools import metrics
+
+    client = MockOpenAI(SCENARIOS, queue_latency=args.queue_latency, model_latency=args.model_latency)
+    executor = ThreadPoolExecutor(max_workers=int(os.environ.get('TOOL_MAX_WORKERS', 8)), thread_name_prefix="tool")
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    session_id = "bench"
+    session_store = new_session_store(session_id)
+    thread = client.beta.threads.create()
+
+    def run_tools(tool_calls):
+        return loop.run_until_complete(execute_tools(tool_calls, executor, session_id=session_id,
+                                                     session_store=session_store))
+
+    turns = []
+    with ThreadPeak() as threads:
+        for turn in range(args.turns):
+            scenario = ORDER[turn % len(ORDER)]
+            user_message = client.beta.threads.messages.create(thread_id=thread.id, role="user", content=scenario)
+            session_store.add_message("user", scenario)
+            submitted_before = len(client.submitted)
+            start = time.perf_counter()
+            if args.polling:
+                result = poll_run_loop(client, thread.id, "asst_bench", None, run_tools, poll_interval=args.poll_interval)
+                fetch_new_messages(client, thread.id, after=user_message.id, run_id=result["run"].id)
+            else:
+                result = stream_run(client, thread.id, "asst_bench", None, run_tools)
+            seconds = time.perf_counter() - start
+            rounds = result["metrics"]["tool_rounds"]
+            session_store.add_message("assistant", client.runs[result["run"].id].reply)
+            timings = list(session_store.tool_timings)[len(session_store.tool_timings) - sum(r["tool_calls"] for r in rounds):]
+            turns.append({
+                "scenario": scenario,
+                "status": result["run"].status,
+                "seconds": round(seconds, 4),
+                "tool_seconds": round(sum(r["tool_seconds"] for r in rounds), 4),
+                "model_seconds": round(client.simulated_seconds(len(rounds)), 4),
+                "tools": {t["tool"]: t["seconds"] for t in timings},
+                "submitted_bytes": sum(s["bytes"] for s in client.submitted[submitted_before:])
+            })
+    calls = metrics.get_metrics().json_trace(session_id)["tool_calls"]
+    print(json.dumps({
+        "turns": turns,
+        "errors": sorted({c["tool"] for c in calls if c["status"] != "ok"}),
+        "session_memory": session_store.memory(),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_threads": threads.peak
+    }))
+
+
+def run_devices(count, args, farm, workdir):
+    from benchmarks.standins import FakeLibreNMS, FleetData
+    librenms = FakeLibreNMS(FleetData(count), latency=args.http_latency)
+    inventory_file = os.path.join(workdir, f"routers_{count}.json")
+    with open(inventory_file, "w") as file:
+        json.dump({"routers": farm.devices(count)}, file)
+    env = dict(
+        os.environ,
+        LIBRENMS_BASE_URL=librenms.url,
+        LIBRENMS_API_TOKEN="bench",
+        LOCAL_SECRETS_FILE=os.path.join(workdir, "secrets.json"),
+        AWS_SECRETS_NAME=SECRET_NAME,
+        INVENTORY_FILE=inventory_file,
+        CONFIG_ARCHIVE_PATH=os.path.join(workdir, f"config_archive_{count}.db"),
+        LIBRENMS_CURSOR_FILE=os.path.join(workdir, f"cursors_{count}.json"),
+        SESSION_SPILL_PATH=os.path.join(workdir, f"sessions_{count}.db"),
+        SSH_BACKEND=args.backend,
+        WARMUP="0"
+    )
+    env.pop("SYSLOG_STORE_PATH", None)
+    command = [sys.executable, "-m", "benchmarks.bench_e2e", "--child", "--turns", str(args.turns),
+               "--queue-latency", str(args.queue_latency), "--model-latency", str(args.model_latency),
+               "--poll-interval", str(args.poll_interval)] + (["--polling"] if args.polling else [])
+    try:
+        output = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, timeout=args.timeout)
+    finally:
+        librenms.close()
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr[-3000:])
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def report(count, result):
+    turns = result["turns"]
+    seconds = [t["seconds"] for t in turns]
+    # The first fleet_show dials every router, later ones reuse the pooled connections
+    fleet = [t["tools"]["show_commands"] for t in turns if t["scenario"] == "fleet_show" and t["tools"].get("show_commands")]
+    throughput = "/".join(f"{count / fleet_seconds:.0f}" for fleet_seconds in fleet[:1] + fleet[1:][-1:]) if fleet else "-"
+    failed = sum(t["status"] != "completed" for t in turns)
+    memory = result["session_memory"]
+    print(f"{count:>8} {percentile(seconds, 50):>8.3f} {percentile(seconds, 95):>8.3f} {percentile(seconds, 99):>8.3f} "
+          f"{max(seconds):>8.3f} {percentile([t['tool_seconds'] for t in turns], 50):>9.3f} {throughput:>11} "
+          f"{sum(t['submitted_bytes'] for t in turns) / len(turns) / 1024:>9.1f} "
+          f"{memory['in_memory_bytes'] / 1024:>10.1f} {memory['spilled_stored_bytes'] / 1024:>10.1f} "
+          f"{result['peak_rss_mb']:>8.1f} {result['peak_threads']:>8} {failed:>6}  {','.join(result['errors']) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--backend", choices=["paramiko", "asyncssh"], default="paramiko")
+    parser.add_argument("--polling", action="store_true", help="poll runs instead of streaming them")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--listeners", type=int, default=10, help="SSH farm servers, one per site")
+    parser.add_argument("--queue-latency", type=float, default=0.05)
+    parser.add_argument("--model-latency", type=float, default=0.3)
+    parser.add_argument("--http-latency", type=float, default=0.02)
+    parser.add_argument("--auth-latency", type=float, default=0.02)
+    parser.add_argument("--exec-latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds allowed per device count")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args)
+
+    from benchmarks.standins import SSHFarm
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("asyncssh").setLevel(logging.WARNING)
+    farm = SSHFarm(args.listeners, auth_latency=args.auth_latency, exec_latency=args.exec_latency, jitter=args.jitter)
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    with open(os.path.join(workdir, "secrets.json"), "w") as file:
+        json.dump({SECRET_NAME: {"username": "bench", "password": "bench"}}, file)
+
+    print(f"{args.turns} turns per fleet size, {args.backend}, {'polling' if args.polling else 'streaming'}, "
+          f"model {args.model_latency}s + queue {args.queue_latency}s per response, HTTP {args.http_latency}s, "
+          f"SSH login {args.auth_latency}s, exec {args.exec_latency}s")
+    print(f"{'devices':>8} {'turn p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'tools p50':>9} {'fleet dev/s':>11} "
+          f"{'KB/turn':>9} {'session KB':>10} {'spilled KB':>10} {'RSS MB':>8} {'threads':>8} {'failed':>6}  tool errors")
+    for count in args.devices:
+        report(count, run_devices(count, args, farm, workdir))
+    print(f"SSH farm: {farm.logins} logins, {farm.commands} commands")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Fan-out benchmark for fleet-wide SSH commands against a simulated device farm.
+
+Each fake device charges an AAA login whose latency grows with the number of logins
+in flight (modelling a shared TACACS/RADIUS server) and which is rejected once more
+than --aaa-capacity logins are in flight, then a command execution with jittered
+latency. 'unbounded' starts one thread per router, like the original
+config_commands; 'scheduler' uses tools.fanout.FanoutScheduler. The report shows
+throughput, per-device latency percentiles and peak concurrent logins as the device
+count grows. With --grouped, routers are named site by site (r0..r99 all at site0)
+instead of interleaving the sites, the order that used to starve the worker pool.
+
+The farm is simulated in-process because it models the shared AAA server's
+load-dependent latency and rejections; bench_e2e runs the same scheduler against
+real SSH listeners (benchmarks.standins.SSHFarm).
+
+Usage: python -m benchmarks.bench_fanout [--devices 10 100 1000] [--concurrency 32] [--grouped]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.fanout import FanoutScheduler
+
+AUTH_BASE = 0.02
+# Extra AAA latency per login already in flight
+AUTH_PENALTY = 0.0005
+EXEC_BASE = 0.03
+EXEC_JITTER = 0.02
+
+
+class FakeDeviceFarm:
+    def __init__(self, aaa_capacity):
+        self.aaa_capacity = aaa_capacity
+        self._lock = threading.Lock()
+        self.in_flight_logins = 0
+        self.peak_logins = 0
+        self.failed = 0
+
+    def run_command(self, name, info):
+        with self._lock:
+            self.in_flight_logins += 1
+            self.peak_logins = max(self.peak_logins, self.in_flight_logins)
+            rejected = self.in_flight_logins > self.aaa_capacity
+            auth_latency = AUTH_BASE + AUTH_PENALTY * self.in_flight_logins
+        time.sleep(auth_latency)
+        with self._lock:
+            self.in_flight_logins -= 1
+            if rejected:
+                self.failed += 1
+        if rejected:
+            return {name: "Error: Authentication failed"}
+        time.sleep(EXEC_BASE + random.uniform(0, EXEC_JITTER))
+        return {name: "ok"}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def make_devices(count, sites=10, grouped=False):
+    per_site = max(1, -(-count // sites))
+    return {f"r{i}": {"management_ip": f"10.{i // 65536}.{i // 256 % 256}.{i % 256}",
+                      "site": f"site{i // per_site if grouped else i % sites}"} for i in range(count)}
+
+
+def bench_unbounded(devices, aaa_capacity):
+    farm = FakeDeviceFarm(aaa_capacity)
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+        futures = [executor.submit(farm.run_command, name, info) for name, info in devices.items()]
+        for future in as_completed(futures):
+            future.result()
+            latencies.append(time.perf_counter() - start)
+    return time.perf_counter() - start, latencies, farm.peak_logins, farm.failed
+
+
+def bench_scheduler(devices, aaa_capacity, concurrency, per_site):
+    farm = FakeDeviceFarm(aaa_capacity)
+    scheduler = FanoutScheduler(max_concurrency=concurrency, per_site_limit=per_site, ramp_rate=0, jitter=0)
+    latencies = []
+    start = time.perf_counter()
+    for _ in scheduler.run(devices, farm.run_command):
+        latencies.append(time.perf_counter() - start)
+    return time.perf_counter() - start, latencies, farm.peak_logins, farm.failed
+
+
+def report(mode, count, elapsed, latencies, peak, failed):
+    succeeded = count - failed
+    print(f"{mode:>10} {count:>8} {succeeded / elapsed:>10.1f} {percentile(latencies, 50):>8.3f} "
+          f"{percentile(latencies, 95):>8.3f} {percentile(latencies, 99):>8.3f} {peak:>11} {failed:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--per-site", type=int, default=8)
+    parser.add_argument("--aaa-capacity", type=int, default=64)
+    parser.add_argument("--skip-unbounded", action="store_true")
+    parser.add_argument("--grouped", action="store_true", help="name routers site by site instead of interleaved")
+    args = parser.parse_args()
+
+    print("Latencies are seconds from fan-out start until each device's result arrives, dev/s counts successes")
+    print(f"{'mode':>10} {'devices':>8} {'dev/s':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'peak logins':>11} {'failed':>8}")
+    for count in args.devices:
+        devices = make_devices(count, grouped=args.grouped)
+        if not args.skip_unbounded:
+            report("unbounded", count, *bench_unbounded(devices, args.aaa_capacity))
+        report("scheduler", count, *bench_scheduler(devices, args.aaa_capacity, args.concurrency, args.per_site))
+
+
+if __name__ == "__main__":
+    main()
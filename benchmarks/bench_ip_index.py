@@ -0,0 +1,98 @@
+"""
+IP index benchmark against per-query LibreNMS round-trips.
+
+Builds tools.ip_index.IPIndex from a synthetic snapshot of --arp ARP entries and
+--networks networks, then times the questions the ARP and network tools answer:
+which router and port has an address, which addresses a MAC holds, every entry in
+a /16, the longest known match for an address and every network overlapping a /8.
+Each is compared with one LibreNMS request per question at --request-latency
+seconds. Finally a snapshot with --churn of the entries changed is applied, which
+is what a background refresh costs.
+
+Usage: python -m benchmarks.bench_ip_index [--arp 200000] [--networks 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.ip_index import IPIndex
+
+
+def arp_snapshot(count, seed=1):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(count):
+        entries.append({
+            "port_id": rng.randrange(1, 50000),
+            "device_id": rng.randrange(1, 1000),
+            "mac_address": f"{rng.getrandbits(48):012x}",
+            "ipv4_address": f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+            "context_name": ""
+        })
+    return entries
+
+
+def network_snapshot(count, seed=2):
+    rng = random.Random(seed)
+    networks = []
+    for i in range(count):
+        length = rng.choice([16, 20, 24, 24, 24, 28, 30])
+        networks.append({"ipv4_network_id": i + 1, "ipv4_network": f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/{length}",
+                         "context_name": ""})
+    for i in range(count // 10):
+        networks.append({"ipv6_network_id": i + 1, "ipv6_network": f"2001:db8:{i:x}::/48", "context_name": ""})
+    return networks
+
+
+def timed(fn, repeat=1000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arp", type=int, default=200000)
+    parser.add_argument("--networks", type=int, default=20000)
+    parser.add_argument("--churn", type=float, default=0.01, help="fraction of ARP entries changed between snapshots")
+    parser.add_argument("--request-latency", type=float, default=0.15, help="seconds per LibreNMS request")
+    args = parser.parse_args()
+
+    index = IPIndex(client_factory=None, refresh_interval=0)
+    arp, networks = arp_snapshot(args.arp), network_snapshot(args.networks)
+    start = time.perf_counter()
+    index.apply_arp(arp)
+    index.apply_networks(networks)
+    print(f"Built index of {index.stats()} in {time.perf_counter() - start:.2f}s")
+
+    sample = arp[len(arp) // 2]
+    queries = [
+        ("address -> router/port", lambda: index.arp_lookup(sample["ipv4_address"])),
+        ("MAC -> addresses", lambda: index.arp_lookup(sample["mac_address"])),
+        ("ARP entries in a /16", lambda: index.arp_lookup("10.1.0.0/16")),
+        ("longest network match", lambda: index.network_lookup(sample["ipv4_address"])["longest_match"]),
+        ("networks overlapping /8", lambda: index.network_lookup("10.0.0.0/8")),
+    ]
+    print(f"{'query':>26} {'results':>8} {'local ms':>10} {'live ms (est)':>14}")
+    for name, query in queries:
+        seconds, result = timed(query, repeat=10 if "/" in name else 1000)
+        count = len(result) if isinstance(result, list) else \
+            len(result["containing"]) + result["contained_count"] if isinstance(result, dict) and "contained" in result else 1
+        print(f"{name:>26} {count:>8} {seconds * 1000:>10.3f} {args.request_latency * 1000:>14.0f}")
+
+    rng = random.Random(3)
+    changed = [dict(entry) for entry in arp]
+    for entry in rng.sample(changed, int(len(changed) * args.churn)):
+        entry["port_id"] = rng.randrange(1, 50000)
+    start = time.perf_counter()
+    changes = index.apply_arp(changed)
+    print(f"Applied refresh with {args.churn:.0%} churn in {(time.perf_counter() - start) * 1000:.0f} ms: {changes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare per-turn message retrieval cost as a thread grows.
+
+'full' is the original approach: list the thread (default page size, newest first),
+auto-paginate through it and filter on run_id in Python. 'incremental' uses the
+server-side run_id filter and an `after` cursor via assistant.messages.fetch_new_messages.
+
+The mock API charges a fixed latency per request plus a per-message transfer cost, so
+the reported latency is simulated and the benchmark runs in well under a second.
+
+Usage: python -m benchmarks.bench_message_retrieval [--max-messages 500]
+"""
+import argparse
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assistant.messages import fetch_new_messages
+
+REQUEST_LATENCY_MS = 150
+PER_MESSAGE_MS = 1.5
+
+
+class MockMessages:
+    def __init__(self):
+        self.thread = []
+        self.requests = 0
+        self.transferred = 0
+
+    def add(self, role, run_id=None):
+        message = SimpleNamespace(
+            id=f"msg_{len(self.thread):06d}",
+            role=role,
+            run_id=run_id,
+            content=[SimpleNamespace(type="text", text=SimpleNamespace(value=f"{role} message"))]
+        )
+        self.thread.append(message)
+        return message
+
+    def _page(self, items, limit):
+        self.requests += 1
+        page = items[:limit]
+        self.transferred += len(page)
+        return page
+
+    def list(self, thread_id, limit=20, order="desc", after=None, run_id=None):
+        items = self.thread if order == "asc" else list(reversed(self.thread))
+        if run_id:
+            items = [m for m in items if m.run_id == run_id]
+        if after:
+            ids = [m.id for m in items]
+            items = items[ids.index(after) + 1:] if after in ids else [m for m in items if m.id > after]
+
+        # Auto-paginating iterator, like the SDK's SyncCursorPage
+        def pages():
+            remaining = items
+            while True:
+                page = self._page(remaining, limit)
+                yield from page
+                if len(remaining) <= limit:
+                    return
+                remaining = remaining[limit:]
+        return pages()
+
+
+def simulated_ms(mock):
+    return mock.requests * REQUEST_LATENCY_MS + mock.transferred * PER_MESSAGE_MS
+
+
+def run(max_messages):
+    mock = MockMessages()
+    client = SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(messages=mock)))
+    print(f"{'thread size':>12} {'full ms':>10} {'full msgs':>10} {'incr ms':>10} {'incr msgs':>10}")
+
+    turn = 0
+    checkpoints = {10, 50, 100, 200, 300, 400, 500, max_messages}
+    while len(mock.thread) < max_messages:
+        turn += 1
+        run_id = f"run_{turn}"
+        user_message = mock.add("user")
+        mock.add("assistant", run_id)
+
+        # Original: list the whole thread and filter client-side
+        mock.requests = mock.transferred = 0
+        full = [m for m in mock.list(thread_id="t") if m.run_id == run_id and m.role == "assistant"]
+        full_ms, full_msgs = simulated_ms(mock), mock.transferred
+
+        # Incremental: server-side run filter after the user message cursor
+        mock.requests = mock.transferred = 0
+        incremental, _ = fetch_new_messages(client, "t", after=user_message.id, run_id=run_id)
+        incr_ms, incr_msgs = simulated_ms(mock), mock.transferred
+
+        assert [m.id for m in full] == [m.id for m in incremental if m.role == "assistant"]
+        if len(mock.thread) in checkpoints:
+            print(f"{len(mock.thread):>12} {full_ms:>10.1f} {full_msgs:>10} {incr_ms:>10.1f} {incr_msgs:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-messages", type=int, default=500)
+    args = parser.parse_args()
+    run(args.max_messages)
@@ -0,0 +1,197 @@
+"""
+Throughput comparison of the paramiko and asyncssh backends for show_commands.
+
+Starts an in-process asyncssh server on 127.0.0.1 that answers exec requests like a
+Cisco router after --exec-latency seconds, then runs one show command against N
+simulated routers (distinct router names, all pointing at the local server) with:
+
+    paramiko   tools.ssh_pool.SSHConnectionPool behind tools.fanout.FanoutScheduler
+    asyncssh   tools.async_ssh.AsyncSSHEngine on one event loop
+
+Each backend runs a cold round (new connections) and a warm round (pooled
+connections). The report shows devices per second, per-device latency percentiles,
+peak thread count and peak RSS. Requires paramiko and asyncssh.
+
+Usage: python -m benchmarks.bench_ssh_backends [--devices 10 100 1000] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+
+import asyncssh
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.ssh_pool import SSHConnectionPool
+from tools.fanout import FanoutScheduler
+from tools.async_ssh import AsyncSSHEngine
+from tools.output_capture import OutputCapture, channel_chunks
+
+COMMAND = "show ip interface brief"
+SHOW_OUTPUT = (
+    "Interface              IP-Address      OK? Method Status                Protocol\r\n"
+    "GigabitEthernet0/0     192.168.20.201  YES NVRAM  up                    up      \r\n"
+    "GigabitEthernet0/1     10.0.0.1        YES NVRAM  up                    up      \r\n"
+    "Loopback0              1.1.1.1         YES NVRAM  up                    up      \r\n"
+)
+
+
+class _AcceptAll(asyncssh.SSHServer):
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    def validate_password(self, username, password):
+        return True
+
+
+class LocalSSHServer:
+    """asyncssh server on its own thread and event loop, answering like a Cisco router."""
+
+    def __init__(self, exec_latency):
+        self.exec_latency = exec_latency
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self._server = asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+
+    async def _handle(self, process):
+        await asyncio.sleep(self.exec_latency)
+        if process.command:
+            process.stdout.write(SHOW_OUTPUT)
+            process.exit(0)
+            return
+        # Interactive shell for config_commands style sessions
+        process.stdout.write("\r\nR1#")
+        while True:
+            line = await process.stdin.readline()
+            if not line:
+                break
+            await asyncio.sleep(self.exec_latency)
+            process.stdout.write(line.rstrip("\r\n") + "\r\nR1(config)#")
+        process.exit(0)
+
+    async def _start(self):
+        server = await asyncssh.create_server(
+            _AcceptAll, "127.0.0.1", 0,
+            server_host_keys=[asyncssh.generate_private_key("ssh-ed25519")],
+            process_factory=self._handle,
+            backlog=4096
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        return server
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self._server.close)
+
+
+def make_devices(count, port, sites=10):
+    return {f"r{i}": {"management_ip": "127.0.0.1", "port": port, "site": f"site{i % sites}"} for i in range(count)}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class ThreadPeak:
+    """Sample the live thread count while a round runs."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def bench_paramiko(pool, scheduler, devices):
+    def task(name, info):
+        try:
+            with pool.connection(name, info["management_ip"], "bench", "bench", port=info["port"]) as ssh:
+                stdin, stdout, stderr = ssh.exec_command(COMMAND)
+                OutputCapture().consume(channel_chunks(stdout.channel)).close()
+            return None
+        except Exception as e:
+            return e
+
+    latencies, failed = [], 0
+    start = time.perf_counter()
+    with ThreadPeak() as threads:
+        for _, result in scheduler.run(devices, task):
+            latencies.append(time.perf_counter() - start)
+            failed += result is not None
+    return time.perf_counter() - start, latencies, failed, threads.peak
+
+
+def bench_asyncssh(engine, devices):
+    latencies = []
+
+    async def timed(name, info):
+        (await engine._show(name, info, COMMAND, "bench", "bench")).close()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPeak() as threads:
+        results = engine._run(engine._fan_out(devices, timed))
+    failed = sum(isinstance(result, Exception) for result in results.values())
+    return time.perf_counter() - start, latencies or [0.0], failed, threads.peak
+
+
+def report(backend, phase, count, elapsed, latencies, failed, threads):
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{backend:>9} {phase:>5} {count:>8} {(count - failed) / elapsed:>9.1f} {percentile(latencies, 50):>8.3f} "
+          f"{percentile(latencies, 95):>8.3f} {failed:>7} {threads:>8} {rss_mb:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--concurrency", type=int, default=32, help="paramiko fan-out threads")
+    parser.add_argument("--sessions", type=int, default=2000, help="asyncssh concurrent sessions")
+    parser.add_argument("--exec-latency", type=float, default=0.05)
+    parser.add_argument("--skip-paramiko", action="store_true")
+    args = parser.parse_args()
+    # Failed handshakes are counted in the report, keep transport tracebacks out of it
+    logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+    logging.getLogger("asyncssh").setLevel(logging.CRITICAL)
+
+    server = LocalSSHServer(args.exec_latency)
+    print(f"Local SSH server on 127.0.0.1:{server.port}, {args.exec_latency * 1000:.0f} ms per command")
+    print("Latencies are seconds from fan-out start until each device's output arrives, RSS is the process peak")
+    print(f"{'backend':>9} {'phase':>5} {'devices':>8} {'dev/s':>9} {'p50':>8} {'p95':>8} {'failed':>7} {'threads':>8} {'rss MB':>9}")
+    for count in args.devices:
+        devices = make_devices(count, server.port)
+        if not args.skip_paramiko:
+            pool = SSHConnectionPool(max_per_host=1)
+            scheduler = FanoutScheduler(max_concurrency=args.concurrency, per_site_limit=args.concurrency,
+                                        ramp_rate=0, jitter=0)
+            for phase in ("cold", "warm"):
+                report("paramiko", phase, count, *bench_paramiko(pool, scheduler, devices))
+            pool.close_all()
+        engine = AsyncSSHEngine(max_sessions=args.sessions, per_site_limit=args.sessions, ramp_rate=0, jitter=0)
+        for phase in ("cold", "warm"):
+            report("asyncssh", phase, count, *bench_asyncssh(engine, devices))
+        engine.close()
+    server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Local syslog store benchmark with millions of rows.
+
+Ingests --rows synthetic LibreNMS syslog entries spread over --days days and
+--hosts hosts into tools.syslog_store.SyslogStore, then times the queries
+librenms_syslog answers locally: host + one hour, program + one day, full-text
+search over a week with a severity floor, and the newest 1000 entries.
+
+Each query is compared with fetching the same window live from LibreNMS, estimated
+as the number of 500-entry pages in the window times --page-latency seconds, since
+the live endpoint can only filter by host and time before paging everything back.
+
+Usage: python -m benchmarks.bench_syslog_store [--rows 2000000] [--path /tmp/syslog_bench.db]
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.syslog_store import SyslogStore, TIMESTAMP_FORMAT
+from tools.librenms_stream import DEFAULT_PAGE_SIZE
+
+PROGRAMS = ["BGP", "LINEPROTO", "LINK", "SYS", "SEC", "OSPF", "DOT1X", "SNMP"]
+PRIORITIES = ["debug", "info", "info", "info", "notice", "notice", "warning", "err", "crit"]
+MESSAGES = [
+    "%BGP-5-ADJCHANGE: neighbor 10.{a}.{b}.1 {state}",
+    "%LINEPROTO-5-UPDOWN: Line protocol on Interface GigabitEthernet0/{b}, changed state to {state}",
+    "%LINK-3-UPDOWN: Interface GigabitEthernet1/0/{b}, changed state to {state}",
+    "%SYS-5-CONFIG_I: Configured from console by admin on vty{b} (10.{a}.0.{b})",
+    "%SEC-6-IPACCESSLOGP: list 101 denied tcp 10.{a}.{b}.7({port}) -> 10.0.0.1(22), 1 packet",
+    "%OSPF-5-ADJCHG: Process 1, Nbr 10.{a}.{b}.2 on Vlan{b} from FULL to DOWN, Neighbor Down",
+    "%DOT1X-5-FAIL: Authentication failed for client (aabb.cc{a:02x}.{b:02x}00) on Interface Gi1/0/{b}",
+    "%SNMP-3-AUTHFAIL: Authentication failure for SNMP req from host 10.{a}.{b}.9",
+]
+
+
+def generate(rows, days, hosts, seed=1):
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=days)
+    step = days * 86400 / rows
+    for seq in range(1, rows + 1):
+        host = rng.randrange(hosts)
+        kind = rng.randrange(len(MESSAGES))
+        yield {
+            "seq": seq,
+            "device_id": host + 1,
+            "hostname": f"rtr-{host:04d}",
+            "program": PROGRAMS[kind],
+            "facility": "local7",
+            "priority": rng.choice(PRIORITIES),
+            "level": "",
+            "timestamp": (start + timedelta(seconds=seq * step)).strftime(TIMESTAMP_FORMAT),
+            "msg": MESSAGES[kind].format(a=rng.randrange(256), b=rng.randrange(48), port=rng.randrange(1024, 65535),
+                                         state=rng.choice(["up", "down", "Up", "Down"]))
+        }
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def window_rows(store, hostname, start, end):
+    connection = store._reader()
+    try:
+        sql = "SELECT count(*) FROM syslog WHERE timestamp >= ? AND timestamp <= ?"
+        params = [start, end]
+        if hostname:
+            sql += " AND hostname = ?"
+            params.append(hostname)
+        return connection.execute(sql, params).fetchone()[0]
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--hosts", type=int, default=500)
+    parser.add_argument("--path", default="/tmp/syslog_bench.db")
+    parser.add_argument("--page-latency", type=float, default=0.15, help="seconds per live LibreNMS page")
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.path + suffix):
+            os.remove(args.path + suffix)
+    store = SyslogStore(args.path)
+    start = time.perf_counter()
+    store.ingest(generate(args.rows, args.days, args.hosts))
+    elapsed = time.perf_counter() - start
+    stats = store.stats()
+    print(f"Ingested {stats['rows']} rows in {elapsed:.1f}s ({stats['rows'] / elapsed:,.0f} rows/s), "
+          f"{stats['bytes'] / 1e6:.0f} MB on disk")
+
+    # Tail delta: one more minute of entries on top of the store
+    tail = list(itertools.islice(generate(args.rows + 500, args.days, args.hosts), args.rows, None))
+    tail_seconds, _ = timed(lambda: store.ingest(tail), repeat=1)
+    print(f"Tail delta of {len(tail)} rows ingested in {tail_seconds * 1000:.1f} ms")
+
+    now = datetime.now()
+    fmt = lambda dt: dt.strftime(TIMESTAMP_FORMAT)
+    hour_ago, day_ago, week_ago = now - timedelta(hours=1), now - timedelta(days=1), now - timedelta(days=7)
+    queries = [
+        ("host, last hour", dict(hostname="rtr-0042", from_time=fmt(hour_ago), to_time=fmt(now)), "rtr-0042", hour_ago),
+        ("program, last day", dict(programs=["BGP"], from_time=fmt(day_ago), to_time=fmt(now)), None, day_ago),
+        ("full text + severity, last week", dict(text="ADJCHANGE Down", max_level=6, from_time=fmt(week_ago)), None, week_ago),
+        ("newest 1000, all hosts", dict(newest_first=True, limit=1000), None, None),
+    ]
+    print(f"{'query':>32} {'rows':>8} {'local ms':>10} {'live pages':>11} {'live s (est)':>13}")
+    for name, kwargs, host, since in queries:
+        seconds, rows = timed(lambda: sum(1 for _ in store.query(**kwargs)))
+        if since is not None:
+            pages = window_rows(store, host, fmt(since), fmt(now)) // DEFAULT_PAGE_SIZE + 1
+        else:
+            pages = 1000 // DEFAULT_PAGE_SIZE
+        print(f"{name:>32} {rows:>8} {seconds * 1000:>10.1f} {pages:>11} {pages * args.page_latency:>13.1f}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
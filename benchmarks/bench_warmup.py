@@ -0,0 +1,176 @@
+"""
+First-answer latency of a new chat session with and without the background warm-up.
+
+Starts FakeLibreNMS from benchmarks.standins (--http-latency seconds per request) and
+the in-process SSH server from bench_ssh_backends, writes an inventory of --devices
+routers pointing at it and a local secrets file, then runs each trial in a fresh Python
+process so imports, credentials, HTTP sessions and SSH connections all start cold:
+
+    cold   the first question's tool calls run straight away
+    warm   tools.warmup runs for --think seconds (the user reading the intro message
+           and typing) before the same tool calls
+
+The first question is librenms_get_device_info, librenms_bgp and a show command on
+--show-routers routers, run concurrently as the app runs one round of tool calls.
+Secrets Manager is simulated by delaying each secret fetch by --secrets-latency.
+Requires paramiko and asyncssh.
+
+Usage: python -m benchmarks.bench_warmup [--trials 5] [--think 3] [--backend paramiko]
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_NAME = "bench"
+
+
+def first_question(show_routers):
+    from tools.registry import get_tool_registry
+    registry = get_tool_registry()
+    calls = [
+        ("librenms_get_device_info", {}),
+        ("librenms_bgp", {}),
+        ("show_commands", {"command": "show ip interface brief", "routers": show_routers}),
+    ]
+
+    def timed(tool_name, arguments):
+        start = time.perf_counter()
+        result = registry.call(tool_name, arguments)
+        failed = isinstance(result, dict) and (result.get("status") == "error" or "error" in result)
+        return tool_name, round(time.perf_counter() - start, 4), failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        results = list(executor.map(lambda call: timed(*call), calls))
+    return {
+        "total": round(time.perf_counter() - start, 4),
+        "tools": {tool_name: seconds for tool_name, seconds, _ in results},
+        "failed": [tool_name for tool_name, _, failed in results if failed]
+    }
+
+
+def child(args):
+    """One trial in a fresh interpreter, printing its timings as JSON."""
+    logging.basicConfig(level=logging.CRITICAL)
+    start = time.perf_counter()
+    from tools.credentials import get_credential_provider
+    provider = get_credential_provider()
+    fetch = provider.backend.fetch
+
+    def slow_fetch(secret_name):
+        time.sleep(args.secrets_latency)
+        return fetch(secret_name)
+
+    # Secrets Manager round trip
+    provider.backend.fetch = slow_fetch
+
+    warmup_status = None
+    if args.child == "warm":
+        from tools.warmup import start_warmup
+        warmup = start_warmup(SECRET_NAME)
+        finished = warmup.wait(args.think)
+        # Whatever the user could not wait for keeps running, as it would in the app
+        time.sleep(max(0.0, args.think - (time.perf_counter() - start)))
+        warmup_status = dict(warmup.status(), finished_before_question=finished)
+    result = first_question(args.show_routers_list)
+    result["warmup"] = warmup_status
+    print(json.dumps(result))
+
+
+def run_trial(mode, args, env):
+    command = [sys.executable, "-m", "benchmarks.bench_warmup", "--child", mode,
+               "--think", str(args.think), "--secrets-latency", str(args.secrets_latency),
+               "--routers", ",".join(args.show_routers_list)]
+    output = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr[-2000:])
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--show-routers", type=int, default=4, help="routers the first show command runs on")
+    parser.add_argument("--think", type=float, default=3.0, help="seconds between session start and the first question")
+    parser.add_argument("--http-latency", type=float, default=0.05)
+    parser.add_argument("--exec-latency", type=float, default=0.05)
+    parser.add_argument("--secrets-latency", type=float, default=0.2)
+    parser.add_argument("--backend", choices=["paramiko", "asyncssh"], default="paramiko")
+    parser.add_argument("--child", choices=["cold", "warm"], help=argparse.SUPPRESS)
+    parser.add_argument("--routers", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.show_routers_list = args.routers.split(",")
+        return child(args)
+
+    from benchmarks.bench_ssh_backends import LocalSSHServer, make_devices
+    from benchmarks.standins import FakeLibreNMS, FleetData
+    logging.basicConfig(level=logging.WARNING)
+    ssh_server = LocalSSHServer(args.exec_latency)
+    devices = make_devices(args.devices, ssh_server.port)
+    librenms = FakeLibreNMS(FleetData(args.devices), args.http_latency)
+    args.show_routers_list = sorted(devices)[:args.show_routers]
+
+    workdir = tempfile.mkdtemp(prefix="bench_warmup_")
+    inventory_file = os.path.join(workdir, "routers.json")
+    secrets_file = os.path.join(workdir, "secrets.json")
+    with open(inventory_file, "w") as file:
+        json.dump({"routers": devices}, file)
+    with open(secrets_file, "w") as file:
+        json.dump({SECRET_NAME: {"username": "bench", "password": "bench"}}, file)
+    env = dict(
+        os.environ,
+        LIBRENMS_BASE_URL=librenms.url,
+        LIBRENMS_API_TOKEN="bench",
+        LOCAL_SECRETS_FILE=secrets_file,
+        AWS_SECRETS_NAME=SECRET_NAME,
+        INVENTORY_FILE=inventory_file,
+        CONFIG_ARCHIVE_PATH=os.path.join(workdir, "config_archive.db"),
+        SSH_BACKEND=args.backend,
+        # The routers the first question asks about are the ones warmed
+        WARMUP_SSH_ROUTERS=",".join(args.show_routers_list),
+        WARMUP_SSH_LIMIT=str(args.show_routers)
+    )
+    env.pop("SYSLOG_STORE_PATH", None)
+
+    print(f"{args.devices} devices, {args.backend}, first question after {args.think}s, "
+          f"HTTP {args.http_latency}s, exec {args.exec_latency}s, secrets {args.secrets_latency}s")
+    results = {"cold": [], "warm": []}
+    for trial in range(args.trials):
+        for mode in ("cold", "warm"):
+            results[mode].append(run_trial(mode, args, env))
+
+    tools = list(results["cold"][0]["tools"])
+    print(f"{'':6} {'first answer':>13} " + " ".join(f"{tool_name:>24}" for tool_name in tools))
+    for mode, trials in results.items():
+        print(f"{mode:6} {median([t['total'] for t in trials]):>12.3f}s "
+              + " ".join(f"{median([t['tools'][tool_name] for t in trials]):>23.3f}s" for tool_name in tools))
+        failed = sorted({tool_name for t in trials for tool_name in t["failed"]})
+        if failed:
+            print(f"       failed: {', '.join(failed)}")
+    warm = [t["warmup"] for t in results["warm"]]
+    print(f"warm-up took {median([w['seconds'] for w in warm]):.3f}s (median), "
+          f"finished before the question in {sum(w['finished_before_question'] for w in warm)}/{len(warm)} trials")
+    steps = warm[0]["steps"]
+    print("  " + ", ".join(f"{step} {median([w['steps'].get(step, {}).get('seconds', 0) for w in warm]):.3f}s"
+                           for step in steps))
+
+
+if __name__ == "__main__":
+    main()
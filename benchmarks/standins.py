@@ -0,0 +1,552 @@
+"""
+Local stand-ins for the services the assistant talks to, for offline benchmarks:
+
+    MockOpenAI     Assistants API client (threads, messages, runs, streaming) that plays
+                   scripted requires_action rounds with simulated queue and model latency
+    FakeLibreNMS   LibreNMS API over HTTP on 127.0.0.1 with a data set sized to the fleet
+    SSHFarm        asyncssh servers answering exec and interactive sessions like Cisco
+                   IOS routers, with configurable login and command latency
+
+All of them run in the calling process on background threads.
+"""
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import asyncssh
+
+# One round of a scripted run: the tool calls the model asks for, as (name, arguments)
+ToolRound = List[Tuple[str, Dict[str, Any]]]
+
+
+# --- Assistants API ------------------------------------------------------------------
+
+class _ScriptedRun:
+    def __init__(self, run_id: str, thread_id: str, rounds: Sequence[ToolRound], reply: str,
+                 final_status: str = "completed"):
+        self.id = run_id
+        self.thread_id = thread_id
+        self.rounds = list(rounds)
+        self.reply = reply
+        self.final_status = final_status
+        self.last_error = None
+        self.round = 0
+        self.status = "queued"
+        self.pending: Dict[str, str] = {}
+        # When the current phase (queued, then thinking) of the polled run ends
+        self.phase_start = time.monotonic()
+
+    def view(self):
+        required_action = None
+        if self.status == "requires_action":
+            tool_calls = [SimpleNamespace(id=call_id, type="function",
+                                          function=SimpleNamespace(name=name, arguments=arguments))
+                          for call_id, (name, arguments) in self.pending.items()]
+            required_action = SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls))
+        return SimpleNamespace(id=self.id, thread_id=self.thread_id, status=self.status, required_action=required_action,
+                               last_error=self.last_error)
+
+
+class _Stream:
+    """What runs.stream returns: a context manager over an iterator of events."""
+
+    def __init__(self, events):
+        self._events = events
+
+    def __enter__(self):
+        return self._events
+
+    def __exit__(self, *exc):
+        self._events.close()
+
+
+class MockOpenAI:
+    """
+    Stand-in for the OpenAI client's beta.threads API. The content of each user message
+    picks a scenario from `scenarios`, {name: (rounds, reply)}: the run asks for each
+    round of tool calls in turn, then answers with `reply`. A third element, e.g.
+    (rounds, "rate limited", "failed"), ends the run in that status instead, with the
+    reply as its last_error message. Every run waits
+    `queue_latency` before it starts and `model_latency` before each model response;
+    replies stream as `reply_chunks` deltas `token_delay` apart.
+
+    Tool outputs submitted back are checked against the pending tool call ids and their
+    sizes recorded in `submitted`, one entry per round.
+    """
+
+    def __init__(self, scenarios: Dict[str, Tuple[Sequence[ToolRound], str]], queue_latency: float = 0.05,
+                 model_latency: float = 0.3, token_delay: float = 0.005, reply_chunks: int = 20):
+        self.scenarios = scenarios
+        self.queue_latency = queue_latency
+        self.model_latency = model_latency
+        self.token_delay = token_delay
+        self.reply_chunks = reply_chunks
+        self.threads: Dict[str, List[Any]] = {}
+        self.runs: Dict[str, _ScriptedRun] = {}
+        self.submitted: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        runs = SimpleNamespace(create=self._create_run, retrieve=self._retrieve_run,
+                               submit_tool_outputs=self._submit_tool_outputs, stream=self._stream,
+                               submit_tool_outputs_stream=self._submit_tool_outputs_stream)
+        messages = SimpleNamespace(create=self._create_message, list=self._list_messages)
+        self.beta = SimpleNamespace(threads=SimpleNamespace(create=self._create_thread, messages=messages, runs=runs))
+
+    def _id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}_{next(self._ids):08d}"
+
+    def _create_thread(self):
+        thread_id = self._id("thread")
+        self.threads[thread_id] = []
+        return SimpleNamespace(id=thread_id)
+
+    def _add_message(self, thread_id, role, text, run_id=None):
+        message = SimpleNamespace(id=self._id("msg"), role=role, run_id=run_id,
+                                  content=[SimpleNamespace(type="text", text=SimpleNamespace(value=text))])
+        self.threads[thread_id].append(message)
+        return message
+
+    def _create_message(self, thread_id, role, content):
+        return self._add_message(thread_id, role, content)
+
+    def _list_messages(self, thread_id, order="desc", limit=20, after=None, run_id=None):
+        items = self.threads[thread_id] if order == "asc" else list(reversed(self.threads[thread_id]))
+        if after:
+            ids = [m.id for m in items]
+            items = items[ids.index(after) + 1:] if after in ids else []
+        return iter([m for m in items if run_id is None or m.run_id == run_id])
+
+    def _new_run(self, thread_id) -> _ScriptedRun:
+        user_messages = [m for m in self.threads[thread_id] if m.role == "user"]
+        scenario = user_messages[-1].content[0].text.value if user_messages else None
+        if scenario not in self.scenarios:
+            raise KeyError(f"No scripted scenario for message: {scenario}")
+        rounds, reply, *final_status = self.scenarios[scenario]
+        run = _ScriptedRun(self._id("run"), thread_id, rounds, reply, *final_status)
+        self.runs[run.id] = run
+        return run
+
+    def _next_action(self, run: _ScriptedRun):
+        """Move the run on after the model has 'thought': more tool calls, or the reply."""
+        if run.round < len(run.rounds):
+            run.pending = {self._id("call"): (name, json.dumps(arguments)) for name, arguments in run.rounds[run.round]}
+            run.round += 1
+            run.status = "requires_action"
+        elif run.final_status != "completed":
+            run.last_error = SimpleNamespace(code="server_error", message=run.reply)
+            run.status = run.final_status
+        else:
+            self._add_message(run.thread_id, "assistant", run.reply, run.id)
+            run.status = "completed"
+
+    def _accept_outputs(self, run: _ScriptedRun, tool_outputs):
+        if run.status != "requires_action":
+            raise ValueError(f"Run {run.id} is {run.status}, not waiting for tool outputs")
+        outputs = {output["tool_call_id"]: output["output"] for output in tool_outputs}
+        if set(outputs) != set(run.pending):
+            raise ValueError(f"Tool outputs {sorted(outputs)} do not match tool calls {sorted(run.pending)}")
+        self.submitted.append({
+            "run": run.id,
+            "tools": [name for name, _ in run.pending.values()],
+            "bytes": sum(len(output.encode()) for output in outputs.values())
+        })
+        run.pending = {}
+        run.status = "queued"
+        run.phase_start = time.monotonic()
+
+    # Polling
+
+    def _create_run(self, thread_id, assistant_id=None, model=None):
+        return self._new_run(thread_id).view()
+
+    def _retrieve_run(self, thread_id, run_id):
+        run = self.runs[run_id]
+        elapsed = time.monotonic() - run.phase_start
+        if run.status in ("queued", "in_progress"):
+            if elapsed >= self.queue_latency + self.model_latency:
+                self._next_action(run)
+            elif elapsed >= self.queue_latency:
+                run.status = "in_progress"
+        return run.view()
+
+    def _submit_tool_outputs(self, thread_id, run_id, tool_outputs):
+        run = self.runs[run_id]
+        self._accept_outputs(run, tool_outputs)
+        return run.view()
+
+    # Streaming
+
+    @staticmethod
+    def _event(name, data):
+        return SimpleNamespace(event=name, data=data)
+
+    def _events(self, run: _ScriptedRun):
+        yield self._event("thread.run.queued", run.view())
+        time.sleep(self.queue_latency)
+        run.status = "in_progress"
+        yield self._event("thread.run.in_progress", run.view())
+        time.sleep(self.model_latency)
+        self._next_action(run)
+        if run.status != "completed":
+            yield self._event(f"thread.run.{run.status}", run.view())
+            return
+        yield self._event("thread.message.created", SimpleNamespace(id=self.threads[run.thread_id][-1].id))
+        size = max(1, -(-len(run.reply) // self.reply_chunks))
+        for i in range(0, len(run.reply), size):
+            delta = SimpleNamespace(content=[SimpleNamespace(type="text", text=SimpleNamespace(value=run.reply[i:i + size]))])
+            yield self._event("thread.message.delta", SimpleNamespace(delta=delta))
+            time.sleep(self.token_delay)
+        yield self._event("thread.run.completed", run.view())
+
+    def _stream(self, thread_id, assistant_id=None, model=None):
+        return _Stream(self._events(self._new_run(thread_id)))
+
+    def _submit_tool_outputs_stream(self, thread_id, run_id, tool_outputs):
+        run = self.runs[run_id]
+        self._accept_outputs(run, tool_outputs)
+        return _Stream(self._events(run))
+
+    def simulated_seconds(self, rounds: int) -> float:
+        """Time a run with `rounds` tool rounds spends waiting on the simulated model."""
+        return (rounds + 1) * (self.queue_latency + self.model_latency) + self.reply_chunks * self.token_delay
+
+
+# --- LibreNMS -------------------------------------------------------------------------
+
+def device_ip(i: int) -> str:
+    return f"10.{(i >> 8) & 255}.{i & 255}.1"
+
+
+class FleetData:
+    """LibreNMS records for routers r0..r<count-1>, sized per device."""
+
+    INTERFACES = ("GigabitEthernet0/0", "GigabitEthernet0/1", "GigabitEthernet0/2", "Loopback0")
+
+    def __init__(self, count: int, bgp_per_device: int = 2, arp_per_device: int = 4, syslog_per_device: int = 5):
+        self.count = count
+        self.devices = [{
+            "device_id": i + 1, "hostname": f"r{i}", "sysName": f"r{i}", "ip": device_ip(i),
+            "hardware": "CSR1000V", "os": "ios", "version": "17.3.4a", "serial": f"9{i:08d}",
+            "status": 1, "status_reason": "", "uptime": 864000 + i, "location": f"site{i % 10}",
+            "last_polled": "2024-05-01 10:00:00"
+        } for i in range(count)]
+        self.ports = [{
+            "port_id": i * len(self.INTERFACES) + j + 1, "device_id": i + 1, "ifName": name, "ifDescr": name,
+            "ifAlias": f"link {j} of r{i}", "ifOperStatus": "up", "ifAdminStatus": "up", "ifSpeed": 1000000000,
+            "ifInOctets_rate": 1000 * j, "ifOutOctets_rate": 2000 * j
+        } for i in range(count) for j, name in enumerate(self.INTERFACES)]
+        self.bgp = [{
+            "device_id": i + 1, "bgpPeerIdentifier": f"172.16.{(i >> 8) & 255}.{i & 255}",
+            "bgpPeerRemoteAddr": f"172.16.{(i >> 8) & 255}.{i & 255}", "bgpLocalAddr": device_ip(i),
+            "bgpPeerRemoteAs": 65001 + j, "bgpPeerState": "established" if (i + j) % 50 else "idle",
+            "bgpPeerAdminStatus": "start", "bgpPeerDescr": f"peer {j}", "bgpPeerFsmEstablishedTime": 3600 * (1 + i % 48),
+            "astext": f"AS{65001 + j}"
+        } for i in range(count) for j in range(bgp_per_device)]
+        self.networks = [{"ipv4_network_id": i + 1, "ipv4_network": f"10.{(i >> 8) & 255}.{i & 255}.0/24"}
+                         for i in range(count)]
+        self.arp = [{
+            "port_id": i * len(self.INTERFACES) + 1, "device_id": i + 1,
+            "mac_address": f"0050.56{(i >> 8) & 255:02x}.{i & 255:02x}{j:02x}",
+            "ipv4_address": f"10.{(i >> 8) & 255}.{i & 255}.{10 + j}", "context_name": ""
+        } for i in range(count) for j in range(arp_per_device)]
+        programs = ("BGP", "LINEPROTO", "SYS", "OSPF")
+        self.syslog = [{
+            "seq": n + 1, "device_id": (n % count) + 1, "hostname": f"r{n % count}", "program": programs[n % 4],
+            "priority": "notice", "level": "5", "facility": "local7",
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - 3600 + n * 3600 / (count * syslog_per_device))),
+            "msg": f"%{programs[n % 4]}-5-CHANGE: event {n} on r{n % count}"
+        } for n in range(count * syslog_per_device)]
+
+    def answer(self, path: str, query: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        parts = path.split("/")
+        if path == "devices":
+            return {"status": "ok", "count": len(self.devices), "devices": self.devices}
+        if parts[0] == "devices" and len(parts) == 2:
+            found = [d for d in self.devices if parts[1] in (d["hostname"], str(d["device_id"]))]
+            return {"status": "ok", "count": len(found), "devices": found} if found else None
+        if path == "bgp":
+            sessions = self.bgp
+            if "hostname" in query:
+                ids = {d["device_id"] for d in self.devices if d["hostname"] == query["hostname"]}
+                sessions = [s for s in sessions if s["device_id"] in ids]
+            if "bgp_state" in query:
+                sessions = [s for s in sessions if s["bgpPeerState"] == query["bgp_state"]]
+            return {"status": "ok", "count": len(sessions), "bgp_sessions": sessions}
+        if path == "resources/ip/networks":
+            return {"status": "ok", "count": len(self.networks), "ip_networks": self.networks}
+        if path.startswith("resources/ip/arp/"):
+            target = path[len("resources/ip/arp/"):]
+            if target == "all":
+                entries = [a for a in self.arp if str(a["device_id"]) == query.get("device")
+                           or self.devices[a["device_id"] - 1]["hostname"] == query.get("device")]
+            elif target == "0.0.0.0/0":
+                entries = self.arp
+            else:
+                entries = [a for a in self.arp if target in (a["ipv4_address"], a["mac_address"])]
+            return {"status": "ok", "count": len(entries), "arp": entries}
+        if parts[:3] == ["ports", "search", "device_id"] and len(parts) >= 4:
+            ports = [p for p in self.ports if str(p["device_id"]) == parts[3]]
+            return {"status": "ok", "count": len(ports), "ports": ports}
+        if parts[0] == "ports" and len(parts) == 2 and parts[1].isdigit():
+            index = int(parts[1]) - 1
+            return {"status": "ok", "port": [self.ports[index]]} if 0 <= index < len(self.ports) else None
+        if parts[:2] == ["logs", "syslog"]:
+            logs = self.syslog
+            if len(parts) == 3:
+                logs = [entry for entry in logs if entry["hostname"] == parts[2] or str(entry["device_id"]) == parts[2]]
+            # 'from' and 'to' take a sequence id or a timestamp, like LibreNMS
+            for bound, keep in (("from", lambda a, b: a >= b), ("to", lambda a, b: a <= b)):
+                if bound in query:
+                    value = query[bound]
+                    field = "seq" if value.isdigit() else "timestamp"
+                    value = int(value) if field == "seq" else value
+                    logs = [entry for entry in logs if keep(entry[field], value)]
+            if query.get("sortorder") == "DESC":
+                logs = list(reversed(logs))
+            start, limit = int(query.get("start", 0)), int(query.get("limit", 50))
+            page = logs[start:start + limit]
+            return {"status": "ok", "count": len(page), "total": len(logs), "logs": page}
+        return None
+
+
+class FakeLibreNMS:
+    """LibreNMS API stand-in on its own thread, answering every request after `latency` seconds."""
+
+    def __init__(self, data: FleetData, latency: float = 0.02):
+        # Whole-list responses are encoded once, everything else per request
+        encoded = {path: json.dumps(data.answer(path, {})).encode()
+                   for path in ("devices", "bgp", "resources/ip/networks", "resources/ip/arp/0.0.0.0/0")}
+        self.requests = 0
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stand_in.requests += 1
+                time.sleep(latency)
+                url = urlsplit(self.path)
+                path = url.path.strip("/")
+                path = path[len("api/v0/"):] if path.startswith("api/v0/") else path
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                body = encoded.get(path) if not query else None
+                if body is None:
+                    answer = data.answer(path, query)
+                    body = json.dumps(answer).encode() if answer is not None else None
+                if body is None:
+                    body = b'{"status": "error", "message": "not found"}'
+                    self.send_response(404)
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v0"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# --- SSH ------------------------------------------------------------------------------
+
+class _Router:
+    """Running state of one emulated IOS router: its hostname and config lines."""
+
+    def __init__(self, hostname: str, index: int):
+        self.hostname = hostname
+        self.index = index
+        self.config = [
+            "version 17.3", f"hostname {hostname}", "!",
+            "interface GigabitEthernet0/0", f" ip address {device_ip(index)} 255.255.255.0", " no shutdown", "!",
+            "interface GigabitEthernet0/1", " no ip address", " shutdown", "!",
+            "interface Loopback0", f" ip address 192.0.2.{index % 250 + 1} 255.255.255.255", "!",
+            "router bgp 65000", " neighbor 172.16.0.1 remote-as 65001", "!",
+        ]
+        self.changed = time.strftime("%H:%M:%S UTC %a %b %d %Y", time.gmtime())
+
+    def apply(self, lines: List[str]):
+        # Indented lines go to the end of their section, new sections before the trailing '!'
+        section_end = len(self.config) - 1
+        for line in lines:
+            if line.startswith(" "):
+                section_start = section_end
+                while section_start > 0 and self.config[section_start - 1].startswith(" "):
+                    section_start -= 1
+                # Re-entering a line the section already has changes nothing, as on IOS
+                if line not in self.config[section_start:section_end]:
+                    self.config.insert(section_end, line)
+                    section_end += 1
+            elif line in self.config:
+                section_end = self.config.index(line) + 1
+                while section_end < len(self.config) and self.config[section_end].startswith(" "):
+                    section_end += 1
+            else:
+                self.config[-1:-1] = [line, "!"]
+                section_end = len(self.config) - 2
+        self.changed = time.strftime("%H:%M:%S UTC %a %b %d %Y", time.gmtime())
+
+    def marker(self) -> str:
+        return f"! Last configuration change at {self.changed} by bench"
+
+    def show(self, command: str) -> str:
+        command = " ".join(command.split())
+        if command.startswith("show running-config | include Last configuration change"):
+            return self.marker() + "\r\n"
+        if command in ("show running-config", "show run"):
+            body = "\r\n".join(self.config)
+            return (f"Building configuration...\r\n\r\nCurrent configuration : {len(body)} bytes\r\n!\r\n"
+                    f"{self.marker()}\r\n!\r\n{body}\r\nend\r\n")
+        if command in ("show ip interface brief", "show ip int brief"):
+            return ("Interface              IP-Address      OK? Method Status                Protocol\r\n"
+                    f"GigabitEthernet0/0     {device_ip(self.index):<15} YES NVRAM  up                    up      \r\n"
+                    "GigabitEthernet0/1     unassigned      YES NVRAM  administratively down down    \r\n"
+                    f"Loopback0              192.0.2.{self.index % 250 + 1:<7} YES NVRAM  up                    up      \r\n")
+        if command == "show version":
+            return (f"Cisco IOS XE Software, Version 17.03.04a\r\n{self.hostname} uptime is 10 days, 2 hours\r\n"
+                    "cisco CSR1000V (VXE) processor with 2072007K/3075K bytes of memory.\r\n")
+        if command == "show clock":
+            return time.strftime("*%H:%M:%S.000 UTC %a %b %d %Y\r\n", time.gmtime())
+        return "                ^\r\n% Invalid input detected at '^' marker.\r\n"
+
+
+class SSHFarm:
+    """
+    In-process SSH device farm on its own event loop. Each of `listeners` servers binds
+    its own loopback address (127.0.1.1, 127.0.1.2, ...) and plays one IOS router, so
+    devices(count) spreads `count` inventory entries over them by site. Logins take
+    `auth_latency` and each command `exec_latency` (plus up to `jitter`) seconds.
+    """
+
+    def __init__(self, listeners: int = 10, auth_latency: float = 0.02, exec_latency: float = 0.05,
+                 jitter: float = 0.0):
+        self.auth_latency = auth_latency
+        self.exec_latency = exec_latency
+        self.jitter = jitter
+        self.logins = 0
+        self.commands = 0
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.routers = [_Router(f"site{i}-rtr", i) for i in range(listeners)]
+        self.port = None
+        self._servers = []
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+
+    def address(self, listener: int) -> str:
+        return f"127.0.1.{listener + 1}"
+
+    async def _start(self):
+        host_key = asyncssh.generate_private_key("ssh-ed25519")
+        for i, router in enumerate(self.routers):
+            server = await asyncssh.listen(
+                self.address(i), self.port or 0,
+                server_host_keys=[host_key],
+                server_factory=lambda: _FarmServer(self),
+                process_factory=lambda process, router=router: self._handle(process, router),
+                encoding=None
+            )
+            self.port = self.port or server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+
+    async def _delay(self, base: float):
+        await asyncio.sleep(base + random.uniform(0, self.jitter))
+
+    async def _handle(self, process, router: _Router):
+        if process.command:
+            self.commands += 1
+            await self._delay(self.exec_latency)
+            process.stdout.write(router.show(process.command.decode() if isinstance(process.command, bytes)
+                                             else process.command).encode())
+            process.exit(0)
+            return
+        await self._shell(process, router)
+
+    async def _shell(self, process, router: _Router):
+        modes = []
+        pending: List[str] = []
+
+        def prompt():
+            return f"{router.hostname}{'(' + modes[-1] + ')' if modes else ''}#"
+
+        process.stdout.write(f"\r\n{prompt()}".encode())
+        while True:
+            line = await process.stdin.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip()
+            self.commands += 1
+            await self._delay(self.exec_latency)
+            reply = ""
+            if command in ("configure terminal", "conf t"):
+                modes = ["config"]
+                reply = "Enter configuration commands, one per line.  End with CNTL/Z.\r\n"
+            elif command == "end":
+                modes = []
+            elif command == "exit":
+                if modes:
+                    modes.pop()
+                else:
+                    break
+            elif modes:
+                pending.append(command if modes == ["config"] or command.startswith("interface") else " " + command)
+                if command.startswith(("interface", "router")):
+                    modes = ["config", "config-if" if command.startswith("interface") else "config-router"]
+            elif command.startswith("show"):
+                reply = router.show(command)
+            elif command.startswith("terminal"):
+                pass
+            else:
+                reply = "                ^\r\n% Invalid input detected at '^' marker.\r\n"
+            if not modes and pending:
+                router.apply(pending)
+                pending = []
+            process.stdout.write(f"{command}\r\n{reply}{prompt()}".encode())
+        process.exit(0)
+
+    def devices(self, count: int) -> Dict[str, Dict[str, Any]]:
+        """Inventory entries r0..r<count-1>, spread over the listeners by site."""
+        listeners = len(self.routers)
+        return {f"r{i}": {"management_ip": self.address(i % listeners), "port": self.port,
+                          "site": f"site{i % listeners}", "platform": "cisco_ios"}
+                for i in range(count)}
+
+    def close(self):
+        async def close_all():
+            for server in self._servers:
+                server.close()
+        asyncio.run_coroutine_threadsafe(close_all(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class _FarmServer(asyncssh.SSHServer):
+    def __init__(self, farm: SSHFarm):
+        self.farm = farm
+
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    async def validate_password(self, username, password):
+        # The AAA round trip of a real login
+        await self.farm._delay(self.farm.auth_latency)
+        self.farm.logins += 1
+        return True
@@ -1,21 +1,21 @@
 import os
+import sys
 import logging
 import json
-import time
 import streamlit as st
 from openai import OpenAI
 from dotenv import load_dotenv
+import time
 import uuid
 import asyncio
-from tools.get_local_time import get_local_time
-from tools.librenms_bgp import librenms_bgp
-from tools.librenms_arp import librenms_arp
-from tools.librenms_get_device_info import librenms_get_device_info
-from tools.librenms_syslog import librenms_syslog
-from tools.librenms_list_networks import librenms_list_networks
-from tools.show_commands import show_commands
-from tools.config_commands import config_commands
-from tools.librenms_get_interface_info import librenms_get_interface_info
+from concurrent.futures import ThreadPoolExecutor
+from tools import metrics
+from tools.warmup import start_warmup, cancel_warmup
+from assistant.streaming import stream_run
+from assistant.messages import fetch_new_messages, message_text
+from assistant.polling import poll_run_loop
+from assistant.tool_calls import execute_tools as run_tool_calls
+from assistant.session_store import new_session_store
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,6 +30,12 @@ client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
 # Declare the Assistant's ID
 assistant_id = os.environ.get('OPENAI_ASSISTANT_ID')
 
+# Stream runs by default, OPENAI_STREAMING=0 falls back to polling
+STREAMING_ENABLED = os.environ.get('OPENAI_STREAMING', '1') != '0'
+
+# Chat messages drawn per rerun, older ones are drawn a page at a time on request
+CHAT_RENDER_WINDOW = int(os.environ.get('CHAT_RENDER_WINDOW', 20))
+
 # Initialize session state variables
 if "session_id" not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
@@ -37,10 +43,14 @@ if "thread_id" not in st.session_state:
     st.session_state.thread_id = None
 if "openai_model" not in st.session_state:
     st.session_state.openai_model = "gpt-4o-mini-2024-07-18"
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-if "tool_results" not in st.session_state:
-    st.session_state.tool_results = {}
+if "session_store" not in st.session_state:
+    st.session_state.session_store = new_session_store(st.session_state.session_id)
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 0
+if "last_message_id" not in st.session_state:
+    st.session_state.last_message_id = None
+if "warmup" not in st.session_state:
+    st.session_state.warmup = None
 
 # Set up Streamlit page
 st.set_page_config(page_title="GPT4 Network Assistant", page_icon=":speech_balloon:")
@@ -48,10 +58,14 @@ st.title("Welcome to the GPT4 Network Assistant")
 
 # Sidebar with Restart Session button and model selection
 if st.sidebar.button("Restart Session"):
+    cancel_warmup(st.session_state.session_id)
+    st.session_state.warmup = None
+    st.session_state.session_store.close()
     st.session_state.session_id = str(uuid.uuid4())
     st.session_state.thread_id = None
-    st.session_state.messages = []
-    st.session_state.tool_results = {}
+    st.session_state.session_store = new_session_store(st.session_state.session_id)
+    st.session_state.history_pages = 0
+    st.session_state.last_message_id = None
     st.rerun()
     
 st.sidebar.markdown("<br>", unsafe_allow_html=True) 
@@ -66,129 +80,211 @@ st.session_state.openai_model = st.sidebar.selectbox(
 
 st.sidebar.markdown("<br>", unsafe_allow_html=True) 
 
-# Function to poll run status
-async def poll_run(client, thread_id, run_id, timeout=300):
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
-        if run.status in ['completed', 'requires_action', 'failed']:
-            return run
-        await asyncio.sleep(1)
-    raise TimeoutError("Run polling timed out")
-
-# Asynchronous function to handle tool execution
-async def execute_tool(tool_call):
-    tool_name = tool_call.function.name
-    arguments = json.loads(tool_call.function.arguments)
-    logger.info(f"Processing tool: {tool_name} with args: {arguments}")
+# Show LibreNMS response cache statistics in the sidebar, without importing the
+# LibreNMS client before any LibreNMS tool has been used
+with st.sidebar.expander("LibreNMS cache"):
+    librenms_client = sys.modules.get("tools.librenms_client")
+    cache_stats = librenms_client.get_librenms_client().cache.stats() if librenms_client else {}
+    if cache_stats:
+        st.table([{"endpoint": endpoint, **counters} for endpoint, counters in cache_stats.items()])
+    else:
+        st.caption("No cached requests yet")
 
-    try:
-        if tool_name == "get_local_time":
-            output = str(get_local_time(arguments))
-        elif tool_name == "librenms_bgp":
-            bgp_result = librenms_bgp(**arguments)
-            output = json.dumps(bgp_result, indent=2)
-        elif tool_name == "librenms_arp":
-            arp_result = librenms_arp(**arguments)
-            output = json.dumps(arp_result, indent=2)
-        elif tool_name == "librenms_get_device_info":
-            device_info_result = librenms_get_device_info(**arguments)
-            output = json.dumps(device_info_result, indent=2)
-        elif tool_name == "librenms_syslog":
-            syslog_result = librenms_syslog(**arguments)
-            output = json.dumps(syslog_result, indent=2)
-        elif tool_name == "librenms_list_networks":
-            network_list_result = librenms_list_networks(**arguments)
-            output = json.dumps(network_list_result, indent=2)
-        elif tool_name == "librenms_get_interface_info":
-            interface_info_result = librenms_get_interface_info(**arguments)
-            output = json.dumps(interface_info_result, indent=2)
-        elif tool_name == "show_commands":
-            show_result = show_commands(**arguments)
-            output = json.dumps(show_result, indent=2)
-        elif tool_name == "config_commands":
-            config_result = config_commands(**arguments)
-            output = json.dumps(config_result, indent=2)
-        else:
-            raise ValueError(f"Unknown tool: {tool_name}")
+# Memory held by this session, and its tool results, loaded from disk once picked
+with st.sidebar.expander("Session memory"):
+    session_store = st.session_state.session_store
+    memory = session_store.memory()
+    metrics.get_metrics().record_session_memory(st.session_state.session_id, memory)
+    st.caption(f"{memory['messages']} messages and {memory['tool_results']} tool results, "
+               f"{memory['in_memory_bytes'] / 1024:.1f} KB in memory, {memory['spilled']} spilled to disk "
+               f"({memory['spilled_bytes'] / 1024:.1f} KB, {memory['spilled_stored_bytes'] / 1024:.1f} KB compressed)")
+    recent_results = list(reversed(session_store.tool_results))
+    picked = st.selectbox(
+        "Tool results",
+        options=range(len(recent_results)),
+        index=None,
+        placeholder="Show a tool result",
+        format_func=lambda i: f"{recent_results[i]['tool']} at {time.strftime('%H:%M:%S', time.localtime(recent_results[i]['time']))} "
+                              f"({recent_results[i]['bytes'] / 1024:.1f} KB)"
+    )
+    if picked is not None:
+        st.code(session_store.tool_output(recent_results[picked]) or "Tool result no longer available", language="json")
+
+# Latency panel, drawn now and redrawn once this rerun's run has finished
+latency_panel = st.sidebar.empty()
+
+def render_latency_panel(stage):
+    with latency_panel.container():
+        with st.expander("Latency"):
+            recorder = metrics.get_metrics()
+            summary = recorder.summary(st.session_state.session_id)
+            if summary:
+                st.caption("Tool calls this session, seconds (phases are means per call)")
+                st.dataframe(summary, hide_index=True)
+            else:
+                st.caption("No tool calls yet")
+            warmup = st.session_state.warmup
+            if warmup is not None:
+                status = warmup.status()
+                st.caption(f"Session warm-up: {status['state']}"
+                           + (f" in {status['seconds']}s" if status['seconds'] is not None else ""))
+                if status["steps"]:
+                    st.table([{"step": step, **{k: v for k, v in result.items() if k in ("status", "seconds")}}
+                              for step, result in status["steps"].items()])
+            runs = recorder.json_trace(st.session_state.session_id)["runs"]
+            if runs:
+                st.caption("Last assistant run, seconds")
+                st.table([runs[-1]["phases"]])
+            st.download_button("Prometheus metrics", recorder.prometheus_text(), file_name="metrics.txt",
+                               key=f"metrics_prometheus_{stage}")
+            st.download_button("JSON trace", json.dumps(recorder.json_trace(st.session_state.session_id), indent=2),
+                               file_name="trace.json", mime="application/json", key=f"metrics_trace_{stage}")
+
+render_latency_panel("start")
+
+# /metrics and /trace.json for scraping when METRICS_PORT is set, started once per process
+@st.cache_resource
+def get_metrics_server():
+    return metrics.start_metrics_server()
+
+get_metrics_server()
+
+# Bounded thread pool shared across reruns for the blocking requests/paramiko tools
+@st.cache_resource
+def get_tool_executor():
+    return ThreadPoolExecutor(
+        max_workers=int(os.environ.get('TOOL_MAX_WORKERS', 8)),
+        thread_name_prefix="tool"
+    )
+
+# Run one round of tool calls concurrently on the tool executor, keeping results and timings in the session
+async def execute_tools(tool_calls):
+    return await run_tool_calls(
+        tool_calls,
+        get_tool_executor(),
+        session_id=st.session_state.session_id,
+        session_store=st.session_state.session_store
+    )
 
-        # Store tool result
-        st.session_state.tool_results[tool_name] = output
-        return {"tool_call_id": tool_call.id, "output": output}
-    except Exception as e:
-        logger.error(f"Error executing tool {tool_name}: {str(e)}")
-        return {"tool_call_id": tool_call.id, "output": f"Error: {str(e)}"}
+# Lets the warm-up thread notice the browser session has gone away
+def session_alive():
+    try:
+        from streamlit.runtime import get_instance
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        runtime, ctx = get_instance(), get_script_run_ctx()
+    except Exception:
+        return None
+    if ctx is None:
+        return None
+    return lambda: runtime.is_active_session(ctx.session_id)
 
 # Main chat logic
 if not st.session_state.thread_id:
+    # Warm credentials, inventory, LibreNMS and SSH pools in the background while the
+    # thread is created and the intro message is read
+    st.session_state.warmup = start_warmup(st.session_state.session_id, alive=session_alive())
     thread = client.beta.threads.create()
     st.session_state.thread_id = thread.id
     
     # Add introduction message
     intro_message = "Hello! I'm your GPT4 Network Assistant. I'm fast and cheap but I'm not easy. How can I help you today?"
-    st.session_state.messages.append({"role": "assistant", "content": intro_message})
+    st.session_state.session_store.add_message("assistant", intro_message)
 
-# Display chat history
-for message in st.session_state.messages:
+# Display chat history, only the latest messages unless earlier pages were asked for, so
+# a rerun costs the same however long the session has run
+chat_messages = st.session_state.session_store.messages
+shown = min(len(chat_messages), CHAT_RENDER_WINDOW * (1 + st.session_state.history_pages))
+if shown < len(chat_messages):
+    if st.button(f"Show earlier messages ({len(chat_messages) - shown} hidden)"):
+        st.session_state.history_pages += 1
+        st.rerun()
+for message in chat_messages[len(chat_messages) - shown:]:
     with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+        st.markdown(st.session_state.session_store.message_content(message))
 
 # Get user input
 if prompt := st.chat_input("Enter your message"):
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    # The first answer of a session is recorded with the warm-up state at the time it was asked
+    first_run_warmup = None
+    if not st.session_state.session_store.user_messages:
+        first_run_warmup = st.session_state.warmup.state if st.session_state.warmup is not None else "off"
+    st.session_state.session_store.add_message("user", prompt)
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Create message in the thread
-    client.beta.threads.messages.create(
+    # Create message in the thread, it becomes the cursor for fetching this turn's replies
+    user_message = client.beta.threads.messages.create(
         thread_id=st.session_state.thread_id,
         role="user",
         content=prompt
     )
+    st.session_state.last_message_id = user_message.id
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    if STREAMING_ENABLED:
+        # Stream the run, rendering tokens as they arrive and running tools on requires_action
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            result = stream_run(
+                client,
+                st.session_state.thread_id,
+                assistant_id,
+                st.session_state.openai_model,  # Use the selected model
+                run_tools=lambda tool_calls: loop.run_until_complete(execute_tools(tool_calls)),
+                on_text=lambda text: placeholder.markdown(text + "▌")
+            )
+            run = result["run"]
+            if result["text"]:
+                placeholder.markdown(result["text"])
+        logger.info(f"Run metrics: {result['metrics']}")
+        metrics.get_metrics().record_run(result["metrics"], st.session_state.session_id, run.status,
+                                         warmup=first_run_warmup)
 
-    # Create and poll the run
-    with st.spinner("Assistant is thinking..."):
-        run = client.beta.threads.runs.create(
-            thread_id=st.session_state.thread_id,
-            assistant_id=assistant_id,
-            model=st.session_state.openai_model  # Use the selected model
-        )
-        run = asyncio.run(poll_run(client, st.session_state.thread_id, run.id))
-
-    # Handle different run statuses
-    while run.status == 'requires_action':
-        tool_calls = run.required_action.submit_tool_outputs.tool_calls
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        tasks = [execute_tool(tool_call) for tool_call in tool_calls]
-        tool_outputs = loop.run_until_complete(asyncio.gather(*tasks))
-
-        # Submit tool outputs and poll again
-        run = client.beta.threads.runs.submit_tool_outputs(
-            thread_id=st.session_state.thread_id,
-            run_id=run.id,
-            tool_outputs=tool_outputs
-        )
-        run = loop.run_until_complete(poll_run(client, st.session_state.thread_id, run.id))
-
-    if run.status == 'completed':
-        messages = client.beta.threads.messages.list(
-            thread_id=st.session_state.thread_id
-        )
-        
-        # Process and display assistant messages
-        assistant_messages = [
-            message for message in messages 
-            if message.run_id == run.id and message.role == "assistant"
-        ]
-        for message in assistant_messages:
-            content = message.content[0].text.value
-            st.session_state.messages.append({"role": "assistant", "content": content})
-            with st.chat_message("assistant"):
-                st.markdown(content)
+        if run.status == 'completed':
+            st.session_state.session_store.add_message("assistant", result["text"])
+        else:
+            logger.error(f"Run ended with unexpected status: {run.status}")
+            st.error(f"An error occurred: Run ended with status {run.status}")
     else:
-        logger.error(f"Run ended with unexpected status: {run.status}")
-        st.error(f"An error occurred: Run ended with status {run.status}")
+        # Create and poll the run
+        with st.spinner("Assistant is thinking..."):
+            result = poll_run_loop(
+                client,
+                st.session_state.thread_id,
+                assistant_id,
+                st.session_state.openai_model,  # Use the selected model
+                run_tools=lambda tool_calls: loop.run_until_complete(execute_tools(tool_calls))
+            )
+        run = result["run"]
+        metrics.get_metrics().record_run(result["metrics"], st.session_state.session_id, run.status,
+                                         warmup=first_run_warmup)
+
+        if run.status == 'completed':
+            # Fetch only this run's messages, newer than the stored cursor
+            assistant_messages, st.session_state.last_message_id = fetch_new_messages(
+                client,
+                st.session_state.thread_id,
+                after=st.session_state.last_message_id,
+                run_id=run.id
+            )
+
+            # Process and display assistant messages
+            for message in assistant_messages:
+                if message.role != "assistant":
+                    continue
+                content = message_text(message)
+                st.session_state.session_store.add_message("assistant", content)
+                with st.chat_message("assistant"):
+                    st.markdown(content)
+        else:
+            logger.error(f"Run ended with unexpected status: {run.status}")
+            st.error(f"An error occurred: Run ended with status {run.status}")
+
+    # Redraw the latency panel with this run's tool calls
+    render_latency_panel("end")
+    metrics.get_metrics().record_session_memory(st.session_state.session_id, st.session_state.session_store.memory())
 
 # File upload in sidebar
 uploaded_files = st.sidebar.file_uploader("Upload files to vector db", accept_multiple_files=True, type=['pdf', 'txt', 'docx', 'json'])
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from assistant.compaction import CHARS_PER_TOKEN, compact_tool_output, estimate_tokens
+
+
+def _show_output(router: str, size: int) -> str:
+    # CLI text with the newlines and quotes that grow when escaped in JSON
+    line = f'{router} GigabitEthernet0/0/1 "uplink to core" is up, line protocol is up\n'
+    return (line * (size // len(line) + 1))[:size]
+
+
+def _assert_within_budget(output: str, token_budget: int):
+    assert len(output) <= token_budget * CHARS_PER_TOKEN
+    assert estimate_tokens(output) <= token_budget
+    return json.loads(output)
+
+
+@pytest.mark.parametrize("token_budget", [8000, 2000])
+def test_multi_router_show_output_fits_the_budget(token_budget):
+    routers = [f"r{i}" for i in range(10)]
+    result = {
+        "status": "success",
+        "command": "show interfaces",
+        "routers": routers,
+        "results": {router: _show_output(router, 64 * 1024) for router in routers}
+    }
+    output, stats = compact_tool_output("show_commands", result, token_budget=token_budget)
+    parsed = _assert_within_budget(output, token_budget)
+    assert stats["truncated"]
+    # Every router keeps a share of its output rather than one keeping it all
+    assert all(len(text) > 100 for text in parsed["result"]["results"].values())
+
+
+def test_batch_show_output_fits_the_budget():
+    routers = [f"r{i}" for i in range(10)]
+    commands = ["show running-config", "show ip bgp summary", "show interfaces"]
+    result = {
+        "status": "success",
+        "commands": commands,
+        "routers": routers,
+        "results": {router: {command: _show_output(router, 60 * 1024) for command in commands} for router in routers},
+        "timings": {router: {command: 0.5 for command in commands} for router in routers}
+    }
+    output, stats = compact_tool_output("show_commands", result)
+    parsed = _assert_within_budget(output, 8000)
+    summary = parsed["_summary"]
+    assert summary["more_truncations"] == len(routers) * len(commands) - len(summary["truncations"])
+    assert all(note["original"] == 60 * 1024 for note in summary["truncations"])
+
+
+def test_many_small_fields_fit_the_budget():
+    # Nothing large enough to shrink on its own: only the JSON text itself can be cut
+    result = {f"key{i}": {"a": i, "b": str(i)} for i in range(20000)}
+    output, _ = compact_tool_output("librenms_get_device_info", result, token_budget=500)
+    _assert_within_budget(output, 500)
+
+
+def test_small_output_is_untouched():
+    result = {"status": "ok", "devices": [{"hostname": "r1"}]}
+    output, stats = compact_tool_output("show_commands", result)
+    assert json.loads(output) == result
+    assert not stats["truncated"]
+
+
+def test_record_lists_lose_whole_records():
+    sessions = [{"device_id": i, "bgpPeerIdentifier": f"10.0.{i // 256}.{i % 256}", "bgpPeerDescr": "x" * 300}
+                for i in range(5000)]
+    output, _ = compact_tool_output("librenms_bgp", {"status": "ok", "bgp_sessions": sessions})
+    parsed = _assert_within_budget(output, 8000)
+    kept = parsed["result"]["bgp_sessions"]
+    assert 0 < len(kept) < len(sessions)
+    assert kept == sessions[:len(kept)]
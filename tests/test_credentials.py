@@ -0,0 +1,75 @@
+import time
+
+from tools.credentials import CredentialProvider, LocalBackend
+
+SECRET = "routers"
+
+
+class _FlakyBackend(LocalBackend):
+    """LocalBackend whose fetches start failing once `fail` is set."""
+
+    def __init__(self, secrets):
+        super().__init__(secrets)
+        self.fail = False
+
+    def fetch(self, secret_name):
+        if self.fail:
+            self.fetch_count += 1
+            raise ConnectionError("Secrets Manager unreachable")
+        return super().fetch(secret_name)
+
+
+def _wait_for_refresh(provider, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while provider._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not provider._refreshing
+
+
+def test_expired_entry_is_fetched_again():
+    backend = LocalBackend({SECRET: {"username": "admin", "password": "one"}})
+    provider = CredentialProvider(backend, ttl=0.2, refresh_margin=0)
+
+    assert provider.get(SECRET)["password"] == "one"
+    assert provider.get(SECRET)["password"] == "one"
+    assert backend.fetch_count == 1
+
+    backend.secrets[SECRET]["password"] = "two"
+    time.sleep(0.25)
+    assert provider.get(SECRET)["password"] == "two"
+    assert backend.fetch_count == 2
+
+
+def test_invalidate_after_auth_failure_forces_a_fetch():
+    backend = LocalBackend({SECRET: {"username": "admin", "password": "old"}})
+    provider = CredentialProvider(backend, ttl=900)
+
+    assert provider.get(SECRET)["password"] == "old"
+    # The password was rotated and a device rejected the cached one
+    backend.secrets[SECRET]["password"] = "rotated"
+    assert provider.get(SECRET)["password"] == "old"
+    provider.invalidate(SECRET)
+    assert provider.get(SECRET)["password"] == "rotated"
+    assert backend.fetch_count == 2
+
+
+def test_failed_background_refresh_serves_the_last_secret_until_it_expires():
+    backend = _FlakyBackend({SECRET: {"username": "admin", "password": "good"}})
+    provider = CredentialProvider(backend, ttl=0.5, refresh_margin=0.4)
+
+    assert provider.get(SECRET)["password"] == "good"
+    backend.fail = True
+    time.sleep(0.15)
+    # Within the refresh margin: the cached secret comes back while the refresh fails behind it
+    assert provider.get(SECRET)["password"] == "good"
+    _wait_for_refresh(provider)
+    assert backend.fetch_count == 2
+    assert provider.get(SECRET)["password"] == "good"
+    _wait_for_refresh(provider)
+
+    time.sleep(0.4)
+    # Expired, and the backend still fails: nothing stale is served
+    assert provider.get(SECRET) is None
+
+    backend.fail = False
+    assert provider.get(SECRET)["password"] == "good"
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import Counter
+
+from tools.fanout import FanoutScheduler
+
+
+class _Tracker:
+    """A fan-out task that records how many devices run at once, overall and per site."""
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.running = 0
+        self.by_site = Counter()
+        self.peak = 0
+        self.site_peaks = Counter()
+        self.starts = []
+
+    def __call__(self, name, info):
+        site = info["site"]
+        with self.lock:
+            self.starts.append(time.monotonic())
+            self.running += 1
+            self.by_site[site] += 1
+            self.peak = max(self.peak, self.running)
+            self.site_peaks[site] = max(self.site_peaks[site], self.by_site[site])
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running -= 1
+            self.by_site[site] -= 1
+        return {"ok": name}
+
+
+def _devices(count, sites, prefix="r"):
+    return {f"{prefix}{i}": {"management_ip": f"192.0.2.{i}", "site": f"site{i % sites}"} for i in range(count)}
+
+
+def test_global_and_per_site_limits():
+    scheduler = FanoutScheduler(max_concurrency=6, per_site_limit=2, ramp_rate=0, jitter=0)
+    task = _Tracker()
+    results = dict(scheduler.run(_devices(30, sites=5), task))
+
+    assert len(results) == 30
+    assert all(result == {"ok": name} for name, result in results.items())
+    assert task.peak == 6
+    assert max(task.site_peaks.values()) == 2
+
+
+def test_one_busy_site_does_not_hold_up_the_others():
+    scheduler = FanoutScheduler(max_concurrency=8, per_site_limit=2, ramp_rate=0, jitter=0)
+    devices = _devices(12, sites=1, prefix="a")
+    devices.update({f"b{i}": {"site": f"other{i}"} for i in range(6)})
+    task = _Tracker()
+    start = time.monotonic()
+    finished = {}
+    for name, _ in scheduler.run(devices, task):
+        finished[name] = time.monotonic() - start
+
+    assert task.site_peaks["site0"] == 2
+    # The other sites run alongside the first pair of the busy site, not after its queue
+    assert max(finished[f"b{i}"] for i in range(6)) < 0.1
+
+
+def test_limits_are_shared_by_concurrent_runs():
+    scheduler = FanoutScheduler(max_concurrency=4, per_site_limit=2, ramp_rate=0, jitter=0)
+    task = _Tracker()
+    threads = [threading.Thread(target=lambda prefix=prefix: list(scheduler.run(_devices(10, sites=2, prefix=prefix), task)))
+               for prefix in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(task.starts) == 20
+    assert task.peak == 4
+    assert max(task.site_peaks.values()) == 2
+
+
+def test_ramp_spaces_session_starts():
+    scheduler = FanoutScheduler(max_concurrency=10, per_site_limit=10, ramp_rate=20, jitter=0.01)
+    task = _Tracker(seconds=0)
+    list(scheduler.run(_devices(10, sites=1), task))
+
+    starts = sorted(task.starts)
+    # 20 per second: ten starts span at least nine intervals of 50 ms
+    assert starts[-1] - starts[0] >= 9 * 0.05 - 0.01
+    assert all(later - earlier >= 0.05 - 0.01 - 0.005 for earlier, later in zip(starts, starts[1:]))
+
+
+def test_device_deadline_yields_on_timeout_and_frees_the_slots():
+    scheduler = FanoutScheduler(max_concurrency=2, per_site_limit=1, ramp_rate=0, jitter=0, device_timeout=0.1)
+
+    def task(name, info):
+        time.sleep(0.5 if name == "r0" else 0)
+        return "done"
+
+    results = dict(scheduler.run(_devices(4, sites=2), task, on_timeout=lambda name: "timed out"))
+    assert results == {"r0": "timed out", "r1": "done", "r2": "done", "r3": "done"}
+    time.sleep(0.5)
+    # The abandoned worker released its slots when it finished
+    assert scheduler._global.acquire(blocking=False)
+    scheduler._global.release()
+    assert scheduler._site_slot("site0").acquire(blocking=False)
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from tools.ip_index import IPIndex, PrefixTree, lookup_networks
+
+
+def _contains(outer, inner, width):
+    """True when prefix `outer` (key, length) contains prefix `inner`."""
+    (outer_key, outer_length), (inner_key, inner_length) = outer, inner
+    if outer_length > inner_length:
+        return False
+    shift = width - outer_length
+    return outer_key >> shift == inner_key >> shift if outer_length else True
+
+
+def _truncate(key, length, width):
+    shift = width - length
+    return (key >> shift) << shift if length else 0
+
+
+def _random_prefix(rng, width):
+    length = rng.randint(0, width)
+    return _truncate(rng.getrandbits(width), length, width), length
+
+
+@pytest.mark.parametrize("width,seed", [(8, 1), (8, 2), (16, 3), (32, 4)])
+def test_prefix_tree_matches_brute_force(width, seed):
+    rng = random.Random(seed)
+    tree = PrefixTree(width)
+    reference = {}
+
+    for step in range(3000):
+        key, length = _random_prefix(rng, width)
+        if rng.random() < 0.35 and reference:
+            # Delete something stored most of the time, something missing now and then
+            if rng.random() < 0.8:
+                key, length = rng.choice(sorted(reference))
+            assert tree.delete(key, length) == ((key, length) in reference)
+            reference.pop((key, length), None)
+        else:
+            tree.insert(key, length, step)
+            reference[(key, length)] = step
+        assert len(tree) == len(reference)
+
+        if step % 10:
+            continue
+        for _ in range(5):
+            query = _random_prefix(rng, width)
+            covering = sorted(((k, n, v) for (k, n), v in reference.items() if _contains((k, n), query, width)),
+                              key=lambda p: p[1])
+            within = sorted((k, n, v) for (k, n), v in reference.items() if _contains(query, (k, n), width))
+            assert list(tree.covering(*query)) == covering
+            assert tree.longest_match(*query) == (covering[-1] if covering else None)
+            assert sorted(tree.within(*query)) == within
+            assert tree.get(*query) == reference.get(query)
+
+    # Everything stored is still reachable in address order from the root
+    assert list(tree.within(0, 0)) == sorted((k, n, v) for (k, n), v in reference.items())
+
+
+def test_prefix_tree_delete_everything_leaves_it_empty():
+    rng = random.Random(5)
+    tree = PrefixTree(32)
+    prefixes = {_random_prefix(rng, 32) for _ in range(500)}
+    for key, length in prefixes:
+        tree.insert(key, length, True)
+    for key, length in rng.sample(sorted(prefixes), len(prefixes)):
+        assert tree.delete(key, length)
+    assert len(tree) == 0
+    assert tree.root is None
+
+
+def test_arp_lookup_is_ipv4_only():
+    index = IPIndex(client_factory=None, refresh_interval=0)
+    index.apply_arp([
+        {"device_id": 1, "port_id": 1, "ipv4_address": "10.0.0.5", "mac_address": "aa:bb:cc:dd:ee:ff"},
+        {"device_id": 1, "port_id": 1, "ipv4_address": "10.0.1.5", "mac_address": "aa:bb:cc:dd:ee:00"},
+    ])
+    assert [e["ipv4_address"] for e in index.arp_lookup("10.0.0.0/24")] == ["10.0.0.5"]
+    assert len(index.arp_lookup("aabb.ccdd.eeff")) == 1
+    assert index.arp_lookup("2001:db8::1") is None
+
+
+def test_lookup_networks_matches_the_index():
+    networks = [{"ipv4_network_id": i, "ipv4_network": cidr}
+                for i, cidr in enumerate(["10.0.0.0/8", "10.1.0.0/16", "10.1.2.0/24", "192.168.0.0/16"])]
+    networks.append({"ipv6_network_id": 1, "ipv6_network": "2001:db8::/32"})
+    index = IPIndex(client_factory=None, refresh_interval=0)
+    index.apply_networks(networks)
+    for query in ["10.1.2.3", "10.0.0.0/8", "10.1.0.0/16", "172.16.0.1", "2001:db8:1::/48"]:
+        assert lookup_networks(networks, query) == index.network_lookup(query)
+    result = lookup_networks(networks, "10.1.2.3")
+    assert result["longest_match"]["network"] == "10.1.2.0/24"
+    assert [n["network"] for n in result["containing"]] == ["10.0.0.0/8", "10.1.0.0/16", "10.1.2.0/24"]
@@ -0,0 +1,21 @@
+from tools.metrics import MetricsRecorder, ToolCall
+
+
+def test_prometheus_labels_do_not_grow_with_sessions():
+    recorder = MetricsRecorder()
+    for i in range(50):
+        session = f"3f2b9c1e-0000-4000-8000-{i:012d}"
+        call = ToolCall("show_commands", session)
+        call.seconds = 0.1
+        recorder.finish_call(call)
+        recorder.record_run({"total_seconds": 1.0}, session=session, status="completed")
+        recorder.record_session_memory(session, {"in_memory_bytes": 100, "spilled_stored_bytes": 10})
+
+    text = recorder.prometheus_text()
+    assert "session=" not in text
+    assert 'network_assistant_session_memory_bytes{where="memory"} 5000' in text
+    assert "network_assistant_sessions_tracked 50" in text
+    # Per-session detail stays in the JSON trace
+    trace = recorder.json_trace("3f2b9c1e-0000-4000-8000-000000000007")
+    assert len(trace["tool_calls"]) == 1
+    assert trace["session_memory"]["in_memory_bytes"] == 100
@@ -0,0 +1,133 @@
+import socket
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from tools import show_commands as show_module
+from tools.fanout import FanoutScheduler
+
+
+class _Channel:
+    """paramiko Channel stand-in: recv() honours settimeout() and raises socket.timeout."""
+
+    def __init__(self, output: str, stall: bool):
+        self.data = output.encode()
+        self.stall = stall
+        self.timeout = None
+        self.closed = False
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def recv(self, size):
+        if self.stall:
+            time.sleep(self.timeout)
+            raise socket.timeout()
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+class _Stream:
+    def __init__(self, channel):
+        self.channel = channel
+
+
+class _Client:
+    def __init__(self, slow_commands):
+        self.slow_commands = slow_commands
+        self.channels = []
+        self.exec_timeouts = []
+
+    def exec_command(self, command, timeout=None):
+        self.exec_timeouts.append(timeout)
+        channel = _Channel(f"output of {command}\n", stall=command in self.slow_commands)
+        channel.settimeout(timeout)
+        self.channels.append(channel)
+        return None, _Stream(channel), _Stream(channel)
+
+
+class _Pool:
+    def __init__(self, client):
+        self.client = client
+
+    @contextmanager
+    def connection(self, router_name, management_ip, username, password, port=22):
+        yield self.client
+
+
+class _Credentials:
+    def get(self, secret_name):
+        return {"username": "admin", "password": "secret"}
+
+    def invalidate(self, secret_name):
+        pass
+
+
+class _Inventory:
+    devices = {"r1": {"management_ip": "192.0.2.1"}}
+
+    def resolve(self, routers):
+        return dict(self.devices)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = _Client(slow_commands={"show tech-support"})
+    monkeypatch.setenv("SSH_BACKEND", "paramiko")
+    monkeypatch.setenv("SSH_COMMAND_TIMEOUT", "0.2")
+    monkeypatch.setattr(show_module, "get_ssh_pool", lambda: _Pool(client))
+    monkeypatch.setattr(show_module, "get_credential_provider", lambda: _Credentials())
+    monkeypatch.setattr(show_module, "get_inventory", lambda: _Inventory())
+    return client
+
+
+def test_slow_command_does_not_lose_the_other_outputs(client):
+    commands = ["show clock", "show tech-support", "show version"]
+    result = show_module.show_commands(commands=commands, routers=["r1"], raw=True)
+
+    assert result["status"] == "success"
+    outputs = result["results"]["r1"]
+    assert outputs["show clock"] == "output of show clock\n"
+    assert outputs["show version"] == "output of show version\n"
+    assert outputs["show tech-support"].startswith("Error: No complete output from 'show tech-support'")
+    # The stalled command gave up at its own deadline, not the router's
+    assert result["timings"]["r1"]["show tech-support"] < 1
+    assert client.exec_timeouts == [0.2, 0.2, 0.2]
+    assert all(channel.closed for channel in client.channels)
+
+
+def test_router_deadline_returns_the_commands_that_finished(client, monkeypatch):
+    # Two stalled commands use up the router's deadline before the last one starts
+    client.slow_commands.add("show logging")
+    monkeypatch.setenv("SSH_COMMAND_TIMEOUT", "0.3")
+    scheduler = FanoutScheduler(device_timeout=0.5, ramp_rate=0, jitter=0)
+    monkeypatch.setattr(show_module, "get_fanout_scheduler", lambda: scheduler)
+
+    commands = ["show clock", "show tech-support", "show logging", "show version"]
+    result = show_module.show_commands(commands=commands, routers=["r1"], raw=True)
+
+    outputs = result["results"]["r1"]
+    assert isinstance(outputs, dict), outputs
+    assert outputs["show clock"] == "output of show clock\n"
+    assert outputs["show tech-support"].startswith("Error: No complete output from 'show tech-support' after 0.3 seconds")
+    # Cut short to what was left of the router's deadline
+    assert outputs["show logging"].startswith("Error: No complete output from 'show logging'")
+    assert result["timings"]["r1"]["show logging"] < 0.3
+    assert outputs["show version"].startswith("Error: Not run")
+    assert all(channel.closed for channel in client.channels)
+
+
+def test_deadline_covers_output_that_keeps_trickling():
+    from tools.output_capture import OutputCapture, channel_chunks
+
+    class Trickle(_Channel):
+        def recv(self, size):
+            time.sleep(0.05)
+            return b"x"
+
+    with pytest.raises(socket.timeout):
+        OutputCapture().consume(channel_chunks(Trickle("", stall=False), deadline=time.monotonic() + 0.2))
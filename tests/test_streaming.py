@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from assistant.streaming import stream_run
+from benchmarks.standins import MockOpenAI
+
+REPLY = "R1 has 3 established BGP sessions and all interfaces are up."
+
+
+@pytest.fixture
+def client():
+    return MockOpenAI({
+        "plain": ([], REPLY),
+        "tools": ([[("librenms_bgp", {"hostname": "r1"}), ("show_commands", {"command": "show clock", "routers": ["r1"]})]],
+                  REPLY),
+        "fails": ([], "Rate limit reached", "failed"),
+        "expires": ([[("librenms_bgp", {})]], "Run expired", "expired"),
+    }, queue_latency=0.01, model_latency=0.02, token_delay=0, reply_chunks=7)
+
+
+def _start(client, scenario):
+    thread = client.beta.threads.create()
+    client.beta.threads.messages.create(thread.id, role="user", content=scenario)
+    return thread.id
+
+
+def _run_tools(calls_seen):
+    def run_tools(tool_calls):
+        calls_seen.append([(call.function.name, json.loads(call.function.arguments)) for call in tool_calls])
+        return [{"tool_call_id": call.id, "output": json.dumps({"status": "ok"})} for call in tool_calls]
+    return run_tools
+
+
+def test_text_deltas_stream_to_on_text(client):
+    updates = []
+    result = stream_run(client, _start(client, "plain"), "asst", None, _run_tools([]), on_text=updates.append)
+
+    assert result["run"].status == "completed"
+    assert result["text"] == REPLY
+    # One update per delta, each the text so far
+    assert len(updates) == 7
+    assert all(REPLY.startswith(update) for update in updates)
+    assert updates[-1] == REPLY
+    assert result["metrics"]["time_to_first_token"] is not None
+    assert result["metrics"]["tool_rounds"] == []
+
+
+def test_requires_action_round_submits_outputs_and_continues(client):
+    calls_seen = []
+    result = stream_run(client, _start(client, "tools"), "asst", None, _run_tools(calls_seen))
+
+    assert result["run"].status == "completed"
+    assert result["text"] == REPLY
+    assert calls_seen == [[("librenms_bgp", {"hostname": "r1"}),
+                           ("show_commands", {"command": "show clock", "routers": ["r1"]})]]
+    # The outputs reached the run through submit_tool_outputs_stream
+    assert [submitted["tools"] for submitted in client.submitted] == [["librenms_bgp", "show_commands"]]
+    rounds = result["metrics"]["tool_rounds"]
+    assert len(rounds) == 1
+    assert rounds[0]["tool_calls"] == 2
+    assert rounds[0]["model_seconds"] is not None
+
+
+@pytest.mark.parametrize("scenario,status,tool_rounds", [("fails", "failed", 0), ("expires", "expired", 1)])
+def test_failed_or_expired_run_ends_the_loop(client, scenario, status, tool_rounds):
+    result = stream_run(client, _start(client, scenario), "asst", None, _run_tools([]))
+
+    assert result["run"].status == status
+    assert result["run"].last_error.message
+    assert result["text"] == ""
+    assert len(result["metrics"]["tool_rounds"]) == tool_rounds
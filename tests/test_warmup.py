@@ -0,0 +1,31 @@
+from tools import warmup as warmup_module
+
+
+def test_ssh_step_is_skipped_unless_routers_are_selected(monkeypatch):
+    monkeypatch.delenv("WARMUP_SSH_ROUTERS", raising=False)
+    dialled = []
+    monkeypatch.setattr(warmup_module.Warmup, "_credentials", lambda self: dialled.append(self) or {})
+
+    warmup = warmup_module.Warmup("session", steps=("ssh",))
+    warmup.run()
+    assert warmup.results["ssh"]["status"] == "ok"
+    assert warmup.results["ssh"]["skipped"] == "WARMUP_SSH_ROUTERS is not set"
+    assert dialled == []
+
+
+def test_start_warmup_defaults_to_no_ssh_routers(monkeypatch):
+    monkeypatch.delenv("WARMUP", raising=False)
+    monkeypatch.delenv("WARMUP_SSH_ROUTERS", raising=False)
+    monkeypatch.setattr(warmup_module.Warmup, "start", lambda self: self)
+    warmup = warmup_module.start_warmup("default-session")
+    try:
+        assert warmup.ssh_routers == []
+    finally:
+        warmup_module.cancel_warmup("default-session")
+
+    monkeypatch.setenv("WARMUP_SSH_ROUTERS", "core-*, edge1")
+    warmup = warmup_module.start_warmup("selected-session")
+    try:
+        assert warmup.ssh_routers == ["core-*", "edge1"]
+    finally:
+        warmup_module.cancel_warmup("selected-session")
@@ -0,0 +1,428 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Callable, Awaitable, List, Optional, Tuple
+
+import asyncssh
+
+from tools.shell_reader import PAGER_PATTERN, prompt_pattern, learned_prompt_pattern
+from tools.output_capture import OutputCapture, CHUNK_SIZE
+from tools.fanout import DEFAULT_MAX_CONCURRENCY, DEFAULT_PER_SITE_LIMIT, DEFAULT_RAMP_RATE, DEFAULT_JITTER
+from tools import metrics
+
+logger = logging.getLogger(__name__)
+
+# Session caps and login ramp default to the paramiko scheduler's settings
+# (SSH_MAX_CONCURRENCY, SSH_PER_SITE_LIMIT, SSH_RAMP_RATE): the AAA servers see the
+# same login rate whichever backend runs
+DEFAULT_MAX_SESSIONS = DEFAULT_MAX_CONCURRENCY
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_COMMAND_TIMEOUT = 60
+DEFAULT_IDLE_TIMEOUT = 300
+# How often idle connections are looked for and closed
+SWEEP_INTERVAL = 30
+DEFAULT_DEVICE_TIMEOUT = 120
+DEFAULT_CONFIG_DEVICE_TIMEOUT = 280
+# A show batch stops this long before the device deadline (at most a tenth of it), so
+# the commands that finished are returned instead of a bare timeout
+DEADLINE_MARGIN = 5
+
+
+def is_auth_error(error: BaseException) -> bool:
+    return isinstance(error, asyncssh.PermissionDenied)
+
+
+class _TrackedClient(asyncssh.SSHClient):
+    def __init__(self):
+        self.closed = False
+        self.connected_at: Optional[float] = None
+        self.authed_at: Optional[float] = None
+
+    def connection_made(self, conn):
+        self.connected_at = time.perf_counter()
+
+    def auth_completed(self):
+        self.authed_at = time.perf_counter()
+
+    def connection_lost(self, exc):
+        self.closed = True
+
+
+class AsyncSSHEngine:
+    """
+    asyncssh backend for show_commands and config_commands. All sessions share one
+    event loop running on a background thread, so thousands of devices cost one
+    coroutine each instead of a thread each. Sessions are capped globally and per site,
+    and new logins are spaced by a jittered ramp like FanoutScheduler's. Connections
+    are kept for reuse and closed by a periodic sweep once idle for `idle_timeout`
+    seconds; callers that give up cancel their sessions.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        per_site_limit: int = DEFAULT_PER_SITE_LIMIT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        command_timeout: float = DEFAULT_COMMAND_TIMEOUT,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        device_timeout: float = DEFAULT_DEVICE_TIMEOUT,
+        config_device_timeout: float = DEFAULT_CONFIG_DEVICE_TIMEOUT,
+        ramp_rate: float = DEFAULT_RAMP_RATE,
+        jitter: float = DEFAULT_JITTER
+    ):
+        self.max_sessions = max_sessions
+        self.per_site_limit = per_site_limit
+        self.ramp_rate = ramp_rate
+        self.jitter = jitter
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.idle_timeout = idle_timeout
+        self.device_timeout = device_timeout
+        self.config_device_timeout = config_device_timeout
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="asyncssh-engine", daemon=True)
+        self._thread.start()
+        # Created on the engine loop, see _setup
+        self._sessions: Optional[asyncio.Semaphore] = None
+        self._sites: Dict[str, asyncio.Semaphore] = {}
+        self._connections: Dict[Tuple[str, str, int, str], Tuple[Any, _TrackedClient, float]] = {}
+        self._connect_locks: Dict[Tuple[str, str, int, str], asyncio.Lock] = {}
+        # Sessions currently running on each cached connection, never swept
+        self._busy: Dict[Tuple[str, str, int, str], int] = {}
+        self._next_start = 0.0
+        self._sweeper: Optional[asyncio.Task] = None
+        asyncio.run_coroutine_threadsafe(self._setup(), self.loop).result()
+
+    async def _setup(self):
+        self._sessions = asyncio.Semaphore(self.max_sessions)
+        self._sweeper = asyncio.ensure_future(self._sweep())
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(min(SWEEP_INTERVAL, self.idle_timeout))
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.warning(f"asyncssh idle sweep failed: {e!r}")
+
+    def evict_idle(self) -> int:
+        """Close cached connections idle for idle_timeout seconds or already closed. Runs on the engine loop."""
+        now = time.monotonic()
+        evicted = 0
+        for key, (conn, client, last_used) in list(self._connections.items()):
+            if self._busy.get(key) or (not client.closed and now - last_used < self.idle_timeout):
+                continue
+            lock = self._connect_locks.get(key)
+            if lock is not None and lock.locked():
+                continue
+            del self._connections[key]
+            self._connect_locks.pop(key, None)
+            conn.close()
+            evicted += 1
+        if evicted:
+            logger.info(f"Closed {evicted} idle asyncssh connections, {len(self._connections)} left")
+        return evicted
+
+    async def _ramp(self):
+        # Space logins 1/ramp_rate apart, plus jitter to avoid lockstep; the loop is
+        # single-threaded so no lock is needed
+        if self.ramp_rate <= 0:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + 1.0 / self.ramp_rate
+        delay = start - now + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _site_slot(self, site: str) -> asyncio.Semaphore:
+        if site not in self._sites:
+            self._sites[site] = asyncio.Semaphore(self.per_site_limit)
+        return self._sites[site]
+
+    @staticmethod
+    def _key(router_name: str, router_info: Dict[str, Any], username: str) -> Tuple[str, str, int, str]:
+        return router_name, router_info['management_ip'], int(router_info.get('port', 22)), username
+
+    async def _connection(self, router_name: str, router_info: Dict[str, Any], username: str, password: str):
+        key = self._key(router_name, router_info, username)
+        lock = self._connect_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._connections.get(key)
+            if cached is not None:
+                conn, client, last_used = cached
+                if not client.closed and time.monotonic() - last_used < self.idle_timeout:
+                    self._connections[key] = (conn, client, time.monotonic())
+                    return conn
+                conn.close()
+
+            await self._ramp()
+            clients: List[_TrackedClient] = []
+
+            def client_factory():
+                clients.append(_TrackedClient())
+                return clients[-1]
+
+            start = time.perf_counter()
+            conn = await asyncssh.connect(
+                key[1],
+                port=key[2],
+                username=username,
+                password=password,
+                known_hosts=None,
+                # Explicitly disable key-based authentication
+                client_keys=None,
+                agent_path=None,
+                client_factory=client_factory,
+                connect_timeout=self.connect_timeout
+            )
+            client = clients[0]
+            # TCP connect, then key exchange and authentication, as reported by the client callbacks
+            if client.connected_at is not None and client.authed_at is not None:
+                metrics.record_phase("ssh_connect", client.connected_at - start)
+                metrics.record_phase("ssh_auth", client.authed_at - client.connected_at)
+            self._connections[key] = (conn, client, time.monotonic())
+            return conn
+
+    @asynccontextmanager
+    async def _using(self, router_name: str, router_info: Dict[str, Any], username: str, password: str):
+        """A cached connection marked busy for the duration, so the idle sweep leaves it alone."""
+        conn = await self._connection(router_name, router_info, username, password)
+        key = self._key(router_name, router_info, username)
+        self._busy[key] = self._busy.get(key, 0) + 1
+        try:
+            yield conn
+        finally:
+            self._busy[key] -= 1
+            if not self._busy[key]:
+                del self._busy[key]
+            cached = self._connections.get(key)
+            if cached is not None and cached[0] is conn:
+                # Idle time counts from the end of the last session, not its start
+                self._connections[key] = (conn, cached[1], time.monotonic())
+
+    def _drop(self, router_name: str):
+        for key in [k for k in self._connections if k[0] == router_name]:
+            self._connections.pop(key)[0].close()
+
+    async def _show(self, router_name, router_info, command, username, password,
+                    timeout: Optional[float] = None) -> OutputCapture:
+        async with self._using(router_name, router_info, username, password) as conn:
+            start = time.perf_counter()
+            # Raw bytes, decoded incrementally into a capped, spill-to-disk capture
+            process = await conn.create_process(command, encoding=None)
+            capture = OutputCapture()
+
+            async def read_all():
+                while not capture.full:
+                    data = await process.stdout.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    capture.feed(data)
+
+            try:
+                await asyncio.wait_for(read_all(), timeout=self.command_timeout if timeout is None else timeout)
+                metrics.add_payload_bytes(capture.bytes_received)
+                return capture.finish()
+            except BaseException:
+                capture.close()
+                raise
+            finally:
+                process.close()
+                metrics.record_phase("ssh_exec", time.perf_counter() - start)
+
+    async def _show_batch(self, router_name, router_info, commands, username, password) -> Dict[str, Any]:
+        # One connection, one exec channel per command in order; a command that times out
+        # is reported on its own and the rest still run
+        outputs: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        # The batch shares the device deadline _fan_out enforces, the login included
+        deadline = time.monotonic() + self.device_timeout - min(DEADLINE_MARGIN, self.device_timeout / 10)
+        try:
+            for command in commands:
+                start = time.monotonic()
+                budget = min(self.command_timeout, deadline - start)
+                if budget <= 0:
+                    outputs[command] = TimeoutError(f"Not run, the device's {self.device_timeout:g} second deadline had passed")
+                    continue
+                try:
+                    outputs[command] = await self._show(router_name, router_info, command, username, password, budget)
+                except asyncio.TimeoutError:
+                    outputs[command] = TimeoutError(f"Timed out after {budget:g} seconds")
+                timings[command] = round(time.monotonic() - start, 3)
+        except BaseException:
+            for output in outputs.values():
+                if isinstance(output, OutputCapture):
+                    output.close()
+            raise
+        return {"outputs": outputs, "timings": timings}
+
+    async def _read_until_prompt(self, process, prompt, capture: OutputCapture) -> Tuple[str, bool]:
+        """
+        Read into `capture` until the prompt returns, answering pagers. Returns the last
+        line and whether the command timeout passed first, like ShellReader.read_until_prompt.
+        """
+        deadline = time.monotonic() + self.command_timeout
+        # Only the last few chunks are kept for prompt detection, the output goes to the capture
+        buffer: List[str] = []
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                data = await asyncio.wait_for(process.stdout.read(CHUNK_SIZE), timeout=remaining)
+            except asyncio.TimeoutError:
+                return "".join(buffer).rsplit("\n", 1)[-1].replace("\r", ""), True
+            if not data:
+                return "".join(buffer).rsplit("\n", 1)[-1].replace("\r", ""), False
+            capture.write(data)
+            buffer.append(data)
+            del buffer[:-4]
+            tail = "".join(buffer).rsplit("\n", 1)[-1].replace("\r", "")
+            if PAGER_PATTERN.search(tail):
+                process.stdin.write(" ")
+            elif prompt.search(tail):
+                return tail, False
+
+    async def _config(self, router_name, router_info, commands, username, password) -> Dict[str, Any]:
+        async with self._using(router_name, router_info, username, password) as conn:
+            start = time.perf_counter()
+            process = await conn.create_process(term_type='vt100')
+            with OutputCapture() as capture:
+                try:
+                    prompt = prompt_pattern(router_info.get('platform'))
+                    tail, timed_out = await self._read_until_prompt(process, prompt, capture)
+                    if not timed_out:
+                        # Lock onto the prompt the device actually printed
+                        prompt = learned_prompt_pattern(tail)
+                    timings = []
+                    for command in commands:
+                        command_start = time.monotonic()
+                        process.stdin.write(command + '\n')
+                        _, timed_out = await self._read_until_prompt(process, prompt, capture)
+                        seconds = round(time.monotonic() - command_start, 3)
+                        timings.append({"command": command, "seconds": seconds, "timed_out": timed_out})
+                        if timed_out:
+                            logger.warning(f"Timed out after {seconds}s waiting for prompt after '{command}' on {router_name}")
+                    metrics.add_payload_bytes(capture.bytes_received)
+                    return {"output": capture.head(), "timings": timings}
+                finally:
+                    process.close()
+                    metrics.record_phase("ssh_exec", time.perf_counter() - start)
+
+    async def _fan_out(self, devices, run_one: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+                       device_timeout: Optional[float] = None) -> Dict[str, Any]:
+        device_timeout = self.device_timeout if device_timeout is None else device_timeout
+
+        async def guarded(name, info):
+            async with self._site_slot(str(info.get('site', ''))), self._sessions:
+                try:
+                    return name, await asyncio.wait_for(run_one(name, info), timeout=device_timeout)
+                except asyncio.CancelledError:
+                    raise
+                except asyncio.TimeoutError:
+                    self._drop(name)
+                    # The builtin type, so callers need not import asyncio to recognise it
+                    return name, TimeoutError(f"Timed out after {device_timeout} seconds")
+                except Exception as e:
+                    logger.error(f"asyncssh session failed on {name}: {e!r}")
+                    # Do not reuse a connection that just failed
+                    self._drop(name)
+                    return name, e
+
+        tasks = [asyncio.ensure_future(guarded(name, info)) for name, info in devices.items()]
+        try:
+            return dict(await asyncio.gather(*tasks))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _run(self, coro):
+        call = metrics.current_call()
+
+        async def bound():
+            # Sessions are tasks on the engine loop, attribute their phases to the calling tool
+            with metrics.bind(call):
+                return await coro
+
+        future = asyncio.run_coroutine_threadsafe(bound(), self.loop)
+        try:
+            return future.result()
+        except BaseException:
+            # Cancels every outstanding session when the caller gives up
+            future.cancel()
+            raise
+
+    def show(self, devices, commands: List[str], username, password) -> Dict[str, Any]:
+        """
+        Run exec commands in order over one connection per device, returning {router:
+        {"outputs": {command: OutputCapture or TimeoutError}, "timings": {command: seconds}}
+        or the exception raised}. Callers close the captures.
+        """
+        return self._run(self._fan_out(
+            devices,
+            lambda name, info: self._show_batch(name, info, commands, username, password)
+        ))
+
+    def config(self, devices, commands, username, password) -> Dict[str, Any]:
+        """
+        Run commands in one interactive shell per device, returning {router: {output, timings}
+        or the exception raised}.
+        """
+        return self._run(self._fan_out(
+            devices,
+            lambda name, info: self._config(name, info, commands, username, password),
+            device_timeout=self.config_device_timeout
+        ))
+
+    def connect(self, devices, username, password) -> Dict[str, Any]:
+        """
+        Open (or revalidate) the cached connection to each device without running a
+        command, returning {router: True or the exception raised}.
+        """
+        async def connect_one(name, info):
+            await self._connection(name, info, username, password)
+            return True
+
+        return self._run(self._fan_out(devices, connect_one))
+
+    def close(self):
+        async def close_all():
+            if self._sweeper is not None:
+                self._sweeper.cancel()
+            for conn, _, _ in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        asyncio.run_coroutine_threadsafe(close_all(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_engine: Optional[AsyncSSHEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_async_ssh_engine() -> AsyncSSHEngine:
+    """
+    Return the process-wide asyncssh engine. Its caps and ramp come from the same
+    SSH_MAX_CONCURRENCY, SSH_PER_SITE_LIMIT and SSH_RAMP_RATE as the paramiko scheduler,
+    unless ASYNC_SSH_MAX_SESSIONS or ASYNC_SSH_PER_SITE_LIMIT override them.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AsyncSSHEngine(
+                max_sessions=int(os.environ.get('ASYNC_SSH_MAX_SESSIONS')
+                                 or os.environ.get('SSH_MAX_CONCURRENCY', DEFAULT_MAX_SESSIONS)),
+                per_site_limit=int(os.environ.get('ASYNC_SSH_PER_SITE_LIMIT')
+                                   or os.environ.get('SSH_PER_SITE_LIMIT', DEFAULT_PER_SITE_LIMIT)),
+                ramp_rate=float(os.environ.get('SSH_RAMP_RATE', DEFAULT_RAMP_RATE)),
+                idle_timeout=float(os.environ.get('SSH_POOL_IDLE_TIMEOUT', DEFAULT_IDLE_TIMEOUT)),
+                command_timeout=float(os.environ.get('ASYNC_SSH_COMMAND_TIMEOUT', DEFAULT_COMMAND_TIMEOUT)),
+                device_timeout=float(os.environ.get('SSH_DEVICE_TIMEOUT', DEFAULT_DEVICE_TIMEOUT)),
+                config_device_timeout=float(os.environ.get('SSH_CONFIG_DEVICE_TIMEOUT', DEFAULT_CONFIG_DEVICE_TIMEOUT))
+            )
+        return _engine
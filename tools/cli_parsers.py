@@ -0,0 +1,186 @@
+import os
+import re
+import copy
+import logging
+from typing import Dict, Any, Iterable, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLATFORM = "cisco_ios"
+
+
+def command_pattern(template: str) -> Pattern:
+    """
+    Compile an ntc-templates style command like 'sh[[ow]] ip int[[erface]] br[[ief]]'
+    into a regex that accepts every abbreviation of it.
+    """
+    parts = []
+    for word in template.split():
+        match = re.match(r"^(.*?)\[\[(.*)\]\]$", word)
+        if match:
+            required, optional = match.groups()
+            parts.append(re.escape(required) + "".join(f"(?:{re.escape(c)}" for c in optional) + ")?" * len(optional))
+        else:
+            parts.append(re.escape(word))
+    return re.compile(r"^\s*" + r"\s+".join(parts) + r"\s*$", re.IGNORECASE)
+
+
+class RegexTemplate:
+    """
+    Minimal TextFSM-like template: `row` matches one record per line, `filldown`
+    values are captured from the first line they appear on and copied onto every
+    later record, and `single` templates search for each value once and return one
+    record. Parsing is line by line, so it can consume streamed output.
+    """
+
+    def __init__(self, columns: List[str], row: Optional[str] = None,
+                 filldown: Optional[Dict[str, str]] = None, single: Optional[Dict[str, str]] = None):
+        self.columns = columns
+        self.row = re.compile(row) if row else None
+        self.filldown = {name: re.compile(regex, re.MULTILINE) for name, regex in (filldown or {}).items()}
+        self.single = {name: re.compile(regex, re.MULTILINE) for name, regex in (single or {}).items()}
+
+    def parse(self, text: str) -> List[List[Any]]:
+        return self.parse_lines(text.splitlines())
+
+    def parse_lines(self, lines: Iterable[str]) -> List[List[Any]]:
+        if self.single:
+            values = {}
+            for line in lines:
+                for name, regex in self.single.items():
+                    if name not in values:
+                        match = regex.search(line)
+                        if match:
+                            values[name] = match.group(1).strip()
+                if len(values) == len(self.single):
+                    break
+            if not any(values.values()):
+                return []
+            return [[values.get(column, "") for column in self.columns]]
+
+        filled = {name: "" for name in self.filldown}
+        rows = []
+        for line in lines:
+            line = line.rstrip()
+            for name, regex in self.filldown.items():
+                if not filled[name]:
+                    match = regex.search(line)
+                    if match:
+                        filled[name] = match.group(1)
+            match = self.row.match(line)
+            if match:
+                values = dict(filled, **match.groupdict())
+                rows.append([values.get(column, "") for column in self.columns])
+        return rows
+
+
+# Vendored templates for the commands the assistant runs most
+TEMPLATES: Dict[str, List[Tuple[Pattern, RegexTemplate]]] = {
+    "cisco_ios": [
+        (command_pattern("sh[[ow]] ip int[[erface]] br[[ief]]"), RegexTemplate(
+            ["interface", "ip_address", "ok", "method", "status", "protocol"],
+            row=r"^(?P<interface>\S+)\s+(?P<ip_address>\S+)\s+(?P<ok>YES|NO)\s+(?P<method>\S+)\s+"
+                r"(?P<status>up|down|administratively down|deleted)\s+(?P<protocol>up|down)$"
+        )),
+        (command_pattern("sh[[ow]] ip bgp summ[[ary]]"), RegexTemplate(
+            ["router_id", "local_as", "neighbor", "version", "remote_as", "msg_rcvd", "msg_sent",
+             "in_q", "out_q", "up_down", "state_pfxrcd"],
+            row=r"^(?P<neighbor>\d+\.\d+\.\d+\.\d+|[0-9a-fA-F:]+:[0-9a-fA-F:]*)\s+(?P<version>4|6)\s+(?P<remote_as>[\d.]+)\s+"
+                r"(?P<msg_rcvd>\d+)\s+(?P<msg_sent>\d+)\s+\d+\s+(?P<in_q>\d+)\s+(?P<out_q>\d+)\s+"
+                r"(?P<up_down>\S+)\s+(?P<state_pfxrcd>.+)$",
+            filldown={
+                "router_id": r"BGP router identifier (\S+),",
+                "local_as": r"local AS number (\S+)",
+            }
+        )),
+        (command_pattern("sh[[ow]] int[[erfaces]] desc[[ription]]"), RegexTemplate(
+            ["interface", "status", "protocol", "description"],
+            row=r"^(?P<interface>\S+)\s+(?P<status>up|down|admin down|deleted)\s+(?P<protocol>up|down)\s*(?P<description>.*)$"
+        )),
+        (command_pattern("sh[[ow]] ip ar[[p]]"), RegexTemplate(
+            ["address", "age", "mac", "type", "interface"],
+            row=r"^Internet\s+(?P<address>\S+)\s+(?P<age>\S+)\s+(?P<mac>[0-9a-fA-F.]+|Incomplete)\s+"
+                r"(?P<type>\S+)\s*(?P<interface>\S*)$"
+        )),
+        (command_pattern("sh[[ow]] ver[[sion]]"), RegexTemplate(
+            ["hostname", "version", "uptime", "image", "hardware", "serial"],
+            single={
+                "hostname": r"^(\S+) uptime is",
+                "version": r"Version ([^,\s]+)",
+                "uptime": r"uptime is (.+)$",
+                "image": r'System image file is "([^"]+)"',
+                "hardware": r"^[Cc]isco (\S+) .*processor",
+                "serial": r"Processor board ID (\S+)",
+            }
+        )),
+    ],
+}
+
+
+class TextFSMParser:
+    """
+    Parse with TextFSM and an ntc-templates style index when textfsm is installed.
+    The template directory comes from NTC_TEMPLATES_DIR or the ntc_templates package.
+    """
+
+    def __init__(self, template_dir: Optional[str] = None):
+        import textfsm.clitable as clitable
+        if template_dir is None:
+            template_dir = os.environ.get('NTC_TEMPLATES_DIR')
+        if template_dir is None:
+            from ntc_templates.parse import _get_template_dir
+            template_dir = _get_template_dir()
+        self.cli_table = clitable.CliTable('index', template_dir)
+
+    def parse(self, platform: str, command: str, text: str) -> Optional[Dict[str, Any]]:
+        table = copy.deepcopy(self.cli_table)
+        try:
+            table.ParseCmd(text, {"Command": command, "Platform": platform})
+        except Exception:
+            return None
+        return {"columns": [c.lower() for c in table.header], "rows": [list(row) for row in table]}
+
+
+_textfsm: Any = None
+
+
+def _textfsm_parser() -> Optional[TextFSMParser]:
+    global _textfsm
+    if _textfsm is None:
+        try:
+            _textfsm = TextFSMParser()
+        except Exception:
+            # textfsm or the templates are not installed, use the vendored templates only
+            _textfsm = False
+    return _textfsm or None
+
+
+def register_template(platform: str, command: str, template: RegexTemplate):
+    """Add or override a template, e.g. register_template('cisco_ios', 'sh[[ow]] clock', ...)."""
+    TEMPLATES.setdefault(platform, []).insert(0, (command_pattern(command), template))
+
+
+def parse_command_output(command: str, text: Any, platform: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Parse CLI output into column-oriented records, {"columns": [...], "rows": [[...]]}.
+    `text` is a string or an OutputCapture, whose lines are streamed through the
+    vendored templates. Returns None when no template matches or nothing parses, so
+    callers can fall back to the raw text.
+    """
+    platform = platform or DEFAULT_PLATFORM
+    # Output filters such as '| exclude unassigned' keep the same columns
+    command = command.split("|", 1)[0].strip()
+    for pattern, template in TEMPLATES.get(platform, []):
+        if pattern.match(command):
+            rows = template.parse_lines(text.splitlines() if isinstance(text, str) else text.iter_lines())
+            if rows:
+                return {"columns": template.columns, "rows": rows}
+            return None
+
+    parser = _textfsm_parser()
+    if parser is not None:
+        # TextFSM needs the whole text
+        parsed = parser.parse(platform, command, text if isinstance(text, str) else text.text())
+        if parsed and parsed["rows"]:
+            return parsed
+    return None
@@ -0,0 +1,364 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import difflib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Running configs carry password hashes, SNMP communities and keys: kept outside the
+# repository, in a directory and file only the owner can read
+DEFAULT_ARCHIVE_PATH = os.path.join(os.path.expanduser('~'), '.network_assistant', 'config_archive.db')
+FULL_CONFIG_COMMAND = "show running-config"
+# Cheap commands printing only the line that changes whenever the running config does
+MARKER_COMMANDS = {
+    "cisco_ios": "show running-config | include Last configuration change",
+    "cisco_nxos": "show running-config | include Running configuration last done|^!Time:",
+}
+DEFAULT_MARKER_PLATFORM = "cisco_ios"
+# Lines that vary between fetches of an unchanged config; kept out of hashes and diffs
+VOLATILE_LINES = re.compile(
+    r"^(?:Building configuration|Current configuration\s*:|!\s*Last configuration change|"
+    r"!\s*NVRAM config last updated|!\s*No configuration change since last restart|"
+    r"!Time:|!Running configuration last done|!Command: show running-config|ntp clock-period)"
+)
+# A running config has at least one of these top-level lines; CLI errors such as
+# '% Invalid input' or '% Authorization failed' have none
+CONFIG_LINE = re.compile(r"^(?:hostname|version|end)\b", re.MULTILINE)
+MARKER_LINE = re.compile(r"^!\s*(?:Last configuration change|Running configuration last done|Time:).*$", re.MULTILINE)
+# Changes listed per diff, the rest are only counted
+DEFAULT_CHANGE_LIMIT = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    router TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    taken_at REAL NOT NULL,
+    checked_at REAL NOT NULL,
+    marker TEXT,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS snapshots_router ON snapshots(router, taken_at);
+CREATE INDEX IF NOT EXISTS snapshots_taken ON snapshots(taken_at);
+"""
+
+
+def is_running_config_command(command: str) -> bool:
+    """True for 'show running-config' and its abbreviations such as 'sh run', with no filters."""
+    words = (command or "").lower().split()
+    return (len(words) == 2 and len(words[0]) >= 2 and "show".startswith(words[0])
+            and len(words[1]) >= 3 and "running-config".startswith(words[1]))
+
+
+def marker_command(platform: Optional[str]) -> str:
+    return MARKER_COMMANDS.get(platform or DEFAULT_MARKER_PLATFORM, MARKER_COMMANDS[DEFAULT_MARKER_PLATFORM])
+
+
+def extract_marker(text: str) -> Optional[str]:
+    """The 'Last configuration change' style line from a config or marker command output."""
+    match = MARKER_LINE.search((text or "").replace("\r", ""))
+    return " ".join(match.group(0).split()) if match else None
+
+
+def is_config_output(text: str) -> bool:
+    """True when a command's output looks like a running config rather than a CLI error."""
+    text = (text or "").replace("\r", "").lstrip()
+    return bool(text) and not text.startswith("%") and CONFIG_LINE.search(text) is not None
+
+
+def normalize_config(text: str) -> str:
+    """Drop volatile header lines and trailing whitespace so unchanged configs hash the same."""
+    lines = [line.rstrip() for line in (text or "").replace("\r", "").split("\n")]
+    lines = [line for line in lines if not VOLATILE_LINES.match(line)]
+    while lines and not lines[0].strip("! "):
+        lines.pop(0)
+    while lines and not lines[-1].strip():
+        lines.pop()
+    return "\n".join(lines) + "\n"
+
+
+def config_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def parse_since(value: Any) -> Optional[float]:
+    """Epoch seconds from '24h', '7d', '30m', an ISO date or date-time, or epoch seconds."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([smhdw])", text.lower())
+    if match:
+        seconds = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}[match.group(2)]
+        return time.time() - float(match.group(1)) * seconds
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    return parsed.timestamp()
+
+
+def _sections(lines: List[str]) -> List[Optional[str]]:
+    # The top-level line each line sits under, e.g. 'interface Gi0/1' for ' shutdown'
+    sections, current = [], None
+    for line in lines:
+        if line and not line[0].isspace() and line != "!":
+            current = line
+        sections.append(current)
+    return sections
+
+
+def config_diff(old: str, new: str, limit: int = DEFAULT_CHANGE_LIMIT) -> Dict[str, Any]:
+    """
+    Line-level diff of two configs grouped by top-level section, so a changed
+    interface setting comes back as {section: 'interface Gi0/1', removed, added}.
+    """
+    old_lines, new_lines = old.splitlines(), new.splitlines()
+    old_sections, new_sections = _sections(old_lines), _sections(new_lines)
+    changes: List[Dict[str, Any]] = []
+    added = removed = 0
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        removed += i2 - i1
+        added += j2 - j1
+        for side, lines, sections, start, end in (("removed", old_lines, old_sections, i1, i2),
+                                                  ("added", new_lines, new_sections, j1, j2)):
+            for index in range(start, end):
+                section = sections[index] if sections[index] != lines[index] else None
+                if not changes or changes[-1]["section"] != section:
+                    changes.append({"section": section, "removed": [], "added": []})
+                changes[-1][side].append(lines[index])
+    return {
+        "added": added,
+        "removed": removed,
+        "truncated": len(changes) > limit,
+        "changes": changes[:limit]
+    }
+
+
+class ConfigArchive:
+    """
+    Running-config snapshots per router in SQLite. Config text is stored once per
+    distinct content (zlib-compressed, keyed by SHA-256 of the normalised config), and
+    a router's history only grows when its config actually changes; otherwise the
+    latest snapshot's checked_at moves forward. Each snapshot keeps the config's
+    'Last configuration change' marker so freshness can be checked without a full fetch.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        # Created owner-only before SQLite opens it; its -wal and -shm files inherit the mode
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(path, 0o600)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    @staticmethod
+    def _snapshot(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        snapshot = dict(row)
+        for field in ("taken_at", "checked_at"):
+            snapshot[field] = datetime.fromtimestamp(snapshot[field]).strftime("%Y-%m-%d %H:%M:%S")
+        return snapshot
+
+    def latest(self, router: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM snapshots WHERE router = ? ORDER BY taken_at DESC, id DESC LIMIT 1",
+                                   (router,)).fetchone()
+        return self._snapshot(row)
+
+    def is_current(self, router: str, marker: Optional[str]) -> bool:
+        """True when the device's marker line matches the latest snapshot's, which then counts as checked."""
+        latest = self.latest(router)
+        if latest is None or not marker or latest["marker"] != marker:
+            return False
+        with self._lock:
+            self._db.execute("UPDATE snapshots SET checked_at = ? WHERE id = ?", (time.time(), latest["id"]))
+            self._db.commit()
+        return True
+
+    def store(self, router: str, text: str, reason: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Archive a fetched running config, returning (latest snapshot, whether the config changed)."""
+        if not is_config_output(text):
+            raise ValueError(f"Not a running config: {(text or '').strip()[:80]!r}")
+        config = normalize_config(text)
+        digest = config_hash(config)
+        marker = extract_marker(text)
+        now = time.time()
+        with self._lock:
+            latest = self._db.execute("SELECT id, hash FROM snapshots WHERE router = ? ORDER BY taken_at DESC, id DESC LIMIT 1",
+                                      (router,)).fetchone()
+            changed = latest is None or latest["hash"] != digest
+            if changed:
+                self._db.execute("INSERT OR IGNORE INTO blobs(hash, size, data) VALUES (?, ?, ?)",
+                                 (digest, len(config), zlib.compress(config.encode("utf-8"), 9)))
+                snapshot_id = self._db.execute(
+                    "INSERT INTO snapshots(router, hash, taken_at, checked_at, marker, reason) VALUES (?, ?, ?, ?, ?, ?)",
+                    (router, digest, now, now, marker, reason)).lastrowid
+            else:
+                snapshot_id = latest["id"]
+                self._db.execute("UPDATE snapshots SET checked_at = ?, marker = COALESCE(?, marker) WHERE id = ?",
+                                 (now, marker, snapshot_id))
+            self._db.commit()
+            row = self._db.execute("SELECT * FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+        if changed:
+            logger.info(f"Archived new running config for {router} ({digest[:12]})")
+        return self._snapshot(row), changed
+
+    def config(self, digest: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row["data"]).decode("utf-8") if row else None
+
+    def snapshot_at(self, router: str, since: Any) -> Optional[Dict[str, Any]]:
+        """
+        The snapshot in force at `since` (a time, '24h' style age, snapshot id or hash
+        prefix); the oldest snapshot when `since` predates the history.
+        """
+        with self._lock:
+            text = str(since).strip()
+            if re.fullmatch(r"[0-9a-f]{7,64}", text) and not text.isdigit():
+                row = self._db.execute("SELECT * FROM snapshots WHERE router = ? AND hash LIKE ? ORDER BY taken_at DESC LIMIT 1",
+                                       (router, text + "%")).fetchone()
+                return self._snapshot(row)
+            if text.isdigit() and len(text) < 9:
+                row = self._db.execute("SELECT * FROM snapshots WHERE router = ? AND id = ?", (router, int(text))).fetchone()
+                return self._snapshot(row)
+            at = parse_since(since)
+            row = self._db.execute("SELECT * FROM snapshots WHERE router = ? AND taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1",
+                                   (router, at)).fetchone()
+            if row is None:
+                row = self._db.execute("SELECT * FROM snapshots WHERE router = ? ORDER BY taken_at, id LIMIT 1",
+                                       (router,)).fetchone()
+        return self._snapshot(row)
+
+    def diff(self, router: str, since: Any, limit: int = DEFAULT_CHANGE_LIMIT) -> Optional[Dict[str, Any]]:
+        """What changed in a router's config between `since` and its latest snapshot."""
+        base, latest = self.snapshot_at(router, since), self.latest(router)
+        if base is None or latest is None:
+            return None
+        result = {"from": base, "to": latest}
+        if base["hash"] == latest["hash"]:
+            return dict(result, added=0, removed=0, truncated=False, changes=[])
+        return dict(result, **config_diff(self.config(base["hash"]), self.config(latest["hash"]), limit))
+
+    def changed_since(self, since: Any) -> Dict[str, int]:
+        """Routers with at least one new config version since `since`, and how many."""
+        with self._lock:
+            rows = self._db.execute("SELECT router, count(*) FROM snapshots WHERE taken_at > ? GROUP BY router ORDER BY router",
+                                    (parse_since(since),)).fetchall()
+        return {router: count for router, count in rows}
+
+    def history(self, router: str, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM snapshots WHERE router = ? ORDER BY taken_at DESC, id DESC LIMIT ?",
+                                    (router, limit)).fetchall()
+        return [self._snapshot(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshots, routers = self._db.execute("SELECT count(*), count(DISTINCT router) FROM snapshots").fetchone()
+            blobs, raw, stored = self._db.execute("SELECT count(*), coalesce(sum(size), 0), coalesce(sum(length(data)), 0) FROM blobs").fetchone()
+        return {"routers": routers, "snapshots": snapshots, "distinct_configs": blobs,
+                "config_bytes": raw, "stored_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def select_sections(config: str, include: Optional[str]) -> str:
+    """Only the top-level sections whose header line contains `include` (case-insensitive)."""
+    if not include:
+        return config
+    needle = include.lower()
+    kept, keep = [], False
+    for line in config.splitlines():
+        if line and not line[0].isspace():
+            keep = needle in line.lower()
+        if keep:
+            kept.append(line)
+    return "\n".join(kept) + ("\n" if kept else "")
+
+
+def refresh_snapshots(routers: Dict[str, Dict[str, Any]], force: bool = False, reason: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Bring the archive up to date for the given inventory routers over SSH. Routers with
+    a snapshot are first asked for their marker line only, and the full running config
+    is fetched just for routers whose marker changed (or all of them with `force`).
+    Returns {router: {"snapshot", "source": "archive" | "device", "changed"} or {"error"}}.
+    """
+    # Imported here, show_commands archives running configs it fetches
+    from tools.show_commands import show_commands
+
+    archive = get_config_archive()
+    results: Dict[str, Any] = {}
+    to_fetch = list(routers) if force else []
+    if not force:
+        by_marker_command: Dict[str, List[str]] = {}
+        for name, info in routers.items():
+            if archive.latest(name) is None:
+                to_fetch.append(name)
+            else:
+                by_marker_command.setdefault(marker_command(info.get('platform')), []).append(name)
+        for command, names in by_marker_command.items():
+            checked = show_commands(command, names, raw=True)
+            for name in names:
+                output = (checked.get("results") or {}).get(name)
+                if isinstance(output, str) and not output.startswith("Error:") and archive.is_current(name, extract_marker(output)):
+                    results[name] = {"snapshot": archive.latest(name), "source": "archive", "changed": False}
+                else:
+                    to_fetch.append(name)
+
+    if to_fetch:
+        before = {name: (archive.latest(name) or {}).get("hash") for name in to_fetch}
+        # show_commands archives each fetched config under `reason`
+        fetched = show_commands(FULL_CONFIG_COMMAND, to_fetch, raw=True, archive_reason=reason)
+        for name in to_fetch:
+            output = (fetched.get("results") or {}).get(name)
+            if not isinstance(output, str) or output.startswith("Error:"):
+                results[name] = {"error": output or fetched.get("message") or "No output"}
+                continue
+            if not is_config_output(output):
+                # Nothing was archived, e.g. '% Invalid input' or an authorization failure
+                results[name] = {"error": f"Error: Not a running config: {output.strip()[:200]}"}
+                continue
+            latest = archive.latest(name)
+            results[name] = {"snapshot": latest, "source": "device",
+                             "changed": latest is not None and latest["hash"] != before[name]}
+    return results
+
+
+_archive: Optional[ConfigArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_config_archive() -> ConfigArchive:
+    """Return the process-wide archive at CONFIG_ARCHIVE_PATH (default ~/.network_assistant/config_archive.db)."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = ConfigArchive(os.environ.get('CONFIG_ARCHIVE_PATH', DEFAULT_ARCHIVE_PATH))
+        return _archive
@@ -1,12 +1,15 @@
 import os
-import paramiko
-import json
 import logging
-import boto3
-import time
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+from paramiko.ssh_exception import AuthenticationException
+from tools.ssh_pool import get_ssh_pool, ssh_backend
+from tools.credentials import get_credential_provider
+from tools.inventory import get_inventory
+from tools.fanout import get_fanout_scheduler
+from tools.shell_reader import ShellReader
+from tools.output_capture import OutputCapture
+from tools.config_archive import get_config_archive, refresh_snapshots, config_diff
+from tools import metrics
 
 # Initialize logger
 logging.basicConfig(level=logging.INFO)
@@ -14,70 +17,51 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-def get_secret(secret_name, region_name=os.environ.get('AWS_REGION_NAME')):
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        response = client.get_secret_value(SecretId=secret_name)
-        secret = response['SecretString']
-        return json.loads(secret)
-    except NoCredentialsError:
-        logger.error("Credentials not available")
-    except PartialCredentialsError:
-        logger.error("Incomplete credentials provided")
-    except Exception as e:
-        logger.error(f"Error retrieving secret: {e}")
-        return None
-
-def load_router_ips(file_path):
-    try:
-        with open(file_path, 'r') as file:
-            data = json.load(file)
-            return data["routers"]
-    except Exception as e:
-        logger.error(f"Error loading router IPs: {e}")
-        return {}
-
 def execute_commands(router_name, router_info, commands, username, password):
+    management_ip = router_info.get('management_ip')
     try:
-        management_ip = router_info.get('management_ip')
-
         if not management_ip:
             raise ValueError(f'Missing management_ip for router: {router_info}')
 
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(management_ip, username=username, password=password, allow_agent=False, look_for_keys=False, timeout=10)
-
-        # Start an interactive shell
-        shell = ssh.invoke_shell()
-        shell.settimeout(30)  # Set a timeout for operations
-
-        output = ""
-        # Send all commands in the same session
-        for command in commands:
-            shell.send(command + '\n')
-            time.sleep(2)  # Wait 2 seconds between commands
-
-            # Wait for and capture the output
-            while shell.recv_ready():
-                output += shell.recv(65535).decode('utf-8')
-                time.sleep(0.5)
-
-        # Close the SSH connection
-        ssh.close()
+        # Reuse an authenticated transport from the shared pool
+        with get_ssh_pool().connection(router_name, management_ip, username, password,
+                                       port=router_info.get('port', 22)) as ssh:
+            # Start an interactive shell
+            with metrics.span("ssh_exec"), OutputCapture() as capture:
+                shell = ssh.invoke_shell()
+                shell.settimeout(30)  # Set a timeout for operations
+                # Session output is decoded incrementally into a capped, spill-to-disk buffer
+                reader = ShellReader(shell, platform=router_info.get('platform'), capture=capture)
+
+                # Read until the device prompt returns rather than sleeping a fixed time
+                reader.wait_for_prompt()
+                # Send all commands in the same session
+                for command in commands:
+                    reader.send_command(command)
+
+                # Close the shell channel, the transport stays in the pool
+                shell.close()
+                output = capture.finish().head()
+                metrics.add_payload_bytes(capture.bytes_received)
 
         return {
             "status": "success",
             "router": router_name,
             "management_ip": management_ip,
-            "output": output
+            "output": output,
+            "timings": reader.timings
         }
 
+    except AuthenticationException as e:
+        # Cached credentials may have been rotated, fetch them again next call
+        get_credential_provider().invalidate(os.environ.get('AWS_SECRETS_NAME'))
+        logger.error(f"Authentication failed on router {router_name}: {str(e)}")
+        return {
+            "status": "error",
+            "router": router_name,
+            "management_ip": management_ip,
+            "error": str(e)
+        }
     except Exception as e:
         logger.error(f"Error executing commands on router {router_name}: {str(e)}")
         return {
@@ -94,7 +78,7 @@ def config_commands(commands, target_routers):
     try:
         # Fetch the username and password from AWS Secrets Manager
         secret_name = os.environ.get('AWS_SECRETS_NAME')
-        credentials = get_secret(secret_name)
+        credentials = get_credential_provider().get(secret_name)
         if not credentials:
             raise ValueError('Could not retrieve credentials from AWS Secrets Manager')
         
@@ -104,22 +88,67 @@ def config_commands(commands, target_routers):
         if not username or not password:
             raise ValueError('Missing username or password in the retrieved credentials')
 
-        # Load router IP addresses from file
-        all_routers = load_router_ips('devices/routers.json')
-        if not all_routers:
+        # Resolve router names, globs or selectors such as 'site:syd role:pe' via the inventory
+        inventory = get_inventory()
+        routers = inventory.resolve(target_routers)
+        if not routers and not inventory.devices:
             raise ValueError('Could not load router IPs from file')
 
-        # Filter routers based on target_routers
-        routers = {k: v for k, v in all_routers.items() if k in target_routers}
-
         if not routers:
             raise ValueError('None of the specified target routers were found in the router configuration file')
 
+        # Snapshot before the push, a marker-line check is enough when the archive is current
+        before = refresh_snapshots(routers, reason="before config_commands")
+
         results = []
-        with ThreadPoolExecutor(max_workers=len(routers)) as executor:
-            future_to_router = {executor.submit(execute_commands, router_name, router_info, commands, username, password): router_name for router_name, router_info in routers.items()}
-            for future in as_completed(future_to_router):
-                results.append(future.result())
+        if ssh_backend() == 'asyncssh':
+            # Every router on one event loop, no thread per session
+            from tools.async_ssh import get_async_ssh_engine, is_auth_error
+            outputs = get_async_ssh_engine().config(routers, commands, username, password)
+            for router_name, output in outputs.items():
+                result = {
+                    "status": "success",
+                    "router": router_name,
+                    "management_ip": routers[router_name].get('management_ip')
+                }
+                if isinstance(output, TimeoutError):
+                    result.update(status="error", error=f"{output}; the push was cancelled part way, check the config before retrying")
+                elif isinstance(output, Exception):
+                    if is_auth_error(output):
+                        get_credential_provider().invalidate(secret_name)
+                    result.update(status="error", error=str(output))
+                else:
+                    result.update(output)
+                results.append(result)
+        else:
+            # Bounded fan-out instead of one thread per router, results arrive as each router finishes
+            scheduler = get_fanout_scheduler()
+            for router_name, result in scheduler.run(
+                routers,
+                lambda router_name, router_info: execute_commands(router_name, router_info, commands, username, password),
+                on_timeout=lambda router_name: {
+                    "status": "error",
+                    "router": router_name,
+                    "management_ip": routers[router_name].get('management_ip'),
+                    # The blocking session cannot be interrupted, so the push carries on
+                    "error": f"No result after {scheduler.config_device_timeout} seconds; the push may still be "
+                             f"running on the router, check the config before retrying"
+                },
+                device_timeout=scheduler.config_device_timeout
+            ):
+                results.append(result)
+
+        # Snapshot after the push and return what changed instead of the whole config
+        pushed = {r["router"]: routers[r["router"]] for r in results if r["status"] == "success"}
+        after = refresh_snapshots(pushed, force=True, reason="after config_commands") if pushed else {}
+        archive = get_config_archive()
+        for result in results:
+            old, new = before.get(result["router"], {}), after.get(result["router"], {})
+            if "snapshot" in old and "snapshot" in new:
+                diff = config_diff(archive.config(old["snapshot"]["hash"]), archive.config(new["snapshot"]["hash"]))
+                result["config_diff"] = dict(diff, before=old["snapshot"]["id"], after=new["snapshot"]["id"])
+            elif result["status"] == "success":
+                result["config_diff"] = {"error": new.get("error") or old.get("error") or "No config snapshot"}
 
         # Prepare response
         response_data = {
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 900
+DEFAULT_REFRESH_MARGIN = 60
+
+
+class SecretsManagerBackend:
+    """Fetch secrets from AWS Secrets Manager through one reused boto3 client."""
+
+    def __init__(self, region_name: Optional[str] = None):
+        self.region_name = region_name
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                import boto3
+                session = boto3.session.Session()
+                self._client = session.client(
+                    service_name='secretsmanager',
+                    region_name=self.region_name
+                )
+            return self._client
+
+    def fetch(self, secret_name: str) -> Dict[str, Any]:
+        response = self._get_client().get_secret_value(SecretId=secret_name)
+        return json.loads(response['SecretString'])
+
+
+class LocalBackend:
+    """
+    Local stand-in for Secrets Manager, serving secrets from a dict or a JSON file of
+    the form {"<secret name>": {"username": ..., "password": ...}}.
+    """
+
+    def __init__(self, secrets: Optional[Dict[str, Dict[str, Any]]] = None, file_path: Optional[str] = None):
+        self.secrets = secrets or {}
+        self.file_path = file_path
+        self.fetch_count = 0
+
+    def fetch(self, secret_name: str) -> Dict[str, Any]:
+        self.fetch_count += 1
+        secrets = self.secrets
+        if self.file_path:
+            with open(self.file_path, 'r') as file:
+                secrets = json.load(file)
+        if secret_name not in secrets:
+            raise KeyError(f"Secret not found: {secret_name}")
+        return dict(secrets[secret_name])
+
+
+class CredentialProvider:
+    """
+    In-memory credential cache in front of a secrets backend. Entries live for `ttl`
+    seconds and are refreshed in the background once they are within `refresh_margin`
+    of expiring, so callers only block on the very first fetch.
+    """
+
+    def __init__(self, backend, ttl: float = DEFAULT_TTL, refresh_margin: float = DEFAULT_REFRESH_MARGIN):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._refreshing = set()
+
+    def _fetch(self, secret_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            secret = self.backend.fetch(secret_name)
+        except Exception as e:
+            logger.error(f"Error retrieving secret: {e}")
+            return None
+        with self._lock:
+            self._cache[secret_name] = {"value": secret, "expires": time.monotonic() + self.ttl}
+        return secret
+
+    def _refresh_in_background(self, secret_name: str):
+        with self._lock:
+            if secret_name in self._refreshing:
+                return
+            self._refreshing.add(secret_name)
+
+        def refresh():
+            try:
+                self._fetch(secret_name)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(secret_name)
+
+        threading.Thread(target=refresh, name=f"credential-refresh-{secret_name}", daemon=True).start()
+
+    def get(self, secret_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(secret_name)
+        now = time.monotonic()
+        if entry is None or now >= entry["expires"]:
+            return self._fetch(secret_name)
+        if entry["expires"] - now <= self.refresh_margin:
+            self._refresh_in_background(secret_name)
+        return entry["value"]
+
+    def invalidate(self, secret_name: Optional[str] = None):
+        """Drop cached credentials, e.g. after the devices reject them."""
+        with self._lock:
+            if secret_name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(secret_name, None)
+
+
+_provider: Optional[CredentialProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_credential_provider() -> CredentialProvider:
+    """
+    Return the process-wide credential provider. Set LOCAL_SECRETS_FILE to serve secrets
+    from a local JSON file instead of AWS Secrets Manager.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            local_file = os.environ.get('LOCAL_SECRETS_FILE')
+            if local_file:
+                backend = LocalBackend(file_path=local_file)
+            else:
+                backend = SecretsManagerBackend(region_name=os.environ.get('AWS_REGION_NAME'))
+            _provider = CredentialProvider(
+                backend,
+                ttl=float(os.environ.get('CREDENTIALS_TTL', DEFAULT_TTL))
+            )
+        return _provider
@@ -0,0 +1,193 @@
+import os
+import time
+import random
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+from typing import Dict, Any, Callable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_PER_SITE_LIMIT = 8
+# New sessions started per second across the process, 0 disables the ramp
+DEFAULT_RAMP_RATE = 50
+DEFAULT_JITTER = 0.05
+DEFAULT_DEVICE_TIMEOUT = 120
+# Config pushes get longer, within config_commands' 300s tool timeout
+DEFAULT_CONFIG_DEVICE_TIMEOUT = 280
+# How often a run waiting on sites held by other tool calls checks them again
+SITE_POLL_INTERVAL = 0.05
+
+
+class FanoutScheduler:
+    """
+    Run one task per device with a process-wide concurrency cap, a per-site cap, a
+    jittered ramp-up of new sessions and a per-device deadline (longer for config
+    pushes, see config_device_timeout). Results are yielded
+    as each device finishes, so callers can stream partial results.
+
+    The caps are shared by every concurrent tool call, so two fleet-wide commands
+    together still never exceed `max_concurrency` sessions against the AAA servers.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        per_site_limit: int = DEFAULT_PER_SITE_LIMIT,
+        ramp_rate: float = DEFAULT_RAMP_RATE,
+        jitter: float = DEFAULT_JITTER,
+        device_timeout: float = DEFAULT_DEVICE_TIMEOUT,
+        config_device_timeout: float = DEFAULT_CONFIG_DEVICE_TIMEOUT
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_site_limit = per_site_limit
+        self.ramp_rate = ramp_rate
+        self.jitter = jitter
+        self.device_timeout = device_timeout
+        self.config_device_timeout = config_device_timeout
+        self._global = threading.BoundedSemaphore(max_concurrency)
+        self._sites: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def _site_slot(self, site: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if site not in self._sites:
+                self._sites[site] = threading.BoundedSemaphore(self.per_site_limit)
+            return self._sites[site]
+
+    def _ramp(self):
+        # Space session starts 1/ramp_rate apart, plus jitter to avoid lockstep
+        if self.ramp_rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + 1.0 / self.ramp_rate
+        delay = start - now + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def run(
+        self,
+        devices: Dict[str, Dict[str, Any]],
+        task: Callable[[str, Dict[str, Any]], Any],
+        on_timeout: Optional[Callable[[str], Any]] = None,
+        device_timeout: Optional[float] = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield (device name, result) pairs in completion order. A device still running
+        `device_timeout` seconds (default the scheduler's) after it started yields
+        on_timeout(name) instead; its thread is left to finish in the background.
+
+        A device is only handed to a worker once its site has a free slot, taking the
+        sites in turn, so routers queued behind a busy site never tie up the workers
+        that other sites could use.
+        """
+        if not devices:
+            return
+        device_timeout = self.device_timeout if device_timeout is None else device_timeout
+        started: Dict[str, float] = {}
+        queues: Dict[str, deque] = {}
+        for name, info in devices.items():
+            queues.setdefault(str(info.get('site', '')), deque()).append((name, info))
+
+        def worker(site_slot, name, info):
+            # The site slot was taken by the dispatcher and is released here
+            try:
+                with self._global:
+                    self._ramp()
+                    started[name] = time.monotonic()
+                    return task(name, info)
+            finally:
+                site_slot.release()
+
+        workers = min(len(devices), self.max_concurrency)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fanout")
+        pending: Dict[Any, str] = {}
+        site_slots: Dict[Any, threading.BoundedSemaphore] = {}
+
+        def dispatch():
+            # Round-robin over the sites, skipping any whose slots are all taken
+            while queues and len(pending) < workers:
+                submitted = False
+                for site in list(queues):
+                    if len(pending) >= workers:
+                        break
+                    site_slot = self._site_slot(site)
+                    if not site_slot.acquire(blocking=False):
+                        continue
+                    name, info = queues[site].popleft()
+                    if not queues[site]:
+                        del queues[site]
+                    try:
+                        # Each worker runs in a copy of the caller's context, so metrics reach the calling tool
+                        future = executor.submit(contextvars.copy_context().run, worker, site_slot, name, info)
+                    except BaseException:
+                        site_slot.release()
+                        raise
+                    pending[future] = name
+                    site_slots[future] = site_slot
+                    submitted = True
+                if not submitted:
+                    return
+
+        try:
+            dispatch()
+            while pending or queues:
+                now = time.monotonic()
+                deadlines = [started[name] + device_timeout for name in pending.values() if name in started]
+                timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                if queues:
+                    # Slots held by other tool calls free up without a completion here
+                    timeout = SITE_POLL_INTERVAL if timeout is None else min(timeout, SITE_POLL_INTERVAL)
+                if pending:
+                    done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    done = set()
+                    time.sleep(timeout)
+                for future in done:
+                    name = pending.pop(future)
+                    site_slots.pop(future)
+                    try:
+                        yield name, future.result()
+                    except Exception as e:
+                        logger.error(f"Fan-out task failed on {name}: {e}")
+                        yield name, {"error": str(e)}
+                now = time.monotonic()
+                for future, name in list(pending.items()):
+                    if name in started and now - started[name] >= device_timeout:
+                        del pending[future]
+                        site_slots.pop(future)
+                        logger.error(f"Device {name} exceeded its {device_timeout}s deadline")
+                        yield name, on_timeout(name) if on_timeout else {"error": f"Timed out after {device_timeout} seconds"}
+                dispatch()
+        finally:
+            # Cancels devices that never started if the caller stops consuming early
+            executor.shutdown(wait=False, cancel_futures=True)
+            for future, site_slot in site_slots.items():
+                # A cancelled worker never ran, so its site slot is released here
+                if future.cancelled():
+                    site_slot.release()
+
+
+_scheduler: Optional[FanoutScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_fanout_scheduler() -> FanoutScheduler:
+    """Return the process-wide scheduler, configured from SSH_MAX_CONCURRENCY and friends."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FanoutScheduler(
+                max_concurrency=int(os.environ.get('SSH_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)),
+                per_site_limit=int(os.environ.get('SSH_PER_SITE_LIMIT', DEFAULT_PER_SITE_LIMIT)),
+                ramp_rate=float(os.environ.get('SSH_RAMP_RATE', DEFAULT_RAMP_RATE)),
+                device_timeout=float(os.environ.get('SSH_DEVICE_TIMEOUT', DEFAULT_DEVICE_TIMEOUT)),
+                config_device_timeout=float(os.environ.get('SSH_CONFIG_DEVICE_TIMEOUT', DEFAULT_CONFIG_DEVICE_TIMEOUT))
+            )
+        return _scheduler
@@ -0,0 +1,158 @@
+import re
+import time
+import difflib
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+from tools.librenms_client import get_librenms_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_TTL = 300
+# Minimum index age before a failed lookup triggers a rebuild
+MIN_REBUILD_INTERVAL = 10
+
+# Canonical interface type names keyed by their common abbreviations
+INTERFACE_ABBREVIATIONS = {
+    "gi": "gigabitethernet",
+    "ge": "gigabitethernet",
+    "te": "tengigabitethernet",
+    "tengig": "tengigabitethernet",
+    "twe": "twentyfivegige",
+    "fo": "fortygigabitethernet",
+    "hu": "hundredgige",
+    "fa": "fastethernet",
+    "et": "ethernet",
+    "eth": "ethernet",
+    "lo": "loopback",
+    "po": "port-channel",
+    "tu": "tunnel",
+    "vl": "vlan",
+    "se": "serial",
+    "mgmt": "management",
+}
+_CANONICAL_TYPES = sorted(set(INTERFACE_ABBREVIATIONS.values()), key=len, reverse=True)
+
+_NAME_RE = re.compile(r"^([a-z\-]+)\s*(.*)$")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def normalize_interface_name(name: str) -> str:
+    """
+    Reduce an interface name to a canonical key, so 'Gi0/1', 'gi 0/1' and
+    'GigabitEthernet0/1' all normalise to 'gigabitethernet0/1'.
+    """
+    name = (name or "").strip().lower().replace(" ", "")
+    match = _NAME_RE.match(name)
+    if not match:
+        return name
+    prefix, rest = match.groups()
+    if prefix in INTERFACE_ABBREVIATIONS:
+        prefix = INTERFACE_ABBREVIATIONS[prefix]
+    elif prefix not in _CANONICAL_TYPES:
+        # Any unambiguous leading part of a canonical type, e.g. 'gigabit' or 'loop'
+        candidates = [t for t in _CANONICAL_TYPES if t.startswith(prefix)]
+        if len(candidates) == 1:
+            prefix = candidates[0]
+    return prefix + rest
+
+
+def _loose(key: str) -> str:
+    # The original lookup ignored '/' so 'ethernet00' matched 'Ethernet0/0'
+    return key.replace("/", "")
+
+
+class DeviceInterfaceIndex:
+    """Normalised ifName and ifAlias to port_id maps for one device."""
+
+    def __init__(self, device_id: Any, ports: List[Dict[str, Any]]):
+        self.device_id = device_id
+        self.built = time.monotonic()
+        self.ports = ports
+        self.by_name: Dict[str, Any] = {}
+        self.by_alias: Dict[str, Any] = {}
+        self.by_loose: Dict[str, Any] = {}
+        for port in ports:
+            port_id = port.get('port_id')
+            if port_id is None:
+                continue
+            for field, index in (('ifName', self.by_name), ('ifAlias', self.by_alias)):
+                value = port.get(field)
+                if value:
+                    key = normalize_interface_name(value)
+                    index.setdefault(key, port_id)
+                    self.by_loose.setdefault(_loose(key), port_id)
+
+    def lookup(self, interface_name: str, fuzzy_cutoff: float = 0.85) -> Optional[Any]:
+        key = normalize_interface_name(interface_name)
+        for index in (self.by_name, self.by_alias):
+            if key in index:
+                return index[key]
+        if _loose(key) in self.by_loose:
+            return self.by_loose[_loose(key)]
+        # Last resort, closest name or alias above the cutoff. Numbers must match
+        # exactly so 'Gi0/9' never resolves to 'Gi0/1'.
+        numbers = _DIGITS_RE.findall(key)
+        candidates = [c for c in list(self.by_name) + list(self.by_alias) if _DIGITS_RE.findall(c) == numbers]
+        close = difflib.get_close_matches(key, candidates, n=1, cutoff=fuzzy_cutoff)
+        if close:
+            return self.by_name.get(close[0], self.by_alias.get(close[0]))
+        return None
+
+    def available(self) -> List[str]:
+        return [f"{port.get('ifName', '')} ({port.get('ifAlias', '')})" for port in self.ports]
+
+
+class InterfaceIndex:
+    """
+    Per-device interface indexes built from one bulk port search per device and
+    rebuilt after `ttl` seconds, so repeated lookups skip the port search entirely.
+    """
+
+    def __init__(self, client, ttl: float = DEFAULT_INDEX_TTL):
+        self.client = client
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._devices: Dict[Any, DeviceInterfaceIndex] = {}
+
+    def _build(self, device_id: Any) -> DeviceInterfaceIndex:
+        search_result = self.client.get_json(f"ports/search/device_id/{device_id}/", bypass_cache=True)
+        index = DeviceInterfaceIndex(device_id, search_result.get('ports', []))
+        with self._lock:
+            self._devices[str(device_id)] = index
+        return index
+
+    def device(self, device_id: Any, refresh: bool = False) -> DeviceInterfaceIndex:
+        with self._lock:
+            index = self._devices.get(str(device_id))
+        if refresh or index is None or time.monotonic() - index.built > self.ttl:
+            index = self._build(device_id)
+        return index
+
+    def lookup(self, device_id: Any, interface_name: str) -> Optional[Any]:
+        index = self.device(device_id)
+        port_id = index.lookup(interface_name)
+        if port_id is None and time.monotonic() - index.built > MIN_REBUILD_INTERVAL:
+            # The interface may have been added since the index was built
+            port_id = self.device(device_id, refresh=True).lookup(interface_name)
+        return port_id
+
+    def invalidate(self, device_id: Any = None):
+        with self._lock:
+            if device_id is None:
+                self._devices.clear()
+            else:
+                self._devices.pop(str(device_id), None)
+
+
+_index: Optional[InterfaceIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_interface_index() -> InterfaceIndex:
+    """Return the process-wide interface index backed by the shared LibreNMS client."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = InterfaceIndex(get_librenms_client())
+        return _index
@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import bisect
+import fnmatch
+import logging
+import argparse
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INVENTORY_FILE = 'devices/routers.json'
+# Minimum seconds between checks of the inventory file's modification time
+STAT_INTERVAL = 1.0
+# Attributes that get their own index, each device may carry a list of tags
+INDEXED_FIELDS = ("site", "role", "platform")
+GLOB_CHARS = "*?["
+
+
+class _Snapshot:
+    """
+    One loaded inventory and its indexes. Never modified once built; a reload builds a
+    new snapshot and swaps it in with a single assignment, so a resolve that holds a
+    reference sees one consistent inventory.
+    """
+
+    __slots__ = ("devices", "groups", "sorted_names", "by_ip", "indexes")
+
+    def __init__(self, devices: Dict[str, Dict[str, Any]], groups: Dict[str, List[str]]):
+        indexes: Dict[str, Dict[str, Set[str]]] = {field: {} for field in INDEXED_FIELDS + ("tag",)}
+        by_ip = {}
+        for name, info in devices.items():
+            if info.get('management_ip'):
+                by_ip[info['management_ip']] = name
+            for field in INDEXED_FIELDS:
+                if info.get(field):
+                    indexes[field].setdefault(str(info[field]).lower(), set()).add(name)
+            for tag in info.get('tags', []):
+                indexes["tag"].setdefault(str(tag).lower(), set()).add(name)
+        self.devices = devices
+        self.groups = groups
+        self.sorted_names = sorted(devices)
+        self.by_ip = by_ip
+        self.indexes = indexes
+
+    def glob_names(self, pattern: str) -> Set[str]:
+        # Only scan names sharing the pattern's literal prefix
+        cut = min([pattern.find(c) for c in GLOB_CHARS if c in pattern] or [len(pattern)])
+        prefix = pattern[:cut]
+        start = bisect.bisect_left(self.sorted_names, prefix)
+        matches = set()
+        for name in self.sorted_names[start:]:
+            if not name.startswith(prefix):
+                break
+            if fnmatch.fnmatchcase(name, pattern):
+                matches.add(name)
+        return matches
+
+    def term(self, term: str, seen_groups: Set[str]) -> Set[str]:
+        if ":" not in term:
+            if any(c in term for c in GLOB_CHARS):
+                return self.glob_names(term)
+            if term in self.devices:
+                return {term}
+            return {self.by_ip[term]} if term in self.by_ip else set()
+
+        key, value = term.split(":", 1)
+        key = key.lower()
+        if key == "name":
+            return self.term(value, seen_groups)
+        if key == "ip":
+            return {self.by_ip[value]} if value in self.by_ip else set()
+        if key == "group":
+            if value in seen_groups:
+                return set()
+            return self.resolve(self.groups.get(value, []), seen_groups | {value})
+        index = self.indexes.get(key)
+        if index is None:
+            logger.warning(f"Unknown inventory selector: {term}")
+            return set()
+        value = value.lower()
+        if any(c in value for c in GLOB_CHARS):
+            return set().union(*[names for v, names in index.items() if fnmatch.fnmatchcase(v, value)])
+        return set(index.get(value, ()))
+
+    def resolve(self, selectors: Iterable[str], seen_groups: Set[str]) -> Set[str]:
+        matched: Set[str] = set()
+        for selector in selectors:
+            # Terms within one selector must all match, start from the smallest set
+            term_sets = sorted((self.term(term, seen_groups) for term in selector.split()), key=len)
+            if term_sets:
+                matched |= set.intersection(*term_sets)
+        return matched
+
+
+class Inventory:
+    """
+    Device inventory loaded once from a routers.json style file and reloaded when the
+    file changes. Devices are indexed by name, management IP, site, role, platform and
+    tag, and selectors resolve through those indexes:
+
+        cisco-r1             exact name
+        cisco-r*             glob on names
+        site:syd role:pe     every device matching all terms
+        tag:edge             devices carrying a tag
+        ip:192.168.20.201    device with a management IP
+        group:core           a named group from the file's "groups" section
+    """
+
+    def __init__(self, file_path: str = DEFAULT_INVENTORY_FILE):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._snapshot = _Snapshot({}, {})
+
+    @property
+    def devices(self) -> Dict[str, Dict[str, Any]]:
+        return self._snapshot.devices
+
+    @property
+    def groups(self) -> Dict[str, List[str]]:
+        return self._snapshot.groups
+
+    def load(self, force: bool = False):
+        """Load the file if it changed since the last load, checking at most once per STAT_INTERVAL."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._mtime is not None and now - self._checked < STAT_INTERVAL:
+                return
+            self._checked = now
+            try:
+                mtime = os.stat(self.file_path).st_mtime
+                if not force and mtime == self._mtime:
+                    return
+                with open(self.file_path, 'r') as file:
+                    data = json.load(file)
+                snapshot = _Snapshot(data.get("routers", {}), data.get("groups", {}))
+                self._snapshot = snapshot
+                self._mtime = mtime
+                logger.info(f"Loaded {len(snapshot.devices)} devices from {self.file_path}")
+            except Exception as e:
+                logger.error(f"Error loading router IPs: {e}")
+
+    def resolve(self, selectors: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {name: device info} for every device matched by any of the selectors."""
+        self.load()
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        # Names and device entries come from the same snapshot even if a reload swaps it meanwhile
+        snapshot = self._snapshot
+        names = snapshot.resolve(selectors, set())
+        return {name: snapshot.devices[name] for name in sorted(names)}
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        self.load()
+        return self._snapshot.devices.get(name)
+
+
+def from_librenms_devices(devices: List[Dict[str, Any]], name_field: str = "sysName") -> Dict[str, Dict[str, Any]]:
+    """Convert a LibreNMS /devices payload into routers.json device entries."""
+    routers = {}
+    for device in devices:
+        name = device.get(name_field) or device.get("hostname")
+        if not name:
+            continue
+        entry = {
+            "management_ip": device.get("ip") or device.get("hostname"),
+            "librenms_hostname": device.get("hostname"),
+            "librenms_device_id": device.get("device_id"),
+        }
+        if device.get("location"):
+            entry["site"] = device["location"]
+        if device.get("type"):
+            entry["role"] = device["type"]
+        if device.get("os"):
+            entry["platform"] = {"ios": "cisco_ios", "iosxe": "cisco_ios", "nxos": "cisco_nxos",
+                                 "junos": "juniper_junos", "arista_eos": "arista_eos"}.get(device["os"], device["os"])
+        routers[name] = entry
+    return routers
+
+
+_inventory: Optional[Inventory] = None
+_inventory_lock = threading.Lock()
+
+
+def get_inventory() -> Inventory:
+    """Return the process-wide inventory for INVENTORY_FILE (default devices/routers.json)."""
+    global _inventory
+    with _inventory_lock:
+        if _inventory is None:
+            _inventory = Inventory(os.environ.get('INVENTORY_FILE', DEFAULT_INVENTORY_FILE))
+        return _inventory
+
+
+# Import a LibreNMS /devices snapshot into an inventory file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a LibreNMS /devices snapshot into a routers.json inventory")
+    parser.add_argument("snapshot", help="JSON file saved from the LibreNMS /devices endpoint")
+    parser.add_argument("--output", default=DEFAULT_INVENTORY_FILE)
+    parser.add_argument("--name-field", default="sysName")
+    parser.add_argument("--merge", action="store_true", help="Keep devices already in the output file")
+    args = parser.parse_args()
+
+    with open(args.snapshot, 'r') as file:
+        snapshot = json.load(file)
+    routers = from_librenms_devices(snapshot.get("devices", snapshot), args.name_field)
+
+    data = {"routers": {}}
+    if args.merge and os.path.exists(args.output):
+        with open(args.output, 'r') as file:
+            data = json.load(file)
+    data.setdefault("routers", {}).update(routers)
+    with open(args.output, 'w') as file:
+        json.dump(data, file, indent=2)
+    print(f"Wrote {len(data['routers'])} devices to {args.output}")
@@ -0,0 +1,443 @@
+import os
+import re
+import time
+import logging
+import ipaddress
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background snapshot refreshes, 0 disables the index
+DEFAULT_REFRESH_INTERVAL = 300
+# Snapshot endpoints: every ARP entry LibreNMS knows, and every known network.
+# LibreNMS only keeps IPv4 ARP entries, so the host index is IPv4 only.
+ARP_SNAPSHOT_PATH = "resources/ip/arp/0.0.0.0/0"
+NETWORKS_PATH = "resources/ip/networks"
+# Networks inside a queried prefix returned per lookup, the rest are only counted
+DEFAULT_NETWORK_LIMIT = 200
+# Seconds a lookup waits for the first background build before going to LibreNMS
+DEFAULT_READY_WAIT = 10
+
+_MAC_CHARS_RE = re.compile(r"[^0-9a-f]")
+_MAC_RE = re.compile(r"^(?:[0-9a-fA-F]{2}[:-]){5}[0-9a-fA-F]{2}$|^(?:[0-9a-fA-F]{4}\.){2}[0-9a-fA-F]{4}$|^[0-9a-fA-F]{12}$")
+
+
+def normalize_mac(value: str) -> Optional[str]:
+    """Reduce 'AA:BB:CC:DD:EE:FF', 'aabb.ccdd.eeff' or 'aabbccddeeff' to 'aabbccddeeff'."""
+    value = (value or "").strip()
+    if not _MAC_RE.match(value):
+        return None
+    return _MAC_CHARS_RE.sub("", value.lower())
+
+
+def parse_prefix(value: Any) -> Optional[Tuple[int, int, int]]:
+    """Parse an address or CIDR into (version, network int, prefix length), None if it is neither."""
+    try:
+        network = ipaddress.ip_network(str(value).strip(), strict=False)
+    except ValueError:
+        return None
+    return network.version, int(network.network_address), network.prefixlen
+
+
+class _Node:
+    __slots__ = ("key", "length", "value", "children")
+
+    def __init__(self, key: int, length: int, value: Any = None):
+        self.key = key
+        self.length = length
+        self.value = value
+        self.children: List[Optional["_Node"]] = [None, None]
+
+
+class PrefixTree:
+    """
+    Path-compressed binary radix tree of prefixes of one address width (32 or 128 bits).
+    Each stored prefix carries a value; internal branch nodes carry None.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self.root: Optional[_Node] = None
+        self.size = 0
+
+    def _bit(self, key: int, position: int) -> int:
+        return (key >> (self.width - 1 - position)) & 1
+
+    def _truncate(self, key: int, length: int) -> int:
+        shift = self.width - length
+        return (key >> shift) << shift if length else 0
+
+    def _common(self, a: int, a_length: int, b: int, b_length: int) -> int:
+        difference = a ^ b
+        common = self.width - difference.bit_length() if difference else self.width
+        return min(common, a_length, b_length)
+
+    def _replace(self, parent: Optional[_Node], side: int, node: Optional[_Node]):
+        if parent is None:
+            self.root = node
+        else:
+            parent.children[side] = node
+
+    def insert(self, key: int, length: int, value: Any):
+        key = self._truncate(key, length)
+        parent, side, node = None, 0, self.root
+        while node is not None:
+            common = self._common(node.key, node.length, key, length)
+            if common < node.length:
+                # Split the edge above `node` at the first differing bit
+                if common == length:
+                    branch = _Node(key, length, value)
+                else:
+                    branch = _Node(self._truncate(key, common), common)
+                    branch.children[self._bit(key, common)] = _Node(key, length, value)
+                branch.children[self._bit(node.key, common)] = node
+                self._replace(parent, side, branch)
+                self.size += 1
+                return
+            if length == node.length:
+                if node.value is None:
+                    self.size += 1
+                node.value = value
+                return
+            parent, side = node, self._bit(key, node.length)
+            node = node.children[side]
+        self._replace(parent, side, _Node(key, length, value))
+        self.size += 1
+
+    def get(self, key: int, length: int) -> Any:
+        key = self._truncate(key, length)
+        node = self.root
+        while node is not None and node.length <= length:
+            if self._common(node.key, node.length, key, length) < node.length:
+                return None
+            if node.length == length:
+                return node.value
+            node = node.children[self._bit(key, node.length)]
+        return None
+
+    def delete(self, key: int, length: int) -> bool:
+        key = self._truncate(key, length)
+        path: List[Tuple[Optional[_Node], int]] = []
+        parent, side, node = None, 0, self.root
+        while node is not None and node.length <= length:
+            if self._common(node.key, node.length, key, length) < node.length:
+                return False
+            if node.length == length:
+                break
+            path.append((parent, side))
+            parent, side = node, self._bit(key, node.length)
+            node = node.children[side]
+        else:
+            return False
+        if node.value is None:
+            return False
+        node.value = None
+        self.size -= 1
+        # Drop the emptied node, then any branch node left with a single child
+        while node is not None and node.value is None:
+            live = [child for child in node.children if child is not None]
+            if len(live) > 1:
+                break
+            self._replace(parent, side, live[0] if live else None)
+            if not path:
+                break
+            node = parent
+            parent, side = path.pop()
+        return True
+
+    def longest_match(self, key: int, length: Optional[int] = None) -> Optional[Tuple[int, int, Any]]:
+        """Return (key, length, value) of the most specific stored prefix covering key/length."""
+        length = self.width if length is None else length
+        best = None
+        node = self.root
+        while node is not None and node.length <= length:
+            if self._common(node.key, node.length, key, length) < node.length:
+                break
+            if node.value is not None:
+                best = (node.key, node.length, node.value)
+            if node.length == length:
+                break
+            node = node.children[self._bit(key, node.length)]
+        return best
+
+    def covering(self, key: int, length: int) -> Iterator[Tuple[int, int, Any]]:
+        """Yield stored prefixes that contain key/length, least specific first."""
+        node = self.root
+        while node is not None and node.length <= length:
+            if self._common(node.key, node.length, key, length) < node.length:
+                return
+            if node.value is not None:
+                yield node.key, node.length, node.value
+            if node.length == length:
+                return
+            node = node.children[self._bit(key, node.length)]
+
+    def within(self, key: int, length: int) -> Iterator[Tuple[int, int, Any]]:
+        """Yield stored prefixes inside key/length (including itself), in address order."""
+        key = self._truncate(key, length)
+        node = self.root
+        while node is not None and node.length < length:
+            if self._common(node.key, node.length, key, length) < node.length:
+                return
+            node = node.children[self._bit(key, node.length)]
+        if node is None or self._common(node.key, node.length, key, length) < length:
+            return
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.value is not None:
+                yield node.key, node.length, node.value
+            for child in reversed(node.children):
+                if child is not None:
+                    stack.append(child)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def _format_prefix(version: int, key: int, length: int) -> str:
+    network_class = ipaddress.IPv4Network if version == 4 else ipaddress.IPv6Network
+    return str(network_class((key, length)))
+
+
+def _entry_address(entry: Dict[str, Any]) -> Optional[str]:
+    return entry.get("ipv4_address")
+
+
+def _arp_key(entry: Dict[str, Any]) -> str:
+    return f"{entry.get('device_id')}|{entry.get('port_id')}|{entry.get('context_name') or ''}"
+
+
+class IPIndex:
+    """
+    Local ARP and network index built from bulk LibreNMS snapshots. ARP entries sit in
+    an IPv4 host prefix tree (plus a MAC to IP map), networks in per-family prefix
+    trees, so address, CIDR, MAC and longest-prefix lookups never leave the process.
+    Refreshes diff the new snapshot against the index and apply only the changes.
+    """
+
+    def __init__(self, client_factory, refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
+        self.client_factory = client_factory
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self._built = threading.Event()
+        self._hosts = PrefixTree(32)
+        self._networks = {4: PrefixTree(32), 6: PrefixTree(128)}
+        # address -> {device|port|context: entry}
+        self._arp: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._by_mac: Dict[str, set] = {}
+        self.refreshed: Optional[float] = None
+        self.last_change: Dict[str, int] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed is not None
+
+    def wait_ready(self, timeout: float = DEFAULT_READY_WAIT) -> bool:
+        """Wait up to `timeout` seconds for the first build, True once the index is ready."""
+        return self._built.wait(timeout)
+
+    def age(self) -> Optional[float]:
+        return time.monotonic() - self.refreshed if self.refreshed is not None else None
+
+    def _set_arp(self, address: str, entries: Dict[str, Dict[str, Any]]):
+        for entry in self._arp.get(address, {}).values():
+            mac = normalize_mac(entry.get("mac_address") or "")
+            if mac and mac in self._by_mac:
+                self._by_mac[mac].discard(address)
+                if not self._by_mac[mac]:
+                    del self._by_mac[mac]
+        try:
+            parsed = ipaddress.IPv4Address(address)
+        except ValueError:
+            return
+        tree = self._hosts
+        if entries:
+            self._arp[address] = entries
+            tree.insert(int(parsed), tree.width, entries)
+            for entry in entries.values():
+                mac = normalize_mac(entry.get("mac_address") or "")
+                if mac:
+                    self._by_mac.setdefault(mac, set()).add(address)
+        else:
+            self._arp.pop(address, None)
+            tree.delete(int(parsed), tree.width)
+
+    def apply_arp(self, entries: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Replace the ARP table with a full snapshot, touching only addresses whose entries changed."""
+        # Grouped by the address text as LibreNMS sends it, so unchanged addresses are never parsed
+        snapshot: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for entry in entries:
+            address = _entry_address(entry)
+            if address:
+                snapshot.setdefault(address, {})[_arp_key(entry)] = entry
+        changes = {"added": 0, "changed": 0, "removed": 0}
+        with self._lock:
+            for address in [a for a in self._arp if a not in snapshot]:
+                self._set_arp(address, {})
+                changes["removed"] += 1
+            for address, address_entries in snapshot.items():
+                old = self._arp.get(address)
+                if old == address_entries:
+                    continue
+                changes["changed" if old else "added"] += 1
+                self._set_arp(address, address_entries)
+        return changes
+
+    def apply_networks(self, networks: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Replace the network table with a full snapshot, touching only prefixes that changed."""
+        snapshot: Dict[Tuple[int, int, int], List[Dict[str, Any]]] = {}
+        for network in networks:
+            cidr = next((v for k, v in network.items() if k.endswith("network") and v), None)
+            parsed = parse_prefix(cidr)
+            if parsed is not None:
+                snapshot.setdefault(parsed, []).append(network)
+        changes = {"added": 0, "changed": 0, "removed": 0}
+        with self._lock:
+            for version, tree in self._networks.items():
+                for key, length, _ in list(tree.within(0, 0)):
+                    if (version, key, length) not in snapshot:
+                        tree.delete(key, length)
+                        changes["removed"] += 1
+            for (version, key, length), records in snapshot.items():
+                old = self._networks[version].get(key, length)
+                if old == records:
+                    continue
+                changes["changed" if old else "added"] += 1
+                self._networks[version].insert(key, length, records)
+        return changes
+
+    def refresh(self) -> Dict[str, Any]:
+        """Fetch both snapshots and apply the differences; concurrent callers share one refresh."""
+        with self._refresh_lock:
+            client = self.client_factory()
+            start = time.perf_counter()
+            arp = client.get_json(ARP_SNAPSHOT_PATH, bypass_cache=True)
+            networks = client.get_json(NETWORKS_PATH, bypass_cache=True)
+            network_list = next((v for v in networks.values() if isinstance(v, list)), []) \
+                if isinstance(networks, dict) else networks
+            self.last_change = {
+                "arp": self.apply_arp(arp.get("arp") or []),
+                "networks": self.apply_networks(network_list or []),
+                "seconds": round(time.perf_counter() - start, 3)
+            }
+            self.refreshed = time.monotonic()
+            self._built.set()
+            logger.info(f"IP index refreshed: {self.last_change}")
+            return self.last_change
+
+    def start_refreshing(self):
+        """Build the index and keep it current from a daemon thread, every refresh_interval seconds."""
+        if self._refresher is not None or self.refresh_interval <= 0:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning(f"IP index refresh failed: {e}")
+                if self._stop.wait(self.refresh_interval):
+                    return
+
+        self._refresher = threading.Thread(target=loop, name="ip-index-refresh", daemon=True)
+        self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def arp_lookup(self, query: str, device: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        ARP entries for an address, CIDR, MAC or 'all' (with a device ID). Returns None
+        when the query is one the index cannot answer, e.g. 'all' for a device hostname
+        or an IPv6 address.
+        """
+        results: List[Dict[str, Any]] = []
+        with self._lock:
+            if query == "all":
+                if not device or not str(device).isdigit():
+                    return None
+                for entries in self._arp.values():
+                    results.extend(e for e in entries.values() if str(e.get("device_id")) == str(device))
+                return results
+            mac = normalize_mac(query)
+            if mac is not None:
+                for address in sorted(self._by_mac.get(mac, ())):
+                    results.extend(e for e in self._arp[address].values()
+                                   if normalize_mac(e.get("mac_address") or "") == mac)
+                return results
+            parsed = parse_prefix(query)
+            if parsed is None:
+                return None
+            version, key, length = parsed
+            if version != 4:
+                return None
+            for _, _, entries in self._hosts.within(key, length):
+                results.extend(entries.values())
+        return results
+
+    def network_lookup(self, query: str, limit: int = DEFAULT_NETWORK_LIMIT) -> Optional[Dict[str, Any]]:
+        """
+        Known networks around an address or CIDR: the longest match, every covering
+        network and the first `limit` networks inside it, in address order.
+        """
+        parsed = parse_prefix(query)
+        if parsed is None:
+            return None
+        version, key, length = parsed
+        tree = self._networks[version]
+
+        def records(found):
+            return [dict(record, network=_format_prefix(version, k, n)) for k, n, value in found for record in value]
+
+        with self._lock:
+            best = tree.longest_match(key, length)
+            contained = [p for p in tree.within(key, length) if p[1] > length]
+            return {
+                "longest_match": records([best])[0] if best else None,
+                "containing": records(tree.covering(key, length)),
+                "contained_count": sum(len(p[2]) for p in contained),
+                "contained": records(contained[:limit])
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "arp_addresses": len(self._arp),
+                "macs": len(self._by_mac),
+                "networks": sum(len(tree) for tree in self._networks.values()),
+                "age": round(self.age(), 1) if self.ready else None,
+                "last_change": self.last_change
+            }
+
+
+def lookup_networks(networks: List[Dict[str, Any]], query: str, limit: int = DEFAULT_NETWORK_LIMIT) -> Optional[Dict[str, Any]]:
+    """IPIndex.network_lookup over a network list fetched directly, when the shared index is off or not built."""
+    index = IPIndex(client_factory=None, refresh_interval=0)
+    index.apply_networks(networks)
+    return index.network_lookup(query, limit)
+
+
+_index: Optional[IPIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_ip_index() -> Optional[IPIndex]:
+    """
+    Return the process-wide IP index, refreshed in the background every IP_INDEX_REFRESH
+    seconds (default 300), or None when IP_INDEX_REFRESH is 0.
+    """
+    global _index
+    interval = float(os.environ.get('IP_INDEX_REFRESH', DEFAULT_REFRESH_INTERVAL))
+    if interval <= 0:
+        return None
+    with _index_lock:
+        if _index is None:
+            from tools.librenms_client import get_librenms_client
+            _index = IPIndex(get_librenms_client, interval)
+            _index.start_refreshing()
+        return _index
@@ -1,33 +1,34 @@
 import requests
-import os
-import json
-from dotenv import load_dotenv
+from tools.librenms_client import get_librenms_client
+from tools.ip_index import get_ip_index
 
-# Load environment variables
-load_dotenv()
-
-def librenms_arp(query: str, device: str = None):
+def librenms_arp(query: str, device: str = None, refresh: bool = False):
     """
-    Retrieve ARP entries from LibreNMS.
-    :param query: CIDR network (e.g., 10.0.0.0/24) or 'all' for all entries
+    Retrieve ARP entries, answered from the local IP index when it is built.
+    :param query: IP address, CIDR network (e.g., 10.0.0.0/24), MAC address or 'all' for all entries
     :param device: Device hostname or ID, required if query is 'all'
+    :param refresh: Skip the local index and the response cache and query LibreNMS directly
     :return: Dictionary containing the ARP entries and metadata
     """
-    API_TOKEN = os.getenv('LIBRENMS_API_TOKEN')
-    BASE_URL = os.getenv('LIBRENMS_BASE_URL')
+    index = get_ip_index()
+    if index is not None and index.ready and not refresh:
+        entries = index.arp_lookup(query, device)
+        # Nothing found locally may just mean the entry is newer than the last snapshot
+        if entries:
+            return {
+                "status": "ok",
+                "source": "index",
+                "index_age": round(index.age(), 1),
+                "count": len(entries),
+                "arp": entries
+            }
 
-    headers = {
-        'X-Auth-Token': API_TOKEN,
-        'Content-Type': 'application/json'
-    }
+    client = get_librenms_client()
 
     try:
         if query == 'all' and device:
-            response = requests.get(f"{BASE_URL}/resources/ip/arp/all", headers=headers, params={'device': device})
-        else:
-            response = requests.get(f"{BASE_URL}/resources/ip/arp/{query}", headers=headers)
-        response.raise_for_status()
-        return response.json()
+            return client.get_json("resources/ip/arp/all", params={'device': device}, bypass_cache=refresh)
+        return client.get_json(f"resources/ip/arp/{query}", bypass_cache=refresh)
 
     except requests.RequestException as e:
         return {
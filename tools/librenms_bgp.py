@@ -1,15 +1,34 @@
-import os
+import time
 import requests
 import json
-from typing import Dict, Any, Optional
-from dotenv import load_dotenv
+from collections import Counter
+from typing import Dict, Any, Iterator, Optional
+from tools.librenms_client import get_librenms_client
+from tools.librenms_stream import get_cursor_store, cursor_key
 
-# Load environment variables from .env file
-load_dotenv()
+DEFAULT_SESSION_LIMIT = 100
+# Established times within this many seconds of the previous snapshot are the same session
+ESTABLISHED_DRIFT = 120
 
-# API configuration
-API_TOKEN = os.environ.get('LIBRENMS_API_TOKEN')
-BASE_URL = os.environ.get('LIBRENMS_BASE_URL')
+def iter_bgp_sessions(params: Dict[str, Any], established_within: Optional[int] = None,
+                      refresh: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield BGP sessions matching the server-side filters, keeping only sessions that are
+    down or were (re)established within `established_within` seconds when given.
+    """
+    # Served from the response cache when a recent copy of this query exists, unless refreshing
+    response = get_librenms_client().get_json("bgp", params=params, bypass_cache=refresh)
+    for session in response.get("bgp_sessions") or []:
+        if established_within is not None and str(session.get("bgpPeerState", "")).lower() == "established":
+            try:
+                if int(session.get("bgpPeerFsmEstablishedTime") or 0) > established_within:
+                    continue
+            except (TypeError, ValueError):
+                pass
+        yield session
+
+def _peer_key(session: Dict[str, Any]) -> str:
+    return f"{session.get('device_id')}|{session.get('bgpPeerIdentifier') or session.get('bgpPeerRemoteAddr')}"
 
 def librenms_bgp(
     hostname: Optional[str] = None,
@@ -20,39 +39,73 @@ def librenms_bgp(
     bgp_desc: Optional[str] = None,
     bgp_state: Optional[str] = None,
     local_address: Optional[str] = None,
-    remote_address: Optional[str] = None
+    remote_address: Optional[str] = None,
+    established_within: Optional[int] = None,
+    since_last: bool = False,
+    limit: Optional[int] = None,
+    refresh: bool = False
 ) -> Dict[str, Any]:
     """
     Retrieves BGP information from LibreNMS including detailed peering information, status and descriptions.
+    Sessions are counted per device and state; `established_within` keeps sessions that are down or flapped
+    in that many seconds, and `since_last` keeps only sessions that changed since this chat session's previous identical since_last query.
+    Set refresh to bypass the response cache and read live session state; since_last always reads live.
     """
-    api_token = os.environ.get('LIBRENMS_API_TOKEN')
-    base_url = os.environ.get('LIBRENMS_BASE_URL')
-
-    headers = {
-        'X-Auth-Token': api_token,
-        'Content-Type': 'application/json'
-    }
-    
     params = {
-        k: v for k, v in locals().items() 
-        if k in ['hostname', 'asn', 'remote_asn', 'bgp_adminstate', 'bgp_family', 
+        k: v for k, v in locals().items()
+        if k in ['hostname', 'asn', 'remote_asn', 'bgp_adminstate', 'bgp_family',
                  'bgp_desc', 'bgp_state', 'local_address', 'remote_address'] and v is not None
     }
 
     try:
-        response = requests.get(f"{BASE_URL}/bgp", headers=headers, params=params)
-        
-        # Print debug information
-        print(f"Request URL: {response.url}")
-        print(f"Request Headers: {headers}")
-        print(f"Response Status Code: {response.status_code}")
-        print(f"Response Headers: {response.headers}")
-        print(f"Response Content: {response.text[:500]}...")  # Print first 500 characters of response
-        
-        response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
-        
-        return response.json()
-    
+        by_device: Counter = Counter()
+        by_state: Counter = Counter()
+        sessions = []
+        total = 0
+        now = time.time()
+        # Approximate established epoch per peer, compared against the previous call's snapshot
+        # Kept per session and filter set, and only by since_last calls
+        cursor = cursor_key("bgp", dict(params, established_within=established_within))
+        previous = get_cursor_store().get(cursor) if since_last else None
+        snapshot = {}
+
+        # A cached copy could hide changes from the since_last comparison
+        for session in iter_bgp_sessions(params, established_within, refresh=refresh or since_last):
+            state = str(session.get("bgpPeerState", "unknown")).lower()
+            try:
+                established_at = int(now - int(session.get("bgpPeerFsmEstablishedTime") or 0))
+            except (TypeError, ValueError):
+                established_at = 0
+            key = _peer_key(session)
+            snapshot[key] = [state, established_at]
+            if previous is not None:
+                old = previous.get(key)
+                if old is not None and old[0] == state and abs(old[1] - established_at) <= ESTABLISHED_DRIFT:
+                    continue
+
+            total += 1
+            by_device[str(session.get("device_id"))] += 1
+            by_state[state] += 1
+            if len(sessions) < (limit or DEFAULT_SESSION_LIMIT):
+                sessions.append(session)
+
+        if since_last:
+            get_cursor_store().set(cursor, snapshot)
+
+        return {
+            "status": "ok",
+            "filters": dict(params, established_within=established_within, since_last=since_last),
+            "refreshed": refresh or since_last,
+            "count": total,
+            "returned": len(sessions),
+            "first_call": since_last and previous is None,
+            "summary": {
+                "by_device": dict(by_device.most_common()),
+                "by_state": dict(by_state.most_common())
+            },
+            "bgp_sessions": sessions
+        }
+
     except requests.RequestException as e:
         error_message = f"Failed to retrieve BGP sessions: {str(e)}"
         if hasattr(e, 'response') and e.response is not None:
@@ -67,4 +120,3 @@ if __name__ == "__main__":
         print(json.dumps(result, indent=2))
     except Exception as e:
         print(f"Error: {e}")
-        
\ No newline at end of file
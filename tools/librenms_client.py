@@ -0,0 +1,159 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from tools.response_cache import ResponseCache
+from tools import metrics
+
+# Load environment variables once for every LibreNMS tool
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 20
+
+# Connect time of the current thread's request, so TTFB can be reported without it
+_connect_time = threading.local()
+
+
+def _timed_connect(connect):
+    start = time.perf_counter()
+    try:
+        connect()
+    finally:
+        elapsed = time.perf_counter() - start
+        _connect_time.seconds = getattr(_connect_time, 'seconds', 0.0) + elapsed
+        metrics.record_phase("http_connect", elapsed)
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        _timed_connect(super().connect)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        # Includes the TLS handshake
+        _timed_connect(super().connect)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections report their connect time."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+
+class LibreNMSClient:
+    """
+    Keep-alive HTTP client for the LibreNMS API. One requests.Session is shared by all
+    tools so TCP and TLS connections are reused, idempotent GETs are retried with
+    exponential backoff and every request has a connect and read timeout.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str],
+        api_token: Optional[str],
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        cache: Optional[ResponseCache] = None
+    ):
+        self.base_url = (base_url or "").rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = cache if cache is not None else ResponseCache()
+        self.session = requests.Session()
+        self.session.headers.update({
+            'X-Auth-Token': api_token or "",
+            'Content-Type': 'application/json'
+        })
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            raise_on_status=False
+        )
+        adapter = _TimedHTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """
+        GET a path, recording time to the response headers (http_ttfb, less any new
+        connection's http_connect), body download time and payload bytes.
+        """
+        _connect_time.seconds = 0.0
+        start = time.perf_counter()
+        response = self.session.get(self.url(path), params=params, timeout=self.timeout, stream=True)
+        headers_at = time.perf_counter()
+        body = response.content
+        metrics.record_phase("http_ttfb", max(0.0, headers_at - start - _connect_time.seconds))
+        metrics.record_phase("http_download", time.perf_counter() - headers_at)
+        metrics.add_payload_bytes(len(body))
+        return response
+
+    def get_json(self, path: str, params: Optional[Dict[str, Any]] = None, bypass_cache: bool = False) -> Any:
+        """
+        GET a path and return the decoded JSON body, served from the response cache for
+        cacheable endpoints. Raises requests.HTTPError for 4xx/5xx responses, which are
+        never cached. Cached bodies are shared, so callers must not modify them in place.
+        """
+        def fetch():
+            response = self.get(path, params=params)
+            logger.debug(f"GET {response.url} -> {response.status_code}")
+            response.raise_for_status()
+            return response.json()
+
+        return self.cache.get_or_fetch(path, params, fetch, bypass=bypass_cache)
+
+    def close(self):
+        self.session.close()
+
+
+_client: Optional[LibreNMSClient] = None
+_client_lock = threading.Lock()
+
+
+def get_librenms_client() -> LibreNMSClient:
+    """Return the process-wide LibreNMS client, configured from the environment on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LibreNMSClient(
+                base_url=os.environ.get('LIBRENMS_BASE_URL'),
+                api_token=os.environ.get('LIBRENMS_API_TOKEN'),
+                connect_timeout=float(os.environ.get('LIBRENMS_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)),
+                read_timeout=float(os.environ.get('LIBRENMS_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)),
+                retries=int(os.environ.get('LIBRENMS_RETRIES', DEFAULT_RETRIES)),
+                # LIBRENMS_CACHE=0 turns response caching off entirely
+                cache=ResponseCache() if os.environ.get('LIBRENMS_CACHE', '1') != '0' else ResponseCache(policies={})
+            )
+        return _client
@@ -1,44 +1,27 @@
 import requests
-import os
-from dotenv import load_dotenv
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+from tools.librenms_client import get_librenms_client
+from tools.interface_index import get_interface_index
 
-def librenms_get_interface_info(device_id: int, interface_name: str) -> Dict[str, Any]:
-    # Load environment variables
-    load_dotenv()
+def librenms_get_interface_info(device_id: int, interface_name: str, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Look up one interface by name or alias and return its port information. Set refresh
+    to bypass the response cache and read the live port state.
+    """
+    client = get_librenms_client()
 
-    API_TOKEN = os.getenv('LIBRENMS_API_TOKEN')
-    BASE_URL = os.getenv('LIBRENMS_BASE_URL')
-
-    headers = {
-        'X-Auth-Token': API_TOKEN,
-        'Content-Type': 'application/json'
-    }
-
-    # Step 1: Search for the interface alias
-    search_url = f"{BASE_URL}/ports/search/device_id/{device_id}/"
+    # Step 1: Resolve the interface name or alias through the per-device index
     try:
-        search_response = requests.get(search_url, headers=headers)
-        search_response.raise_for_status()
-        search_result = search_response.json()
-        
-        # Find the port_id that matches the interface_name
-        port_id = None
-        for port in search_result.get('ports', []):
-            # Normalize interface names for comparison
-            if (port.get('ifName', '').lower().replace('/', '') == interface_name.lower().replace('/', '') or
-                port.get('ifAlias', '').lower().replace('/', '') == interface_name.lower().replace('/', '')):
-                port_id = port.get('port_id')
-                break
+        index = get_interface_index()
+        port_id = index.lookup(device_id, interface_name)
         
         if port_id is None:
-            return {"error": f"Interface {interface_name} not found on device {device_id}. Available interfaces: {[port['ifName'] + ' (' + port['ifAlias'] + ')' for port in search_result.get('ports', [])]}"}
+            return {"error": f"Interface {interface_name} not found on device {device_id}. Available interfaces: {index.device(device_id).available()}"}
         
         # Step 2: Retrieve port information
-        port_url = f"{BASE_URL}/ports/{port_id}"
-        port_response = requests.get(port_url, headers=headers)
-        port_response.raise_for_status()
-        port_info = port_response.json()
+        # Copy the cached body before annotating it
+        port_info = dict(client.get_json(f"ports/{port_id}", bypass_cache=refresh))
         
         # Add the matched interface name to the response for clarity
         port_info['matched_interface'] = interface_name
@@ -48,7 +31,40 @@ def librenms_get_interface_info(device_id: int, interface_name: str) -> Dict[str
     except requests.exceptions.RequestException as e:
         return {"error": f"An error occurred while fetching information: {str(e)}"}
 
+def librenms_get_interfaces_info(interfaces: List[Dict[str, Any]], refresh: bool = False) -> Dict[str, Any]:
+    """
+    Look up many interfaces across many devices in one call.
+    :param interfaces: List of {"device_id": ..., "interface_name": ...} lookups
+    :param refresh: Bypass the response cache for the port lookups
+    :return: Dictionary with one result per lookup, in the order requested
+    """
+    if not interfaces:
+        return {"error": "No interfaces specified"}
+
+    # Build each device index once before fanning out the per-port fetches
+    index = get_interface_index()
+    for device_id in {str(lookup.get('device_id')) for lookup in interfaces}:
+        try:
+            index.device(device_id)
+        except requests.exceptions.RequestException:
+            # Reported per interface by librenms_get_interface_info below
+            pass
+
+    with ThreadPoolExecutor(max_workers=min(len(interfaces), 8)) as executor:
+        results = list(executor.map(
+            lambda lookup: librenms_get_interface_info(lookup.get('device_id'), lookup.get('interface_name', ''), refresh),
+            interfaces
+        ))
+
+    return {
+        "count": len(results),
+        "results": [
+            {"device_id": lookup.get('device_id'), "interface_name": lookup.get('interface_name'), "info": result}
+            for lookup, result in zip(interfaces, results)
+        ]
+    }
+
 # Example usage
 if __name__ == "__main__":
     result = librenms_get_interface_info(device_id=3, interface_name="Ethernet0/0")
-    print(result)
\ No newline at end of file
+    print(result)
@@ -1,28 +1,35 @@
 import requests
-import os
-import json
-from dotenv import load_dotenv
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from tools.librenms_client import get_librenms_client
+from tools.ip_index import get_ip_index, lookup_networks, parse_prefix
 
-def librenms_list_networks() -> Dict[str, Any]:
-    # Load environment variables
-    load_dotenv()
-
-    API_TOKEN = os.getenv('LIBRENMS_API_TOKEN')
-    BASE_URL = os.getenv('LIBRENMS_BASE_URL')
-
-    headers = {
-        'X-Auth-Token': API_TOKEN,
-        'Content-Type': 'application/json'
-    }
-
-    url = f"{BASE_URL}/resources/ip/networks"
+def librenms_list_networks(refresh: bool = False, query: Optional[str] = None) -> Dict[str, Any]:
+    if query is not None:
+        if parse_prefix(query) is None:
+            return {"error": f"Invalid IP address or network: {query}"}
+        index = get_ip_index()
+        try:
+            if index is not None and refresh:
+                index.refresh()
+        except requests.exceptions.RequestException as e:
+            return {"error": f"An error occurred while fetching network data: {str(e)}"}
+        # The first build runs on the index's own thread; wait for it rather than start another
+        if index is not None and (index.ready or index.wait_ready()):
+            # Longest match plus every known network overlapping the query, from the local prefix trees
+            result = index.network_lookup(query)
+            return dict(result, status="ok", source="index", query=query,
+                        count=len(result["containing"]) + result["contained_count"])
 
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()  # Raise an exception for non-200 status codes
-        data = response.json()
-        
+        # Served from the response cache unless a refresh is requested
+        data = get_librenms_client().get_json("resources/ip/networks", bypass_cache=refresh)
+        if query is not None:
+            # No index to ask: apply the query to the full list here
+            networks = next((v for v in data.values() if isinstance(v, list)), []) if isinstance(data, dict) else data
+            result = lookup_networks(networks or [], query)
+            return dict(result, status="ok", source="librenms", query=query,
+                        count=len(result["containing"]) + result["contained_count"])
+
         # Return the whole response as the API doesn't have a specific 'networks' key
         return data
     except requests.exceptions.RequestException as e:
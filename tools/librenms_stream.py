@@ -0,0 +1,256 @@
+import os
+import re
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from tools import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 500
+# Upper bound on entries scanned by one tool call, whatever the filters
+DEFAULT_MAX_SCAN = 50000
+# Entries scanned, newest first, when a query has no start time or cursor
+DEFAULT_RECENT_SCAN = 1000
+DEFAULT_TOP_TEMPLATES = 25
+# since_last cursors kept, the least recently used are forgotten beyond this
+DEFAULT_MAX_CURSORS = 2000
+
+# Syslog severities, most severe first
+SEVERITIES = ["emerg", "alert", "crit", "err", "warning", "notice", "info", "debug"]
+SEVERITY_ALIASES = {
+    "emergency": "emerg", "panic": "emerg", "critical": "crit", "error": "err",
+    "warn": "warning", "informational": "info",
+}
+
+# Variable parts of a message, replaced in order so message templates group together
+TEMPLATE_RULES = [
+    (re.compile(r"\b[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\b|\b(?:[0-9a-fA-F]{2}[:-]){5}[0-9a-fA-F]{2}\b"), "<mac>"),
+    (re.compile(r"\b\d{1,2}:\d{2}:\d{2}(?:\.\d+)?\b"), "<time>"),
+    (re.compile(r"(?<![\w:])(?:[0-9a-fA-F]{0,4}:){2,7}[0-9a-fA-F]{0,4}(?:/\d+)?(?![\w:])"), "<ip6>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?\b"), "<ip>"),
+    (re.compile(r"\b(?:[A-Za-z][A-Za-z-]*?)(?:\d+/)+\d+(?:\.\d+)?\b"), "<if>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<hex>"),
+    # Not the severity inside a mnemonic such as %BGP-5-ADJCHANGE
+    (re.compile(r"(?<![\w-])\d+\b"), "<n>"),
+]
+
+
+def severity_level(value: Any) -> Optional[int]:
+    """Map a syslog severity name or number to 0 (emerg) .. 7 (debug)."""
+    if value is None or value == "":
+        return None
+    text = str(value).strip().lower()
+    if text.isdigit():
+        return min(int(text), len(SEVERITIES) - 1)
+    text = SEVERITY_ALIASES.get(text, text)
+    return SEVERITIES.index(text) if text in SEVERITIES else None
+
+
+def message_template(message: str) -> str:
+    """Replace addresses, interfaces and numbers so repeats of one event share a template."""
+    for pattern, placeholder in TEMPLATE_RULES:
+        message = pattern.sub(placeholder, message)
+    return " ".join(message.split())
+
+
+class SyslogFilter:
+    """
+    Client-side filter for syslog entries: at least `severity` (e.g. 'warning' keeps
+    warning and worse), a program from `programs` (case-insensitive), a message
+    matching the `pattern` regex and containing every word of `text`.
+    """
+
+    def __init__(self, severity: Optional[str] = None, programs: Optional[Iterable[str]] = None,
+                 pattern: Optional[str] = None, text: Optional[str] = None):
+        self.max_level = severity_level(severity)
+        if severity is not None and self.max_level is None:
+            raise ValueError(f"Unknown severity: {severity}")
+        self.programs = {p.strip().lower() for p in programs or [] if p.strip()}
+        self.pattern = re.compile(pattern, re.IGNORECASE) if pattern else None
+        self.text = text.strip() if text and text.strip() else None
+        self._words = [re.compile(r"\b" + re.escape(word), re.IGNORECASE) for word in (self.text or "").split()]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "severity": SEVERITIES[self.max_level] if self.max_level is not None else None,
+            "programs": sorted(self.programs) or None,
+            "pattern": self.pattern.pattern if self.pattern else None,
+            "text": self.text
+        }
+
+    def __call__(self, entry: Dict[str, Any]) -> bool:
+        if self.max_level is not None:
+            level = severity_level(entry.get("priority"))
+            if level is None:
+                level = severity_level(entry.get("level"))
+            if level is None or level > self.max_level:
+                return False
+        if self.programs and str(entry.get("program") or "").lower() not in self.programs:
+            return False
+        if self.pattern and not self.pattern.search(str(entry.get("msg") or "")):
+            return False
+        if self._words and not all(word.search(str(entry.get("msg") or "")) for word in self._words):
+            return False
+        return True
+
+
+def iter_syslog(
+    client,
+    hostname: Optional[str] = None,
+    from_time: Optional[Any] = None,
+    to_time: Optional[str] = None,
+    newest_first: bool = False,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    max_entries: int = DEFAULT_MAX_SCAN,
+    stats: Optional[Dict[str, int]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield syslog entries page by page using LibreNMS's start/limit paging, oldest
+    first unless `newest_first`. `from_time` may be a timestamp or a sequence id.
+    Stops after `max_entries` entries or a short page; pages/scanned counts are
+    written into `stats` if given.
+    """
+    path = "logs/syslog" + (f"/{hostname}" if hostname else "")
+    params: Dict[str, Any] = {"limit": page_size, "sortorder": "DESC" if newest_first else "ASC"}
+    if from_time is not None:
+        params["from"] = from_time
+    if to_time is not None:
+        params["to"] = to_time
+
+    stats = stats if stats is not None else {}
+    stats.setdefault("pages", 0)
+    stats.setdefault("scanned", 0)
+    start = 0
+    while stats["scanned"] < max_entries:
+        page = client.get_json(path, params=dict(params, start=start), bypass_cache=True)
+        logs = page.get("logs") or []
+        stats["pages"] += 1
+        remaining = max_entries - stats["scanned"]
+        for entry in logs[:remaining]:
+            stats["scanned"] += 1
+            yield entry
+        # A short page ends the log unless max_entries cut it first
+        if len(logs) < page_size and len(logs) <= remaining:
+            return
+        start += len(logs)
+    stats["capped"] = True
+
+
+class LogAggregator:
+    """Count entries per host, severity, program and message template, keeping the newest samples."""
+
+    def __init__(self, sample_size: int = 50, top_templates: int = DEFAULT_TOP_TEMPLATES):
+        self.sample_size = sample_size
+        self.top_templates = top_templates
+        self.count = 0
+        self.by_host: Counter = Counter()
+        self.by_severity: Counter = Counter()
+        self.by_program: Counter = Counter()
+        self.templates: Dict[str, Dict[str, Any]] = {}
+        self.samples: List[Dict[str, Any]] = []
+
+    def add(self, entry: Dict[str, Any]):
+        self.count += 1
+        host = str(entry.get("hostname") or entry.get("device_id") or "unknown")
+        self.by_host[host] += 1
+        self.by_severity[str(entry.get("priority") or entry.get("level") or "unknown")] += 1
+        self.by_program[str(entry.get("program") or "unknown")] += 1
+        template = message_template(str(entry.get("msg") or ""))
+        stats = self.templates.get(template)
+        if stats is None:
+            stats = self.templates[template] = {
+                "template": template, "count": 0, "hosts": set(),
+                "first": entry.get("timestamp"), "last": entry.get("timestamp"), "example": entry.get("msg")
+            }
+        stats["count"] += 1
+        stats["hosts"].add(host)
+        timestamp = entry.get("timestamp")
+        if timestamp:
+            stats["first"] = min(stats["first"] or timestamp, timestamp)
+            stats["last"] = max(stats["last"] or timestamp, timestamp)
+        self.samples.append(entry)
+        if len(self.samples) > self.sample_size * 2:
+            self._trim_samples()
+
+    def _trim_samples(self):
+        self.samples.sort(key=lambda e: (str(e.get("timestamp") or ""), e.get("seq") or 0), reverse=True)
+        del self.samples[self.sample_size:]
+
+    def summary(self) -> Dict[str, Any]:
+        self._trim_samples()
+        templates = sorted(self.templates.values(), key=lambda t: t["count"], reverse=True)
+        return {
+            "by_host": dict(self.by_host.most_common()),
+            "by_severity": dict(self.by_severity.most_common()),
+            "by_program": dict(self.by_program.most_common()),
+            "templates": [
+                dict(t, hosts=len(t["hosts"])) for t in templates[:self.top_templates]
+            ],
+            "distinct_templates": len(templates)
+        }
+
+
+def cursor_key(kind: str, query: Dict[str, Any]) -> str:
+    """
+    Key for a since_last cursor: the chat session making the tool call plus every
+    filter of the query, so no other session or filter set moves its baseline.
+    """
+    call = metrics.current_call()
+    session = call.session if call is not None and call.session else "-"
+    return f"{kind}:{session}:" + json.dumps(query, sort_keys=True, default=str)
+
+
+class CursorStore:
+    """
+    Per-query cursors kept between tool calls, e.g. the last syslog sequence id seen
+    by a session for a host and filter set (see cursor_key). Saved to
+    LIBRENMS_CURSOR_FILE when set so they survive restarts; only the `max_cursors`
+    most recently set are kept.
+    """
+
+    def __init__(self, file_path: Optional[str] = None, max_cursors: int = DEFAULT_MAX_CURSORS):
+        self.file_path = file_path
+        self.max_cursors = max_cursors
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, Any] = {}
+        if file_path and os.path.exists(file_path):
+            try:
+                with open(file_path, 'r') as file:
+                    self._cursors = json.load(file)
+            except Exception as e:
+                logger.error(f"Error loading cursors from {file_path}: {e}")
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._cursors.get(key)
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            # Re-inserted so the dict stays in least recently set order
+            self._cursors.pop(key, None)
+            self._cursors[key] = value
+            for old in list(self._cursors)[:max(0, len(self._cursors) - self.max_cursors)]:
+                del self._cursors[old]
+            if self.file_path:
+                try:
+                    with open(self.file_path, 'w') as file:
+                        json.dump(self._cursors, file)
+                except Exception as e:
+                    logger.error(f"Error saving cursors to {self.file_path}: {e}")
+
+
+_cursors: Optional[CursorStore] = None
+_cursors_lock = threading.Lock()
+
+
+def get_cursor_store() -> CursorStore:
+    """Return the process-wide cursor store, persisted to LIBRENMS_CURSOR_FILE if set."""
+    global _cursors
+    with _cursors_lock:
+        if _cursors is None:
+            _cursors = CursorStore(os.environ.get('LIBRENMS_CURSOR_FILE'))
+        return _cursors
@@ -1,58 +1,107 @@
+import re
 import requests
-import os
 import json
-from dotenv import load_dotenv
 import logging
+from datetime import datetime
 from typing import Dict, Any, Optional
-
-# Load environment variables
-load_dotenv()
+from tools.librenms_client import get_librenms_client
+from tools.librenms_stream import (
+    SyslogFilter, LogAggregator, iter_syslog, get_cursor_store, cursor_key, DEFAULT_MAX_SCAN, DEFAULT_RECENT_SCAN
+)
+from tools.syslog_store import get_syslog_store
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_SAMPLE_SIZE = 50
+
 def librenms_syslog(
     hostname: Optional[str] = None,
     limit: Optional[int] = None,
     from_time: Optional[str] = None,
-    to_time: Optional[str] = None
+    to_time: Optional[str] = None,
+    severity: Optional[str] = None,
+    program: Optional[str] = None,
+    pattern: Optional[str] = None,
+    text: Optional[str] = None,
+    since_last: bool = False
 ) -> Dict[str, Any]:
     """
-    Retrieve syslog entries from LibreNMS for all devices or a specific device.
+    Retrieve syslog entries from LibreNMS for all devices or a specific device, paging
+    through every entry in the window and aggregating the matches.
     :param hostname: Either the device's hostname or ID (optional)
-    :param limit: The maximum number of results to return (optional). Returns maximum 50 results if not specified.
+    :param limit: The maximum number of matching entries to return alongside the summary (optional). Returns maximum 50 entries if not specified.
     :param from_time: The start date and time or the event ID to search from (optional)
     :param to_time: The end date and time or the event ID to search to (optional)
-    :return: Dictionary containing the syslog entries and metadata
+    :param severity: Only keep entries at this severity or worse, e.g. 'warning' (optional)
+    :param program: Only keep entries from these programs, comma separated (optional)
+    :param pattern: Only keep entries whose message matches this regex (optional)
+    :param text: Only keep entries whose message contains all of these words (optional)
+    :param since_last: Only fetch entries newer than this session's previous since_last call with the same hostname and filters (optional)
+    :return: Dictionary with counts per host, severity, program and message template plus the newest matching entries
     """
-    API_TOKEN = os.getenv('LIBRENMS_API_TOKEN')
-    BASE_URL = os.getenv('LIBRENMS_BASE_URL')
-    headers = {
-        'X-Auth-Token': API_TOKEN,
-        'Content-Type': 'application/json'
-    }
-    
-    # Construct the URL based on whether hostname is provided
-    url = f"{BASE_URL}/logs/syslog"
-    if hostname:
-        url += f"/{hostname}"
+    try:
+        log_filter = SyslogFilter(severity, program.split(",") if program else None, pattern, text)
+    except (ValueError, re.error) as e:
+        return {
+            "status": "error",
+            "message": f"Invalid syslog filter: {str(e)}",
+            "logs": []
+        }
+
+    # The highest sequence id seen by this session's since_last calls for the same
+    # hostname and filters, so follow-up calls only fetch newer entries
+    cursors = get_cursor_store()
+    key = cursor_key("syslog", {"hostname": hostname, "to": to_time, "severity": severity,
+                                "program": program, "pattern": pattern, "text": text})
+    last_seq = cursors.get(key) if since_last else None
+    if last_seq is not None:
+        from_time = last_seq + 1
 
-    # Prepare query parameters
-    params = {}
-    if limit is not None:
-        params['limit'] = limit
-    if from_time is not None:
-        params['from'] = from_time
-    if to_time is not None:
-        params['to'] = to_time
+    # Without a start point scan the most recent entries only
+    newest_first = from_time is None
+    max_entries = DEFAULT_RECENT_SCAN if newest_first else DEFAULT_MAX_SCAN
 
+    aggregator = LogAggregator(sample_size=int(limit) if limit else DEFAULT_SAMPLE_SIZE)
+    scan: Dict[str, int] = {"pages": 0, "scanned": 0}
+    max_seq = last_seq
+    # Answer from the local index when one is configured, caught up and holds the whole window
+    store = get_syslog_store()
+    source = "local" if store is not None and store.covers(from_time) else "librenms"
+    stale = False
+    if source == "local":
+        try:
+            # Only the entries newer than the local copy are fetched, at most sync_max of them
+            store.sync(get_librenms_client())
+        except requests.RequestException as e:
+            logger.warning(f"Syslog tail fetch failed, answering from the local store: {str(e)}")
+            stale = True
+        synced_at = store.synced_at()
+        if synced_at is None:
+            # The tail was larger than one sync, LibreNMS has entries the store lacks
+            source = "librenms"
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()  # Raises an HTTPError for bad responses
-        logger.info(f"Response status code: {response.status_code}")
-        logger.debug(f"Response body: {response.json()}")
-        return response.json()
+        if source == "local":
+            entries = store.query(hostname, from_time, to_time, max_level=log_filter.max_level,
+                                  programs=log_filter.programs, text=log_filter.text,
+                                  newest_first=newest_first, limit=max_entries + 1)
+        else:
+            entries = iter_syslog(get_librenms_client(), hostname, from_time, to_time,
+                                  newest_first=newest_first, max_entries=max_entries, stats=scan)
+        for entry in entries:
+            if source == "local":
+                if scan["scanned"] >= max_entries:
+                    scan["capped"] = True
+                    break
+                scan["scanned"] += 1
+            try:
+                seq = int(entry.get("seq"))
+                max_seq = seq if max_seq is None else max(max_seq, seq)
+            except (TypeError, ValueError):
+                pass
+            if log_filter(entry):
+                aggregator.add(entry)
     except requests.RequestException as e:
         error_message = f"Failed to retrieve syslog entries: {str(e)}"
         logger.error(error_message)
@@ -62,6 +111,34 @@ def librenms_syslog(
             "syslog": []
         }
 
+    if source == "local" and not scan.get("capped") and store.last_seq() is not None:
+        # Filters ran in SQL, so non-matching newer rows were never seen but are covered
+        max_seq = max(max_seq or 0, store.last_seq())
+    # Only the since_last query that owns the cursor moves it
+    if since_last and max_seq is not None and max_seq != last_seq:
+        cursors.set(key, max_seq)
+    logger.info(f"Scanned {scan['scanned']} syslog entries from {source} in {scan['pages']} pages, {aggregator.count} matched")
+
+    return {
+        "status": "ok",
+        "source": source,
+        # A local answer is complete up to synced_at; stale when the tail fetch just failed
+        **({"synced_at": datetime.fromtimestamp(synced_at).strftime("%Y-%m-%d %H:%M:%S"), "stale": stale}
+           if source == "local" else {}),
+        "hostname": hostname,
+        "from": from_time,
+        "to": to_time,
+        "filters": log_filter.describe(),
+        "scanned": scan["scanned"],
+        "pages": scan["pages"],
+        # More entries remain in the window, narrow it or call again with since_last
+        "capped": scan.get("capped", False),
+        "count": aggregator.count,
+        "last_seq": max_seq,
+        "summary": aggregator.summary(),
+        "logs": aggregator.samples
+    }
+
 # Test the function
 if __name__ == "__main__":
     try:
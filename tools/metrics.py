@@ -0,0 +1,360 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds, from a cached LibreNMS GET to a slow config push
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Finished tool calls and runs kept for the JSON trace and the sidebar panel
+DEFAULT_TRACE_LIMIT = 500
+METRIC_PREFIX = "network_assistant"
+
+# Phases recorded inside tool calls:
+#   ssh_connect    TCP connect to the router
+#   ssh_auth       SSH key exchange and password authentication
+#   ssh_exec       running the command and reading its output
+#   http_connect   TCP and TLS connect to LibreNMS, only for new pooled connections
+#   http_ttfb      request sent until response headers, less any connect
+#   http_download  reading the response body
+SSH_PHASES = ("ssh_connect", "ssh_auth", "ssh_exec")
+HTTP_PHASES = ("http_connect", "http_ttfb", "http_download")
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        separator = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class ToolCall:
+    """One tool invocation: wall time, seconds per phase, payload bytes in and output size out."""
+
+    def __init__(self, tool: str, session: Optional[str] = None):
+        self.tool = tool
+        self.session = session
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.seconds: Optional[float] = None
+        self.status = "ok"
+        self.phases: Dict[str, float] = {}
+        self.spans: Counter = Counter()
+        # Raw bytes read from routers and LibreNMS, before parsing and compaction
+        self.payload_bytes = 0
+        self.output_bytes = 0
+        self.output_tokens = 0
+        # Fan-out threads record phases concurrently
+        self._lock = threading.Lock()
+
+    def add_phase(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+            self.spans[phase] += 1
+
+    def add_bytes(self, count: int):
+        with self._lock:
+            self.payload_bytes += count
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tool": self.tool,
+                "session": self.session,
+                "started": round(self.started, 3),
+                "seconds": round(self.seconds, 4) if self.seconds is not None else None,
+                "status": self.status,
+                # Summed over every router or request, so phases may exceed the wall time
+                "phases": {phase: round(seconds, 4) for phase, seconds in self.phases.items()},
+                "spans": dict(self.spans),
+                "payload_bytes": self.payload_bytes,
+                "output_bytes": self.output_bytes,
+                "output_tokens": self.output_tokens
+            }
+
+
+class MetricsRecorder:
+    """
+    Process-wide latency and payload metrics: histograms and counters for Prometheus,
+    plus the most recent tool calls and assistant runs for the JSON trace.
+    """
+
+    def __init__(self, trace_limit: int = DEFAULT_TRACE_LIMIT, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._tool_seconds: Dict[str, Histogram] = {}
+        self._phase_seconds: Dict[Tuple[str, str], Histogram] = {}
+        self._run_seconds: Dict[str, Histogram] = {}
+        self._first_run_seconds: Dict[str, Histogram] = {}
+        self._calls: Counter = Counter()
+        self._payload_bytes: Counter = Counter()
+        self._output_bytes: Counter = Counter()
+        self._output_tokens: Counter = Counter()
+        self.tool_calls: deque = deque(maxlen=trace_limit)
+        self.runs: deque = deque(maxlen=trace_limit)
+        self.trace_limit = trace_limit
+        # Latest memory report per session, most recently updated last
+        self.session_memory: OrderedDict = OrderedDict()
+
+    def _histogram(self, table: Dict, key) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram(self.buckets)
+        return histogram
+
+    def observe_phase(self, tool: str, phase: str, seconds: float):
+        with self._lock:
+            self._histogram(self._phase_seconds, (tool, phase)).observe(seconds)
+
+    def finish_call(self, call: ToolCall):
+        with self._lock:
+            self._histogram(self._tool_seconds, call.tool).observe(call.seconds)
+            self._calls[(call.tool, call.status)] += 1
+            self._payload_bytes[call.tool] += call.payload_bytes
+            self._output_bytes[call.tool] += call.output_bytes
+            self._output_tokens[call.tool] += call.output_tokens
+            self.tool_calls.append(call.to_dict())
+
+    def record_run(self, run_metrics: Dict[str, Any], session: Optional[str] = None, status: Optional[str] = None,
+                   warmup: Optional[str] = None):
+        """
+        Record one assistant run from the metrics stream_run (or the polling loop) returns:
+        queued_seconds, time_to_first_token, total_seconds and per round tool_seconds
+        and model_seconds. For a session's first run, `warmup` is the state of the session
+        warm-up when the question was asked ('done', 'running', 'cancelled' or 'off'),
+        so first-answer latency can be compared with and without it.
+        """
+        rounds = run_metrics.get("tool_rounds") or []
+        phases = {
+            "queue": run_metrics.get("queued_seconds"),
+            "first_token": run_metrics.get("time_to_first_token"),
+            "tools": sum(r.get("tool_seconds") or 0 for r in rounds) if rounds else None,
+            "model_after_tools": sum(r.get("model_seconds") or 0 for r in rounds) if rounds else None,
+            "total": run_metrics.get("total_seconds")
+        }
+        with self._lock:
+            for phase, seconds in phases.items():
+                if seconds is not None:
+                    self._histogram(self._run_seconds, phase).observe(seconds)
+            if warmup is not None and phases["total"] is not None:
+                self._histogram(self._first_run_seconds, warmup).observe(phases["total"])
+            self.runs.append({
+                "session": session,
+                "finished": round(time.time(), 3),
+                "status": status,
+                "tool_rounds": len(rounds),
+                "phases": {phase: seconds for phase, seconds in phases.items() if seconds is not None},
+                "rounds": rounds,
+                "warmup": warmup
+            })
+
+    def record_session_memory(self, session: str, memory: Dict[str, Any]):
+        """Keep the latest memory report (SessionStore.memory()) of a session, for the last trace_limit sessions."""
+        with self._lock:
+            self.session_memory.pop(session, None)
+            self.session_memory[session] = dict(memory, updated=round(time.time(), 3))
+            while len(self.session_memory) > self.trace_limit:
+                self.session_memory.popitem(last=False)
+
+    def prometheus_text(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        name = METRIC_PREFIX
+        with self._lock:
+            lines = [f"# HELP {name}_tool_seconds Wall time of each tool call",
+                     f"# TYPE {name}_tool_seconds histogram"]
+            for tool, histogram in sorted(self._tool_seconds.items()):
+                lines += histogram.lines(f"{name}_tool_seconds", f'tool="{tool}"')
+            lines += [f"# HELP {name}_phase_seconds Time spent per SSH or HTTP phase, one observation per router or request",
+                      f"# TYPE {name}_phase_seconds histogram"]
+            for (tool, phase), histogram in sorted(self._phase_seconds.items()):
+                lines += histogram.lines(f"{name}_phase_seconds", f'tool="{tool}",phase="{phase}"')
+            lines += [f"# HELP {name}_run_phase_seconds Assistant run phases",
+                      f"# TYPE {name}_run_phase_seconds histogram"]
+            for phase, histogram in sorted(self._run_seconds.items()):
+                lines += histogram.lines(f"{name}_run_phase_seconds", f'phase="{phase}"')
+            lines += [f"# HELP {name}_first_run_seconds Total time of each session's first assistant run, by warm-up state",
+                      f"# TYPE {name}_first_run_seconds histogram"]
+            for warmup, histogram in sorted(self._first_run_seconds.items()):
+                lines += histogram.lines(f"{name}_first_run_seconds", f'warmup="{warmup}"')
+            lines += [f"# HELP {name}_tool_calls_total Tool calls by final status",
+                      f"# TYPE {name}_tool_calls_total counter"]
+            for (tool, status), count in sorted(self._calls.items()):
+                lines.append(f'{name}_tool_calls_total{{tool="{tool}",status="{status}"}} {count}')
+            for metric, help_text, counter in (
+                ("tool_payload_bytes_total", "Raw bytes read from routers and LibreNMS", self._payload_bytes),
+                ("tool_output_bytes_total", "Bytes of compacted tool output sent to the model", self._output_bytes),
+                ("tool_output_tokens_total", "Estimated tokens of tool output sent to the model", self._output_tokens),
+            ):
+                lines += [f"# HELP {name}_{metric} {help_text}", f"# TYPE {name}_{metric} counter"]
+                for tool, count in sorted(counter.items()):
+                    lines.append(f'{name}_{metric}{{tool="{tool}"}} {count}')
+            # Summed over the tracked sessions: a session label would add series without bound,
+            # the per-session figures stay in the JSON trace
+            lines += [f"# HELP {name}_session_memory_bytes Message and tool output text held by the recent sessions, in memory or spilled to disk",
+                      f"# TYPE {name}_session_memory_bytes gauge"]
+            for where, field in (("memory", "in_memory_bytes"), ("disk", "spilled_stored_bytes")):
+                total = sum(memory.get(field, 0) for memory in self.session_memory.values())
+                lines.append(f'{name}_session_memory_bytes{{where="{where}"}} {total}')
+            lines += [f"# HELP {name}_sessions_tracked Sessions with a memory report in the JSON trace",
+                      f"# TYPE {name}_sessions_tracked gauge",
+                      f"{name}_sessions_tracked {len(self.session_memory)}"]
+        return "\n".join(lines) + "\n"
+
+    def json_trace(self, session: Optional[str] = None) -> Dict[str, Any]:
+        """The recent tool calls and runs, optionally for one session only."""
+        with self._lock:
+            calls = [c for c in self.tool_calls if session is None or c["session"] == session]
+            runs = [r for r in self.runs if session is None or r["session"] == session]
+            memory = dict(self.session_memory) if session is None else self.session_memory.get(session)
+        return {"tool_calls": calls, "runs": runs, "session_memory": memory}
+
+    def summary(self, session: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-tool call count, p50/p95/max wall time and mean seconds per phase over the recent calls."""
+        by_tool: Dict[str, List[Dict[str, Any]]] = {}
+        for call in self.json_trace(session)["tool_calls"]:
+            by_tool.setdefault(call["tool"], []).append(call)
+        rows = []
+        for tool, calls in sorted(by_tool.items()):
+            seconds = sorted(c["seconds"] for c in calls)
+            row = {
+                "tool": tool,
+                "calls": len(calls),
+                "p50": seconds[len(seconds) // 2],
+                "p95": seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+                "max": seconds[-1],
+            }
+            for phase in SSH_PHASES + HTTP_PHASES:
+                total = sum(c["phases"].get(phase, 0.0) for c in calls)
+                if total:
+                    row[phase] = round(total / len(calls), 4)
+            row["kb_in"] = round(sum(c["payload_bytes"] for c in calls) / len(calls) / 1024, 1)
+            row["tokens_out"] = sum(c["output_tokens"] for c in calls) // len(calls)
+            rows.append(row)
+        return rows
+
+
+_current_call: contextvars.ContextVar = contextvars.ContextVar("tool_call", default=None)
+_recorder: Optional[MetricsRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRecorder:
+    """Return the process-wide metrics recorder."""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = MetricsRecorder(int(os.environ.get('METRICS_TRACE_LIMIT', DEFAULT_TRACE_LIMIT)))
+        return _recorder
+
+
+def current_call() -> Optional[ToolCall]:
+    return _current_call.get()
+
+
+@contextmanager
+def bind(call: Optional[ToolCall]) -> Iterator[Optional[ToolCall]]:
+    """Attribute phases recorded in this context (e.g. another thread or event loop) to `call`."""
+    token = _current_call.set(call)
+    try:
+        yield call
+    finally:
+        _current_call.reset(token)
+
+
+@contextmanager
+def tool_call(tool: str, session: Optional[str] = None) -> Iterator[ToolCall]:
+    """Time one tool call; phases and bytes recorded inside it are attributed to it."""
+    call = ToolCall(tool, session)
+    token = _current_call.set(call)
+    try:
+        yield call
+    except BaseException:
+        call.status = "error"
+        raise
+    finally:
+        _current_call.reset(token)
+        call.seconds = time.perf_counter() - call._start
+        get_metrics().finish_call(call)
+
+
+def record_phase(phase: str, seconds: float):
+    """Add `seconds` of `phase` to the current tool call, or to 'background' outside one."""
+    call = _current_call.get()
+    get_metrics().observe_phase(call.tool if call else "background", phase, seconds)
+    if call is not None:
+        call.add_phase(phase, seconds)
+
+
+@contextmanager
+def span(phase: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - start)
+
+
+def add_payload_bytes(count: int):
+    call = _current_call.get()
+    if call is not None:
+        call.add_bytes(count)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body, content_type = get_metrics().prometheus_text(), "text/plain; version=0.0.4"
+        elif self.path.split("?")[0] == "/trace.json":
+            body, content_type = json.dumps(get_metrics().json_trace()), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics (Prometheus text) and /trace.json from a daemon thread on
+    METRICS_PORT. Returns None when no port is configured.
+    """
+    port = port if port is not None else int(os.environ.get('METRICS_PORT', 0) or 0)
+    if not port:
+        return None
+    server = ThreadingHTTPServer((os.environ.get('METRICS_HOST', '127.0.0.1'), port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving metrics on port {port}")
+    return server
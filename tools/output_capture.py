@@ -0,0 +1,221 @@
+import os
+import time
+import codecs
+import socket
+import logging
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 65535
+# Output kept per router, anything beyond is dropped and the capture marked truncated
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+# Output held in memory before it spills to a temporary file
+DEFAULT_SPILL_BYTES = 256 * 1024
+# Characters of raw output returned in a tool result, well past what the compaction
+# token budget keeps; longer output is cut instead of built into one large string
+DEFAULT_RESULT_CHARS = 64 * 1024
+
+
+def channel_chunks(channel, chunk_size: int = CHUNK_SIZE, deadline: Optional[float] = None) -> Iterator[bytes]:
+    """
+    Yield raw chunks from a paramiko channel until the remote side closes it. With a
+    time.monotonic() `deadline`, raise socket.timeout once it passes, even while data
+    keeps trickling in.
+    """
+    while True:
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("Deadline passed while reading output")
+            channel.settimeout(remaining)
+        data = channel.recv(chunk_size)
+        if not data:
+            return
+        yield data
+
+
+def decode_chunks(chunks: Iterable[bytes], encoding: str = 'utf-8') -> Iterator[str]:
+    """Decode a byte stream incrementally, so multibyte characters split across chunks survive."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def split_lines(text_chunks: Iterable[str]) -> Iterator[str]:
+    """Yield complete lines, without line endings, from a stream of text chunks."""
+    partial = ""
+    for chunk in text_chunks:
+        lines = (partial + chunk).split("\n")
+        partial = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    if partial:
+        yield partial.rstrip("\r")
+
+
+class OutputCapture:
+    """
+    Bounded capture of one router's command output. Bytes are decoded incrementally,
+    held in memory up to `spill_bytes` and then spilled to a temporary file, and
+    dropped beyond `max_bytes`. Readers stream the captured text back with
+    iter_text() and iter_lines() instead of materialising one large string, and
+    head() returns at most `result_chars` of it for a tool result.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, spill_bytes: Optional[int] = None,
+                 spill_dir: Optional[str] = None, encoding: str = 'utf-8', result_chars: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('SSH_OUTPUT_MAX_BYTES', DEFAULT_MAX_BYTES))
+        if spill_bytes is None:
+            spill_bytes = int(os.environ.get('SSH_OUTPUT_SPILL_BYTES', DEFAULT_SPILL_BYTES))
+        if result_chars is None:
+            result_chars = int(os.environ.get('SSH_OUTPUT_RESULT_CHARS', DEFAULT_RESULT_CHARS))
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.result_chars = result_chars
+        self.spill_dir = spill_dir or os.environ.get('SSH_OUTPUT_SPILL_DIR')
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._chunks: List[str] = []
+        self._memory_bytes = 0
+        self._spill = None
+        self.bytes_received = 0
+        self.bytes_kept = 0
+        self.truncated = False
+
+    @property
+    def full(self) -> bool:
+        return self.bytes_kept >= self.max_bytes
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill is not None
+
+    def feed(self, data: bytes) -> str:
+        """
+        Add raw bytes and return them decoded. Bytes past the cap are still decoded and
+        returned, so interactive readers can keep watching for the prompt, but not kept.
+        """
+        self.bytes_received += len(data)
+        room = self.max_bytes - self.bytes_kept
+        if len(data) > room:
+            self.truncated = True
+            if room > 0:
+                self._write(self._decoder.decode(data[:room]))
+                self.bytes_kept += room
+            return data.decode('utf-8', errors='replace')
+        text = self._decoder.decode(data)
+        self.bytes_kept += len(data)
+        self._write(text)
+        return text
+
+    def write(self, text: str):
+        """Add text that was already decoded, applying the same cap."""
+        data = text.encode('utf-8')
+        self.bytes_received += len(data)
+        room = self.max_bytes - self.bytes_kept
+        if len(data) > room:
+            self.truncated = True
+            text = data[:max(room, 0)].decode('utf-8', errors='ignore')
+            data = text.encode('utf-8')
+        self.bytes_kept += len(data)
+        self._write(text)
+
+    def consume(self, chunks: Iterable[bytes]) -> 'OutputCapture':
+        """Feed every chunk, stopping early once the cap is reached."""
+        for chunk in chunks:
+            self.feed(chunk)
+            if self.full:
+                break
+        return self.finish()
+
+    def finish(self) -> 'OutputCapture':
+        if self.truncated:
+            # Drop a character cut in half by the cap rather than emit a replacement
+            self._decoder.reset()
+        self._write(self._decoder.decode(b'', final=True))
+        return self
+
+    def _write(self, text: str):
+        if not text:
+            return
+        if self._spill is not None:
+            self._spill.write(text)
+            return
+        self._chunks.append(text)
+        # Encoded size, so multibyte output spills at the same byte count as ASCII
+        self._memory_bytes += len(text) if text.isascii() else len(text.encode('utf-8'))
+        if self._memory_bytes > self.spill_bytes:
+            self._spill = tempfile.TemporaryFile(mode='w+', encoding='utf-8', dir=self.spill_dir)
+            self._spill.writelines(self._chunks)
+            self._chunks = []
+            self._memory_bytes = 0
+
+    def iter_text(self, chunk_chars: int = CHUNK_SIZE) -> Iterator[str]:
+        if self._spill is None:
+            yield from self._chunks
+            return
+        self._spill.flush()
+        self._spill.seek(0)
+        while True:
+            text = self._spill.read(chunk_chars)
+            if not text:
+                break
+            yield text
+        self._spill.seek(0, os.SEEK_END)
+
+    def iter_lines(self) -> Iterator[str]:
+        return split_lines(self.iter_text())
+
+    def text(self) -> str:
+        """The captured text, with a note appended when the cap cut it short."""
+        text = "".join(self.iter_text())
+        if self.truncated:
+            text += f"\n...[output truncated at {self.max_bytes} bytes]"
+        return text
+
+    def head(self, max_chars: Optional[int] = None) -> str:
+        """
+        At most `max_chars` (default result_chars) of the captured text, read from the
+        stream so only that much is ever built, with a note when anything was left out.
+        """
+        max_chars = self.result_chars if max_chars is None else max_chars
+        parts: List[str] = []
+        size = 0
+        for text in self.iter_text():
+            if size + len(text) > max_chars:
+                parts.append(text[:max_chars - size])
+                return "".join(parts) + (f"\n...[output cut at {max_chars} characters of {self.bytes_kept} bytes received; "
+                                         f"filter the command (e.g. '| include') for the rest]")
+            parts.append(text)
+            size += len(text)
+        text = "".join(parts)
+        if self.truncated:
+            text += f"\n...[output truncated at {self.max_bytes} bytes]"
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bytes_received": self.bytes_received,
+            "bytes_kept": self.bytes_kept,
+            "spilled": self.spilled,
+            "truncated": self.truncated
+        }
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._chunks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
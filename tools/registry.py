@@ -0,0 +1,125 @@
+import json
+import logging
+import importlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_DIR = Path(__file__).resolve().parent.parent / "openai_function_schemas"
+
+
+class ToolSpec:
+    def __init__(self, name: str, module: str, function: Optional[str] = None, takes_dict: bool = False):
+        self.name = name
+        self.module = module
+        self.function = function or name
+        # get_local_time takes the raw arguments dict instead of keyword arguments
+        self.takes_dict = takes_dict
+
+
+TOOLS = [
+    ToolSpec("get_local_time", "tools.get_local_time", takes_dict=True),
+    ToolSpec("librenms_bgp", "tools.librenms_bgp"),
+    ToolSpec("librenms_arp", "tools.librenms_arp"),
+    ToolSpec("librenms_get_device_info", "tools.librenms_get_device_info"),
+    ToolSpec("librenms_syslog", "tools.librenms_syslog"),
+    ToolSpec("librenms_list_networks", "tools.librenms_list_networks"),
+    ToolSpec("librenms_get_interface_info", "tools.librenms_get_interface_info"),
+    ToolSpec("librenms_get_interfaces_info", "tools.librenms_get_interface_info"),
+    ToolSpec("show_commands", "tools.show_commands"),
+    ToolSpec("config_commands", "tools.config_commands"),
+    ToolSpec("router_config", "tools.router_config"),
+]
+
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+
+def validate_arguments(schema: Dict[str, Any], value: Any, path: str = "arguments"):
+    """
+    Check tool arguments against the subset of JSON Schema used by the function
+    schemas: type, required, properties and array items. Raises ValueError.
+    """
+    expected = schema.get("type")
+    if expected in _JSON_TYPES:
+        # bool is a subclass of int in Python, so reject it for numeric types
+        if not isinstance(value, _JSON_TYPES[expected]) or (expected in ("integer", "number") and isinstance(value, bool)):
+            raise ValueError(f"{path} must be of type {expected}")
+    if expected == "object":
+        for key in schema.get("required", []):
+            if key not in value:
+                raise ValueError(f"Missing required parameter: {key}")
+        properties = schema.get("properties", {})
+        for key, item in value.items():
+            if key not in properties:
+                raise ValueError(f"Unexpected parameter: {key}")
+            validate_arguments(properties[key], item, key)
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            validate_arguments(schema["items"], item, f"{path}[{i}]")
+
+
+class ToolRegistry:
+    """
+    Maps tool names to handlers. Each tool module is imported the first time the tool
+    is called, so boto3, paramiko and requests are only loaded when actually needed.
+    """
+
+    def __init__(self, tools=TOOLS, schema_dir: Path = SCHEMA_DIR):
+        self.specs: Dict[str, ToolSpec] = {spec.name: spec for spec in tools}
+        self.schema_dir = schema_dir
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, Callable] = {}
+        self._schemas: Dict[str, Dict[str, Any]] = {}
+
+    def handler(self, tool_name: str) -> Callable:
+        handler = self._handlers.get(tool_name)
+        if handler is not None:
+            return handler
+        spec = self.specs.get(tool_name)
+        if spec is None:
+            raise ValueError(f"Unknown tool: {tool_name}")
+        with self._lock:
+            if tool_name not in self._handlers:
+                module = importlib.import_module(spec.module)
+                self._handlers[tool_name] = getattr(module, spec.function)
+                logger.info(f"Loaded tool {tool_name} from {spec.module}")
+        return self._handlers[tool_name]
+
+    def schema(self, tool_name: str) -> Optional[Dict[str, Any]]:
+        if tool_name not in self._schemas:
+            schema_file = self.schema_dir / tool_name
+            if not schema_file.exists():
+                return None
+            with open(schema_file, 'r') as file:
+                self._schemas[tool_name] = json.load(file)
+        return self._schemas[tool_name]
+
+    def call(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        handler = self.handler(tool_name)
+        schema = self.schema(tool_name)
+        if schema is not None:
+            validate_arguments(schema.get("parameters", {}), arguments)
+        if self.specs[tool_name].takes_dict:
+            return handler(arguments)
+        return handler(**arguments)
+
+
+_registry: Optional[ToolRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_tool_registry() -> ToolRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ToolRegistry()
+        return _registry
@@ -0,0 +1,140 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CachePolicy:
+    def __init__(self, ttl: float, max_entries: int = 128, stale_ttl: float = 0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # How long past `ttl` a stale entry may still be served while it is refreshed
+        self.stale_ttl = stale_ttl
+
+
+# Inventory-style endpoints that change on the order of minutes
+DEFAULT_POLICIES = {
+    "devices": CachePolicy(ttl=60, max_entries=256, stale_ttl=240),
+    "resources/ip/networks": CachePolicy(ttl=300, max_entries=8, stale_ttl=600),
+    "resources/ip/arp": CachePolicy(ttl=60, max_entries=256, stale_ttl=120),
+    "ports": CachePolicy(ttl=60, max_entries=512, stale_ttl=120),
+    "bgp": CachePolicy(ttl=30, max_entries=128, stale_ttl=60),
+}
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache for API responses, keyed by endpoint path and query params. Each
+    endpoint family has its own policy; entries past their TTL but inside the stale
+    window are served immediately while a background refresh fetches a new copy.
+    """
+
+    def __init__(self, policies: Optional[Dict[str, CachePolicy]] = None):
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, OrderedDict] = {}
+        self._refreshing = set()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def policy_for(self, path: str) -> Tuple[Optional[str], Optional[CachePolicy]]:
+        path = path.strip('/')
+        # Longest matching prefix wins, e.g. 'resources/ip/arp' over 'resources'
+        for endpoint in sorted(self.policies, key=len, reverse=True):
+            if path == endpoint or path.startswith(endpoint + '/'):
+                return endpoint, self.policies[endpoint]
+        return None, None
+
+    @staticmethod
+    def make_key(path: str, params: Optional[Dict[str, Any]] = None) -> Tuple:
+        return (path.strip('/'), tuple(sorted((params or {}).items())))
+
+    def _count(self, endpoint: str, stat: str):
+        counters = self._stats.setdefault(endpoint, {"hits": 0, "misses": 0, "stale": 0, "bypass": 0})
+        counters[stat] += 1
+
+    def _store(self, endpoint: str, policy: CachePolicy, key: Tuple, value: Any):
+        with self._lock:
+            entries = self._entries.setdefault(endpoint, OrderedDict())
+            entries[key] = (time.monotonic(), value)
+            entries.move_to_end(key)
+            while len(entries) > policy.max_entries:
+                entries.popitem(last=False)
+
+    def _refresh_in_background(self, endpoint: str, policy: CachePolicy, key: Tuple, fetch: Callable[[], Any]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(endpoint, policy, key, fetch())
+            except Exception as e:
+                logger.warning(f"Background refresh of {key[0]} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"cache-refresh-{endpoint}", daemon=True).start()
+
+    def get_or_fetch(self, path: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any], bypass: bool = False) -> Any:
+        endpoint, policy = self.policy_for(path)
+        if policy is None:
+            return fetch()
+
+        key = self.make_key(path, params)
+        if bypass:
+            with self._lock:
+                self._count(endpoint, "bypass")
+            value = fetch()
+            self._store(endpoint, policy, key, value)
+            return value
+
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(endpoint)
+            entry = entries.get(key) if entries else None
+            if entry is not None:
+                entries.move_to_end(key)
+                age = now - entry[0]
+                if age <= policy.ttl:
+                    self._count(endpoint, "hits")
+                    return entry[1]
+                if age <= policy.ttl + policy.stale_ttl:
+                    self._count(endpoint, "stale")
+                    stale_value = entry[1]
+                else:
+                    stale_value = None
+                    entry = None
+            if entry is None:
+                self._count(endpoint, "misses")
+
+        if entry is not None:
+            self._refresh_in_background(endpoint, policy, key, fetch)
+            return stale_value
+
+        value = fetch()
+        self._store(endpoint, policy, key, value)
+        return value
+
+    def invalidate(self, path: Optional[str] = None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            endpoint, _ = self.policy_for(path)
+            entries = self._entries.get(endpoint)
+            if entries:
+                for key in [k for k in entries if k[0] == path.strip('/')]:
+                    del entries[key]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            stats = {}
+            for endpoint, counters in self._stats.items():
+                stats[endpoint] = dict(counters)
+                stats[endpoint]["entries"] = len(self._entries.get(endpoint, {}))
+            return stats
@@ -0,0 +1,82 @@
+import logging
+from typing import Dict, Any, List, Optional
+from tools.inventory import get_inventory
+from tools.config_archive import get_config_archive, refresh_snapshots, select_sections
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("current", "changes", "history")
+
+
+def router_config(
+    routers: List[str],
+    action: str = "current",
+    since: Optional[str] = None,
+    include: Optional[str] = None,
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Answer running-config questions from the config archive.
+    :param routers: Router names, globs or inventory selectors
+    :param action: 'current' for the config, 'changes' for what changed since `since`, 'history' for the snapshots
+    :param since: Time ('2024-05-01 09:00'), age ('24h', '7d'), snapshot id or config hash prefix, for 'changes'
+    :param include: Only return config sections whose first line contains this text, e.g. 'interface Gi0/1' (optional)
+    :param refresh: Fetch the full running config even if the device reports no change since the last snapshot
+    :return: Dictionary with one result per router
+    """
+    try:
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action}. Use one of {', '.join(ACTIONS)}")
+        if action == "changes" and since is None:
+            raise ValueError("Missing required parameter for changes: since")
+
+        inventory = get_inventory()
+        devices = inventory.resolve(routers)
+        if not devices:
+            raise ValueError('None of the specified routers found in the loaded IPs')
+
+        archive = get_config_archive()
+        results: Dict[str, Any] = {}
+        if action == "history":
+            for name in devices:
+                results[name] = [dict(snapshot, hash=snapshot["hash"][:12]) for snapshot in archive.history(name)]
+            return {"status": "success", "action": action, "results": results}
+
+        # A marker-line check per router, full configs only move for routers that changed
+        refreshed = refresh_snapshots(devices, force=refresh, reason="router_config")
+        for name, state in refreshed.items():
+            if "error" in state:
+                latest = archive.latest(name)
+                if latest is None:
+                    results[name] = {"error": state["error"]}
+                    continue
+                # Unreachable, answer from the last snapshot and say so
+                state = {"snapshot": latest, "source": "archive", "stale": True, "error": state["error"]}
+            snapshot = state["snapshot"]
+            result = {k: v for k, v in state.items() if k != "snapshot"}
+            result.update(hash=snapshot["hash"][:12], taken_at=snapshot["taken_at"], checked_at=snapshot["checked_at"])
+            if action == "current":
+                result["config"] = select_sections(archive.config(snapshot["hash"]), include)
+            else:
+                diff = archive.diff(name, since)
+                if diff is None:
+                    # e.g. a snapshot id or hash prefix from another router
+                    results[name] = dict(result, error=f"No snapshot of {name} matches since={since}")
+                    continue
+                for change_side in ("from", "to"):
+                    diff[change_side] = {k: diff[change_side][k] for k in ("id", "taken_at", "reason")}
+                if include:
+                    # Top-level lines have no section, match them on their own text
+                    diff["changes"] = [c for c in diff["changes"]
+                                       if include.lower() in (c["section"] or " ".join(c["removed"] + c["added"])).lower()]
+                result.update(diff)
+            results[name] = result
+
+        return {"status": "success", "action": action, "results": results}
+    except Exception as e:
+        logger.error(f"Error in router_config: {str(e)}")
+        return {
+            "status": "error",
+            "message": str(e),
+            "routers": routers
+        }
@@ -0,0 +1,110 @@
+import re
+import time
+import codecs
+import logging
+from typing import Dict, Any, List, Optional, Pattern
+
+logger = logging.getLogger(__name__)
+
+# Generic prompts per platform, used until the device hostname is learned
+PROMPT_PATTERNS = {
+    "cisco_ios": r"[\w.\-@/:]+(\([\w.\-/]+\))?[>#]\s*$",
+    "cisco_nxos": r"[\w.\-@/:]+(\([\w.\-/]+\))?#\s*$",
+    "arista_eos": r"[\w.\-@/:]+(\([\w.\-/]+\))?[>#]\s*$",
+    "juniper_junos": r"[\w.\-]+@[\w.\-]+[>#%]\s*$",
+}
+DEFAULT_PLATFORM = "cisco_ios"
+
+# Pagers that need a keypress before the device continues
+PAGER_PATTERN = re.compile(r"(--\s?More\s?--|<--- More --->|Press any key to continue)\s*$", re.IGNORECASE)
+
+DEFAULT_COMMAND_TIMEOUT = 30
+POLL_INTERVAL = 0.02
+
+
+def prompt_pattern(platform: Optional[str] = None) -> Pattern:
+    return re.compile(PROMPT_PATTERNS.get(platform or DEFAULT_PLATFORM, PROMPT_PATTERNS[DEFAULT_PLATFORM]))
+
+
+def learned_prompt_pattern(prompt_line: str) -> Pattern:
+    """
+    Build a prompt regex from the prompt the device printed, e.g. 'R1#' also matches
+    'R1(config)#' and 'R1(config-if)#' once the session changes mode.
+    """
+    hostname = re.sub(r"(\(.*\))?[>#%$]\s*$", "", prompt_line.strip())
+    return re.compile(re.escape(hostname) + r"(\([\w.\-/]+\))?[>#%]\s*$")
+
+
+class ShellReader:
+    """
+    Read from a paramiko invoke_shell channel until the device prompt returns, instead
+    of sleeping for a fixed time after each command. Pagers are answered automatically
+    and every command gets its own deadline.
+
+    With a `capture` (tools.output_capture.OutputCapture) the session output goes into
+    the capture and only the last few chunks are kept for prompt detection, so long
+    outputs stay within the capture's memory and byte limits.
+    """
+
+    def __init__(self, channel, platform: Optional[str] = None, command_timeout: float = DEFAULT_COMMAND_TIMEOUT,
+                 capture=None):
+        self.channel = channel
+        self.command_timeout = command_timeout
+        self.prompt = prompt_pattern(platform)
+        self.capture = capture
+        self.timings: List[Dict[str, Any]] = []
+        # One decoder for the session so multibyte characters split across reads survive
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def _decode(self, data: bytes) -> str:
+        if self.capture is not None:
+            return self.capture.feed(data)
+        return self._decoder.decode(data)
+
+    def _result(self, buffer: List[str], timed_out: bool) -> Dict[str, Any]:
+        # With a capture the full output lives there, not in the returned dict
+        output = "" if self.capture is not None else "".join(buffer)
+        return {"output": output, "tail": self._tail(buffer), "timed_out": timed_out}
+
+    def _tail(self, buffer: List[str]) -> str:
+        # Only the last line can hold the prompt or a pager
+        tail = "".join(buffer[-4:])
+        return tail.rsplit("\n", 1)[-1].replace("\r", "")
+
+    def read_until_prompt(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        deadline = time.monotonic() + (timeout or self.command_timeout)
+        buffer: List[str] = []
+        while True:
+            if self.channel.recv_ready():
+                buffer.append(self._decode(self.channel.recv(65535)))
+                if self.capture is not None:
+                    del buffer[:-4]
+                tail = self._tail(buffer)
+                if PAGER_PATTERN.search(tail):
+                    self.channel.send(" ")
+                    continue
+                if self.prompt.search(tail):
+                    return self._result(buffer, False)
+            elif self.channel.exit_status_ready() or self.channel.closed:
+                return self._result(buffer, False)
+            elif time.monotonic() >= deadline:
+                return self._result(buffer, True)
+            else:
+                time.sleep(POLL_INTERVAL)
+
+    def wait_for_prompt(self) -> str:
+        """Consume the login banner and lock onto the device's actual prompt."""
+        result = self.read_until_prompt()
+        if not result["timed_out"]:
+            self.prompt = learned_prompt_pattern(result["tail"])
+        return result["output"]
+
+    def send_command(self, command: str, timeout: Optional[float] = None) -> str:
+        start = time.monotonic()
+        self.channel.send(command + '\n')
+        result = self.read_until_prompt(timeout)
+        elapsed = round(time.monotonic() - start, 3)
+        self.timings.append({"command": command, "seconds": elapsed, "timed_out": result["timed_out"]})
+        if result["timed_out"]:
+            logger.warning(f"Timed out after {elapsed}s waiting for prompt after '{command}'")
+        return result["output"]
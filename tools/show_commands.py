@@ -1,57 +1,44 @@
 import os
-import paramiko
-import json
+import time
+import socket
 import logging
-import boto3
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+from paramiko.ssh_exception import AuthenticationException
+from tools.ssh_pool import get_ssh_pool, ssh_backend
+from tools.credentials import get_credential_provider
+from tools.inventory import get_inventory
+from tools.fanout import get_fanout_scheduler
+from tools.cli_parsers import parse_command_output
+from tools.output_capture import OutputCapture, channel_chunks
+from tools.config_archive import get_config_archive, is_running_config_command
+from tools import metrics
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 load_dotenv()
 
-def get_secret(secret_name, region_name=os.environ.get('AWS_REGION_NAME')):
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
+# Seconds one command of a batch may take before its output is given up on
+DEFAULT_COMMAND_TIMEOUT = 60
+# A batch stops this long before the router's fan-out deadline (at most a tenth of it),
+# so the commands that finished are returned instead of a bare timeout
+DEADLINE_MARGIN = 5
 
+def show_commands(command=None, routers=None, raw=False, commands=None, archive_reason=None):
     try:
-        response = client.get_secret_value(SecretId=secret_name)
-        secret = response['SecretString']
-        return json.loads(secret)
-    except NoCredentialsError:
-        logger.error("Credentials not available")
-    except PartialCredentialsError:
-        logger.error("Incomplete credentials provided")
-    except Exception as e:
-        logger.error(f"Error retrieving secret: {e}")
-        return None
-
-def load_router_ips(file_path):
-    try:
-        with open(file_path, 'r') as file:
-            data = json.load(file)
-            return data["routers"]
-    except Exception as e:
-        logger.error(f"Error loading router IPs: {e}")
-        return {}
-
-def show_commands(command, routers):
-    try:
-        logger.info(f"Received command: {command}")
+        # An ordered batch runs over one session per router; a single command keeps the flat result shape
+        batch = commands is not None
+        command_list = list(dict.fromkeys(commands if batch else [command] if command else []))
+        logger.info(f"Received commands: {command_list}")
         logger.info(f"Routers to connect to: {routers}")
 
-        if not command:
-            raise ValueError('Missing required parameter: command')
+        if not command_list:
+            raise ValueError('Missing required parameter: command or commands')
         if not routers:
             raise ValueError('Missing required parameter: routers')
 
         secret_name = os.environ.get('AWS_SECRETS_NAME')
-        credentials = get_secret(secret_name)
+        credentials = get_credential_provider().get(secret_name)
         if not credentials:
             raise ValueError('Could not retrieve credentials from AWS Secrets Manager')
 
@@ -61,49 +48,146 @@ def show_commands(command, routers):
         if not username or not password:
             raise ValueError('Missing username or password in the retrieved credentials')
 
-        all_routers = load_router_ips('devices/routers.json')
-        if not all_routers:
+        # Router names, globs or selectors such as 'site:syd role:pe', resolved via the inventory
+        inventory = get_inventory()
+        routers_to_connect = inventory.resolve(routers)
+        if not routers_to_connect and not inventory.devices:
             raise ValueError('Could not load router IPs from file')
-
-        routers_to_connect = {router_name: all_routers[router_name] for router_name in routers if router_name in all_routers}
         if not routers_to_connect:
             raise ValueError('None of the specified routers found in the loaded IPs')
 
+        command_timeout = float(os.environ.get('SSH_COMMAND_TIMEOUT', DEFAULT_COMMAND_TIMEOUT))
+
+        def format_output(router_name, router_info, command, capture):
+            with capture:
+                logger.info(f"Output of '{command}' from router {router_info.get('management_ip')}: {capture.stats()}")
+                if is_running_config_command(command) and not capture.truncated:
+                    # Every complete running config fetched is archived, deduplicated by content;
+                    # store() refuses CLI errors such as '% Invalid input'
+                    try:
+                        get_config_archive().store(router_name, capture.text(), archive_reason or "show_commands")
+                    except Exception as e:
+                        logger.warning(f"Could not archive the running config of {router_name}: {str(e)}")
+                # Known show commands come back as compact column-oriented records, parsed
+                # line by line from the capture
+                if not raw:
+                    parsed = parse_command_output(command, capture, router_info.get('platform'))
+                    if parsed is not None:
+                        return parsed
+                return capture.head()
+
+        scheduler = get_fanout_scheduler()
+
         def execute_command(router_name, router_info):
+            outputs, timings = {}, {}
+            # The batch shares the scheduler's per-router deadline, the login included
+            device_timeout = scheduler.device_timeout
+            router_deadline = time.monotonic() + device_timeout - min(DEADLINE_MARGIN, device_timeout / 10)
             try:
                 management_ip = router_info.get('management_ip')
 
                 if not management_ip:
                     raise ValueError(f'Missing management_ip for router: {router_name}')
 
-                ssh = paramiko.SSHClient()
-                ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                
-                # Explicitly disable key-based authentication
-                ssh.connect(management_ip, username=username, password=password, allow_agent=False, look_for_keys=False)
-
-                stdin, stdout, stderr = ssh.exec_command(command)
-                command_output = stdout.read().decode('utf-8')
-                ssh.close()
-                logger.info(f"Command output for router {management_ip}: {command_output}")
-                return {router_name: command_output}
+                # Reuse an authenticated transport from the shared pool, one exec channel per command
+                with get_ssh_pool().connection(router_name, management_ip, username, password,
+                                               port=router_info.get('port', 22)) as ssh:
+                    for command in command_list:
+                        start = time.monotonic()
+                        budget = min(command_timeout, router_deadline - start)
+                        if budget <= 0:
+                            outputs[command] = f"Error: Not run, the router's {device_timeout:g} second deadline had passed"
+                            continue
+                        channel = None
+                        # Registered first so the finally below closes it whatever goes wrong
+                        capture = outputs[command] = OutputCapture()
+                        try:
+                            with metrics.span("ssh_exec"):
+                                stdin, stdout, stderr = ssh.exec_command(command, timeout=budget)
+                                channel = stdout.channel
+                                # Decode incrementally into a capped, spill-to-disk capture
+                                capture.consume(channel_chunks(channel, deadline=start + budget))
+                            metrics.add_payload_bytes(capture.bytes_received)
+                        except socket.timeout:
+                            # The batch carries on with the next command over the same transport
+                            capture.close()
+                            outputs[command] = f"Error: No complete output from '{command}' after {budget:g} seconds"
+                        finally:
+                            if channel is not None:
+                                # Stops the device streaming whatever is left past the cap or the deadline
+                                channel.close()
+                        timings[command] = round(time.monotonic() - start, 3)
+                # Parsed after the connection is back in the pool
+                return {
+                    "outputs": {command: format_output(router_name, router_info, command, output) if isinstance(output, OutputCapture) else output
+                                for command, output in outputs.items()},
+                    "timings": timings
+                }
+            except AuthenticationException as e:
+                # Cached credentials may have been rotated, fetch them again next call
+                get_credential_provider().invalidate(secret_name)
+                logger.error(f"Authentication failed on router {management_ip}: {str(e)}")
+                return {"error": f"Error: {str(e)}"}
             except Exception as e:
-                logger.error(f"Error executing command on router {management_ip}: {str(e)}")
-                return {router_name: f"Error: {str(e)}"}
-
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(execute_command, router_name, router_info) for router_name, router_info in routers_to_connect.items()]
-            results = [future.result() for future in futures]
-
-        combined_results = {}
-        for result in results:
-            combined_results.update(result)
-
+                logger.error(f"Error executing commands on router {management_ip}: {str(e)}")
+                return {"error": f"Error: {str(e)}"}
+            finally:
+                for output in outputs.values():
+                    if isinstance(output, OutputCapture):
+                        output.close()
+
+        router_results = {}
+        if ssh_backend() == 'asyncssh':
+            # Every router on one event loop, no thread per session
+            from tools.async_ssh import get_async_ssh_engine, is_auth_error
+            outputs = get_async_ssh_engine().show(routers_to_connect, command_list, username, password)
+            for router_name, output in outputs.items():
+                if isinstance(output, TimeoutError):
+                    router_results[router_name] = {"error": "Error: Timed out waiting for the router"}
+                elif isinstance(output, Exception):
+                    if is_auth_error(output):
+                        get_credential_provider().invalidate(secret_name)
+                    router_results[router_name] = {"error": f"Error: {str(output)}"}
+                else:
+                    router_results[router_name] = {
+                        "outputs": {
+                            command: f"Error: {str(result)}" if isinstance(result, Exception)
+                            else format_output(router_name, routers_to_connect[router_name], command, result)
+                            for command, result in output["outputs"].items()
+                        },
+                        "timings": output["timings"]
+                    }
+        else:
+            # Bounded fan-out, results arrive as each router finishes
+            router_results = dict(scheduler.run(
+                routers_to_connect,
+                execute_command,
+                on_timeout=lambda router_name: {"error": "Error: Timed out waiting for the router"}
+            ))
+
+        if not batch:
+            return {
+                "status": "success",
+                "command": command,
+                "routers": list(routers_to_connect.keys()),
+                "results": {
+                    router_name: result.get("error") or result["outputs"].get(command)
+                    for router_name, result in router_results.items()
+                }
+            }
         return {
             "status": "success",
-            "command": command,
+            "commands": command_list,
             "routers": list(routers_to_connect.keys()),
-            "results": combined_results
+            # {router: {command: output}}, a router that could not be reached maps to its error
+            "results": {
+                router_name: result.get("error") or result["outputs"]
+                for router_name, result in router_results.items()
+            },
+            "timings": {
+                router_name: result["timings"]
+                for router_name, result in router_results.items() if "timings" in result
+            }
         }
     except Exception as e:
         logger.error(f"Error in show_commands: {str(e)}")
@@ -111,5 +195,6 @@ def show_commands(command, routers):
             "status": "error",
             "message": str(e),
             "command": command,
+            "commands": commands,
             "routers": routers
         }
@@ -0,0 +1,198 @@
+import os
+import time
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+import paramiko
+
+from tools import metrics
+
+logger = logging.getLogger(__name__)
+
+# Defaults for the process-wide pool
+DEFAULT_IDLE_TIMEOUT = 300
+DEFAULT_MAX_PER_HOST = 4
+DEFAULT_CONNECT_TIMEOUT = 10
+# SSH_BACKEND selects this pool ('paramiko') or the asyncssh engine in tools/async_ssh.py
+DEFAULT_BACKEND = 'paramiko'
+
+
+def ssh_backend() -> str:
+    """The configured SSH backend, 'paramiko' or 'asyncssh'."""
+    return os.environ.get('SSH_BACKEND', DEFAULT_BACKEND).strip().lower()
+
+
+class _PooledConnection:
+    def __init__(self, client: paramiko.SSHClient):
+        self.client = client
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+    def is_alive(self) -> bool:
+        transport = self.client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            # Cheap keepalive to catch half-open sockets. Not send_ignore(), whose payload
+            # lacks a length prefix and makes strict servers drop the connection
+            transport.global_request("keepalive@openssh.com", wait=False)
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+class SSHConnectionPool:
+    """
+    Pool of authenticated paramiko connections keyed by router name and management IP.
+    Idle connections are reused across tool calls, health-checked before reuse and
+    evicted after `idle_timeout` seconds. At most `max_per_host` connections are in
+    use per router at any time.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        max_per_host: int = DEFAULT_MAX_PER_HOST,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    ):
+        self.idle_timeout = idle_timeout
+        self.max_per_host = max_per_host
+        self.connect_timeout = connect_timeout
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[str, str, str], List[_PooledConnection]] = {}
+        self._slots: Dict[Tuple[str, str, str], threading.BoundedSemaphore] = {}
+        self._stats = {"hits": 0, "misses": 0, "reconnects": 0, "evictions": 0, "errors": 0}
+
+    def _slot(self, key) -> threading.BoundedSemaphore:
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return self._slots[key]
+
+    def _connect(self, management_ip: str, username: str, password: str, port: int = 22) -> _PooledConnection:
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        # Dial separately so TCP connect and key exchange + authentication are timed apart
+        with metrics.span("ssh_connect"):
+            sock = socket.create_connection((management_ip, port), timeout=self.connect_timeout)
+        try:
+            with metrics.span("ssh_auth"):
+                # Explicitly disable key-based authentication
+                ssh.connect(management_ip, port=port, username=username, password=password, allow_agent=False,
+                            look_for_keys=False, timeout=self.connect_timeout, sock=sock)
+        except Exception:
+            ssh.close()
+            sock.close()
+            raise
+        return _PooledConnection(ssh)
+
+    def _checkout(self, key, management_ip: str, username: str, password: str, port: int) -> _PooledConnection:
+        self.evict_idle()
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                conn = idle.pop() if idle else None
+            if conn is None:
+                break
+            if conn.is_alive():
+                with self._lock:
+                    self._stats["hits"] += 1
+                return conn
+            # Dead transport, drop it and dial again
+            conn.close()
+            with self._lock:
+                self._stats["reconnects"] += 1
+            logger.info(f"Reconnecting dead SSH transport to {key[0]} ({management_ip})")
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return self._connect(management_ip, username, password, port)
+
+    def _checkin(self, key, conn: _PooledConnection):
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._idle.setdefault(key, []).append(conn)
+
+    @contextmanager
+    def connection(self, router_name: str, management_ip: str, username: str, password: str, port: int = 22):
+        """
+        Yield an authenticated paramiko.SSHClient for the router, returning it to the pool
+        afterwards. The connection is discarded if the caller raises.
+        """
+        key = (router_name, management_ip, username)
+        slot = self._slot(key)
+        slot.acquire()
+        conn = None
+        try:
+            conn = self._checkout(key, management_ip, username, password, port)
+            yield conn.client
+        except Exception:
+            if conn is not None:
+                conn.close()
+                conn = None
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(key, conn)
+            slot.release()
+
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, conns in self._idle.items():
+                keep = []
+                for conn in conns:
+                    if now - conn.last_used > self.idle_timeout:
+                        expired.append(conn)
+                    else:
+                        keep.append(conn)
+                self._idle[key] = keep
+            self._stats["evictions"] += len(expired)
+        for conn in expired:
+            conn.close()
+        return len(expired)
+
+    def discard(self, router_name: Optional[str] = None):
+        """Close idle connections for one router, or for every router if none is given."""
+        with self._lock:
+            keys = [k for k in self._idle if router_name is None or k[0] == router_name]
+            conns = [conn for k in keys for conn in self._idle.pop(k)]
+        for conn in conns:
+            conn.close()
+
+    def close_all(self):
+        self.discard()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle_connections"] = sum(len(conns) for conns in self._idle.values())
+        return stats
+
+
+_pool: Optional[SSHConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ssh_pool() -> SSHConnectionPool:
+    """Return the process-wide SSH connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SSHConnectionPool(
+                idle_timeout=float(os.environ.get('SSH_POOL_IDLE_TIMEOUT', DEFAULT_IDLE_TIMEOUT)),
+                max_per_host=int(os.environ.get('SSH_POOL_MAX_PER_HOST', DEFAULT_MAX_PER_HOST))
+            )
+        return _pool
@@ -0,0 +1,381 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from tools.librenms_stream import iter_syslog, severity_level
+
+logger = logging.getLogger(__name__)
+
+# Days of history fetched when the store is empty
+DEFAULT_BACKFILL_DAYS = 7
+# Minimum seconds between tail fetches triggered by queries
+DEFAULT_SYNC_INTERVAL = 5
+# Background tail interval, 0 disables the tailer
+DEFAULT_TAIL_INTERVAL = 60
+# Entries ingested by one sync, the rest follow on the next one
+DEFAULT_SYNC_MAX = 200000
+INSERT_BATCH = 1000
+# Windows longer than this are not split into per-day partitions
+MAX_PARTITION_DAYS = 92
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS syslog (
+    seq INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    device_id INTEGER,
+    hostname TEXT COLLATE NOCASE,
+    program TEXT COLLATE NOCASE,
+    facility TEXT,
+    priority TEXT,
+    level TEXT,
+    severity INTEGER,
+    msg TEXT
+);
+CREATE INDEX IF NOT EXISTS syslog_day_hostname ON syslog(day, hostname, timestamp);
+CREATE INDEX IF NOT EXISTS syslog_day_device ON syslog(day, device_id, timestamp);
+CREATE INDEX IF NOT EXISTS syslog_day_program ON syslog(day, program, timestamp);
+CREATE INDEX IF NOT EXISTS syslog_timestamp ON syslog(timestamp);
+CREATE VIRTUAL TABLE IF NOT EXISTS syslog_fts USING fts5(msg, content='syslog', content_rowid='seq');
+CREATE TRIGGER IF NOT EXISTS syslog_fts_insert AFTER INSERT ON syslog BEGIN
+    INSERT INTO syslog_fts(rowid, msg) VALUES (new.seq, new.msg);
+END;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+COLUMNS = ["seq", "device_id", "hostname", "program", "facility", "priority", "level", "timestamp", "msg"]
+
+
+def normalize_timestamp(value: Any) -> Optional[str]:
+    """Render an ISO date or date-time as 'YYYY-MM-DD HH:MM:SS' local time, the LibreNMS format."""
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return str(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.strftime(TIMESTAMP_FORMAT)
+
+
+def is_sequence_id(value: Any) -> bool:
+    return isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit())
+
+
+def fts_query(text: str) -> str:
+    """Quote each word so user text is never parsed as FTS5 syntax; all words must match."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class SyslogStore:
+    """
+    Append-only local copy of LibreNMS syslog in SQLite. Rows are keyed by the
+    LibreNMS sequence id, indexed per day partition by hostname, device and program,
+    and messages are full-text indexed with FTS5. sync() fetches only entries newer
+    than the highest sequence id already stored.
+
+    The store only answers queries once a sync has reached the end of LibreNMS's log
+    (caught_up). The initial backfill, and any catch-up after a sync stopped at
+    sync_max, run on the background tailer, never inside a tool call.
+    """
+
+    def __init__(self, path: str, backfill_days: float = DEFAULT_BACKFILL_DAYS,
+                 sync_interval: float = DEFAULT_SYNC_INTERVAL, sync_max: int = DEFAULT_SYNC_MAX):
+        self.path = path
+        self.backfill_days = backfill_days
+        self.sync_interval = sync_interval
+        self.sync_max = sync_max
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._tailer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.executescript(SCHEMA)
+        self._writer.commit()
+
+    def _reader(self) -> sqlite3.Connection:
+        # Readers get their own connection, WAL lets them run alongside ingest
+        return sqlite3.connect(self.path)
+
+    @staticmethod
+    def _meta(connection: sqlite3.Connection, key: str) -> Optional[str]:
+        row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def ingest(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Insert LibreNMS syslog entries, ignoring sequence ids already stored."""
+        inserted = 0
+        batch: List[tuple] = []
+
+        def flush():
+            nonlocal inserted
+            cursor = self._writer.executemany(
+                "INSERT OR IGNORE INTO syslog (seq, day, timestamp, device_id, hostname, program, facility, "
+                "priority, level, severity, msg) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch
+            )
+            self._writer.commit()
+            # Rows actually added, duplicates ignored and trigger writes not counted
+            inserted += cursor.rowcount
+            batch.clear()
+
+        with self._lock:
+            for entry in entries:
+                timestamp = str(entry.get("timestamp") or "")
+                severity = severity_level(entry.get("priority"))
+                if severity is None:
+                    severity = severity_level(entry.get("level"))
+                batch.append((
+                    int(entry["seq"]), timestamp[:10], timestamp, entry.get("device_id"), entry.get("hostname"),
+                    entry.get("program"), entry.get("facility"), entry.get("priority"), entry.get("level"),
+                    severity, entry.get("msg")
+                ))
+                if len(batch) >= INSERT_BATCH:
+                    flush()
+            if batch:
+                flush()
+        return inserted
+
+    def _set_meta(self, **values: Optional[str]):
+        with self._lock:
+            for key, value in values.items():
+                if value is None:
+                    self._writer.execute("DELETE FROM meta WHERE key = ?", (key,))
+                else:
+                    self._writer.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+            self._writer.commit()
+
+    def sync(self, client, force: bool = False) -> int:
+        """
+        Fetch entries newer than the highest stored sequence id, at most once per
+        sync_interval. A sync that gets to the end of the log records when it did
+        (synced_at); one that stops at sync_max leaves the store not caught up.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return 0
+        self._last_sync = now
+        with self._lock:
+            last_seq = self._writer.execute("SELECT max(seq) FROM syslog").fetchone()[0]
+            if last_seq is None:
+                start = (datetime.now() - timedelta(days=self.backfill_days)).strftime(TIMESTAMP_FORMAT)
+                self._writer.execute("INSERT OR REPLACE INTO meta VALUES ('coverage_start', ?)", (start,))
+                self._writer.commit()
+                from_time: Any = start
+            else:
+                from_time = last_seq + 1
+        started = time.perf_counter()
+        scan: Dict[str, int] = {}
+        synced_at = time.time()
+        inserted = self.ingest(iter_syslog(client, from_time=from_time, max_entries=self.sync_max, stats=scan))
+        if scan.get("capped"):
+            self._set_meta(synced_at=None)
+            logger.info(f"Syslog sync stopped after {scan['scanned']} entries, more remain")
+        else:
+            self._set_meta(synced_at=str(synced_at))
+        if inserted:
+            logger.info(f"Ingested {inserted} syslog entries in {time.perf_counter() - started:.2f}s")
+        return inserted
+
+    def catch_up(self, client) -> int:
+        """Sync until the store has reached the end of the log, e.g. the initial backfill."""
+        inserted = 0
+        while not self._stop.is_set():
+            added = self.sync(client, force=True)
+            inserted += added
+            if self.synced_at() is not None:
+                break
+            if not added:
+                # A full page of nothing new: the server is not honouring 'from', stop rather than spin
+                logger.warning("Syslog catch-up made no progress, retrying on the next tail")
+                break
+        return inserted
+
+    def synced_at(self) -> Optional[float]:
+        """When a sync last reached the end of the log, None while the store is behind."""
+        connection = self._reader()
+        try:
+            value = self._meta(connection, 'synced_at')
+        finally:
+            connection.close()
+        return float(value) if value is not None else None
+
+    def covers(self, from_time: Any) -> bool:
+        """
+        True when the store holds everything from `from_time` up to its last complete
+        sync. Only the tail since then is left for sync() to fetch.
+        """
+        connection = self._reader()
+        try:
+            start = self._meta(connection, 'coverage_start')
+            synced_at = self._meta(connection, 'synced_at')
+            first_seq = connection.execute("SELECT min(seq) FROM syslog").fetchone()[0]
+        finally:
+            connection.close()
+        # Still backfilling, or a sync stopped at sync_max and newer entries are missing
+        if start is None or synced_at is None:
+            return False
+        if from_time is None:
+            return True
+        if is_sequence_id(from_time):
+            return first_seq is not None and int(from_time) >= first_seq
+        return normalize_timestamp(from_time) >= start
+
+    def query(
+        self,
+        hostname: Optional[str] = None,
+        from_time: Any = None,
+        to_time: Any = None,
+        max_level: Optional[int] = None,
+        programs: Optional[Iterable[str]] = None,
+        text: Optional[str] = None,
+        newest_first: bool = False,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield stored entries in LibreNMS's shape, filtered in SQL."""
+        clauses, params = [], []
+        source = "syslog s"
+        if text:
+            source = "syslog_fts f JOIN syslog s ON s.seq = f.rowid"
+            clauses.append("syslog_fts MATCH ?")
+            params.append(fts_query(text))
+        if hostname:
+            if is_sequence_id(hostname):
+                clauses.append("s.device_id = ?")
+                params.append(int(hostname))
+            else:
+                clauses.append("s.hostname = ?")
+                params.append(hostname)
+
+        start = end = None
+        for bound, op in ((from_time, ">="), (to_time, "<=")):
+            if bound is None:
+                continue
+            if is_sequence_id(bound):
+                clauses.append(f"s.seq {op} ?")
+                params.append(int(bound))
+            else:
+                value = normalize_timestamp(bound)
+                clauses.append(f"s.timestamp {op} ?")
+                params.append(value)
+                if op == ">=":
+                    start = value
+                else:
+                    end = value
+        # Restrict to the day partitions in the window so the (day, ...) indexes seek directly
+        if start:
+            first = datetime.strptime(start[:10], "%Y-%m-%d")
+            last = datetime.strptime(end[:10], "%Y-%m-%d") if end else datetime.now()
+            days = (last - first).days + 1
+            if 0 < days <= MAX_PARTITION_DAYS:
+                partitions = [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+                clauses.append(f"s.day IN ({', '.join('?' * len(partitions))})")
+                params.extend(partitions)
+
+        if max_level is not None:
+            clauses.append("s.severity <= ?")
+            params.append(max_level)
+        programs = [p for p in programs or []]
+        if programs:
+            clauses.append(f"s.program IN ({', '.join('?' * len(programs))})")
+            params.extend(programs)
+
+        sql = f"SELECT {', '.join('s.' + c for c in COLUMNS)} FROM {source}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY s.seq {'DESC' if newest_first else 'ASC'}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        connection = self._reader()
+        try:
+            cursor = connection.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(INSERT_BATCH)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(COLUMNS, row))
+        finally:
+            connection.close()
+
+    def last_seq(self) -> Optional[int]:
+        connection = self._reader()
+        try:
+            return connection.execute("SELECT max(seq) FROM syslog").fetchone()[0]
+        finally:
+            connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        connection = self._reader()
+        try:
+            rows, first, last = connection.execute("SELECT count(*), min(timestamp), max(timestamp) FROM syslog").fetchone()
+            start = self._meta(connection, 'coverage_start')
+        finally:
+            connection.close()
+        return {"rows": rows, "first": first, "last": last, "coverage_start": start, "synced_at": self.synced_at(),
+                "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+    def start_tailing(self, client_factory, interval: float = DEFAULT_TAIL_INTERVAL):
+        """
+        Backfill and then keep the store current from a daemon thread, catching up
+        every `interval` seconds. With an interval of 0 only the backfill runs and
+        queries fetch the tail themselves.
+        """
+        if self._tailer is not None:
+            return
+
+        def tail():
+            while True:
+                try:
+                    self.catch_up(client_factory())
+                except Exception as e:
+                    logger.warning(f"Syslog tail failed: {e}")
+                if interval <= 0:
+                    # Retry a failed backfill, then leave the tail to queries
+                    if self.synced_at() is not None or self._stop.wait(DEFAULT_TAIL_INTERVAL):
+                        return
+                elif self._stop.wait(interval):
+                    return
+
+        self._tailer = threading.Thread(target=tail, name="syslog-tail", daemon=True)
+        self._tailer.start()
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._writer.close()
+
+
+_store: Optional[SyslogStore] = None
+_store_lock = threading.Lock()
+
+
+def get_syslog_store() -> Optional[SyslogStore]:
+    """
+    Return the process-wide store when SYSLOG_STORE_PATH is set, otherwise None. The
+    background tailer runs every SYSLOG_TAIL_INTERVAL seconds (0 disables it).
+    """
+    global _store
+    path = os.environ.get('SYSLOG_STORE_PATH')
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            from tools.librenms_client import get_librenms_client
+            _store = SyslogStore(
+                path,
+                backfill_days=float(os.environ.get('SYSLOG_BACKFILL_DAYS', DEFAULT_BACKFILL_DAYS)),
+                sync_interval=float(os.environ.get('SYSLOG_SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL))
+            )
+            _store.start_tailing(get_librenms_client, float(os.environ.get('SYSLOG_TAIL_INTERVAL', DEFAULT_TAIL_INTERVAL)))
+        return _store
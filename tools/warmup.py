@@ -0,0 +1,261 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+from tools import metrics
+
+logger = logging.getLogger(__name__)
+
+# Run in this order, each step only needs the ones before it
+STEPS = ("tools", "credentials", "inventory", "librenms", "indexes", "ssh")
+# LibreNMS lists the first questions usually need, fetched into the response cache
+PREFETCH_PATHS = ("devices", "bgp", "resources/ip/networks")
+# Routers that get a pooled SSH connection: none unless WARMUP_SSH_ROUTERS selects some
+DEFAULT_SSH_LIMIT = 8
+DEFAULT_SSH_ROUTERS = ""
+
+
+class WarmupCancelled(Exception):
+    pass
+
+
+class Warmup:
+    """
+    Warm the process-wide clients, pools and caches from a daemon thread while a new
+    chat session shows its intro message: import the tool modules, fetch credentials,
+    load the inventory, open the LibreNMS session and prefetch the device, BGP and
+    network lists, start the local IP and syslog indexes and, when `ssh_routers` selects
+    any, open SSH connections to a few routers. Every step only fills shared caches, so a cancelled or failed
+    warm-up costs nothing but the work already done.
+
+    The warm-up stops between steps (and between routers) once cancel() is called or
+    `alive` returns False, e.g. when the browser session has gone away.
+    """
+
+    def __init__(
+        self,
+        session: Optional[str] = None,
+        alive: Optional[Callable[[], bool]] = None,
+        steps=STEPS,
+        ssh_routers: Optional[List[str]] = None,
+        ssh_limit: int = DEFAULT_SSH_LIMIT
+    ):
+        self.session = session
+        self.alive = alive
+        self.steps = tuple(steps)
+        self.ssh_routers = list(ssh_routers or [])
+        self.ssh_limit = ssh_limit
+        self.state = "pending"
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._cancel.is_set() and self.alive is not None:
+            try:
+                if not self.alive():
+                    self._cancel.set()
+            except Exception:
+                pass
+        return self._cancel.is_set()
+
+    def _check(self):
+        if self.cancelled:
+            raise WarmupCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def start(self) -> "Warmup":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name=f"warmup-{self.session}", daemon=True)
+            self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the warm-up to stop, returning False if it is still running after `timeout`."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state not in ("pending", "running")
+
+    def run(self):
+        self.state = "running"
+        self.started = time.time()
+        start = time.perf_counter()
+        # Recorded as a 'warmup' call with one phase per step, next to the session's tool calls
+        with metrics.tool_call("warmup", self.session) as call:
+            try:
+                for step in self.steps:
+                    self._check()
+                    step_start = time.perf_counter()
+                    try:
+                        detail = getattr(self, f"_warm_{step}")()
+                        self.results[step] = dict(detail or {}, status="ok")
+                    except WarmupCancelled:
+                        self.results[step] = {"status": "cancelled"}
+                        raise
+                    except Exception as e:
+                        logger.warning(f"Warm-up step {step} failed: {e}")
+                        self.results[step] = {"status": "error", "error": str(e)}
+                    seconds = time.perf_counter() - step_start
+                    self.results[step]["seconds"] = round(seconds, 3)
+                    metrics.record_phase(f"warmup_{step}", seconds)
+                self.state = "done"
+            except WarmupCancelled:
+                self.state = "cancelled"
+                call.status = "cancelled"
+            finally:
+                self.finished = time.time()
+        logger.info(f"Warm-up {self.state} in {time.perf_counter() - start:.3f}s: {self.results}")
+
+    def _warm_tools(self) -> Dict[str, Any]:
+        # Imports boto3, paramiko, asyncssh and requests ahead of the first tool call
+        from tools.registry import get_tool_registry
+        registry = get_tool_registry()
+        errors = {}
+        for tool_name in registry.specs:
+            self._check()
+            try:
+                registry.handler(tool_name)
+                registry.schema(tool_name)
+            except Exception as e:
+                # The tool fails the same way when called, the others are still worth loading
+                errors[tool_name] = str(e)
+        loaded = len(registry.specs) - len(errors)
+        return {"tools": loaded, "errors": errors} if errors else {"tools": loaded}
+
+    def _credentials(self) -> Optional[Dict[str, Any]]:
+        from tools.credentials import get_credential_provider
+        return get_credential_provider().get(os.environ.get('AWS_SECRETS_NAME'))
+
+    def _warm_credentials(self) -> Dict[str, Any]:
+        if not os.environ.get('AWS_SECRETS_NAME'):
+            return {"skipped": "AWS_SECRETS_NAME is not set"}
+        if not self._credentials():
+            raise ValueError("Could not retrieve credentials")
+        return {}
+
+    def _warm_inventory(self) -> Dict[str, Any]:
+        from tools.inventory import get_inventory
+        inventory = get_inventory()
+        inventory.load()
+        return {"devices": len(inventory.devices)}
+
+    def _warm_librenms(self) -> Dict[str, Any]:
+        if not os.environ.get('LIBRENMS_BASE_URL'):
+            return {"skipped": "LIBRENMS_BASE_URL is not set"}
+        from tools.librenms_client import get_librenms_client
+        client = get_librenms_client()
+        # Fetched in parallel over the shared keep-alive session, each into its cache entry
+        with ThreadPoolExecutor(max_workers=len(PREFETCH_PATHS), thread_name_prefix="warmup") as executor:
+            futures = {path: executor.submit(contextvars.copy_context().run, client.get_json, path)
+                       for path in PREFETCH_PATHS}
+        fetched, errors = [], {}
+        for path, future in futures.items():
+            try:
+                future.result()
+                fetched.append(path)
+            except Exception as e:
+                errors[path] = str(e)
+        if not fetched:
+            raise ValueError(f"Prefetch failed: {errors}")
+        return {"prefetched": fetched, "errors": errors} if errors else {"prefetched": fetched}
+
+    def _warm_indexes(self) -> Dict[str, Any]:
+        if not os.environ.get('LIBRENMS_BASE_URL'):
+            return {"skipped": "LIBRENMS_BASE_URL is not set"}
+        from tools.ip_index import get_ip_index
+        from tools.syslog_store import get_syslog_store
+        # Both build and then refresh themselves on their own daemon threads
+        return {"ip_index": get_ip_index() is not None, "syslog_store": get_syslog_store() is not None}
+
+    def _warm_ssh(self) -> Dict[str, Any]:
+        if not self.ssh_routers:
+            return {"skipped": "WARMUP_SSH_ROUTERS is not set"}
+        if self.ssh_limit <= 0:
+            return {"skipped": "WARMUP_SSH_LIMIT is 0"}
+        from tools.inventory import get_inventory
+        from tools.ssh_pool import ssh_backend, get_ssh_pool
+        credentials = self._credentials() or {}
+        username, password = credentials.get("username"), credentials.get("password")
+        if not username or not password:
+            return {"skipped": "No SSH credentials"}
+        matched = get_inventory().resolve(self.ssh_routers)
+        devices = {name: matched[name] for name in sorted(matched)[:self.ssh_limit]
+                   if matched[name].get('management_ip')}
+        if not devices:
+            return {"connected": 0}
+
+        if ssh_backend() == 'asyncssh':
+            from tools.async_ssh import get_async_ssh_engine
+            results = get_async_ssh_engine().connect(devices, username, password)
+        else:
+            from tools.fanout import get_fanout_scheduler
+            pool = get_ssh_pool()
+
+            def connect(router_name, router_info):
+                # Dial, authenticate and check the connection straight back in to the pool
+                with pool.connection(router_name, router_info['management_ip'], username, password,
+                                     port=router_info.get('port', 22)):
+                    return True
+
+            results = {}
+            # Closing the generator early leaves routers that have not started yet alone
+            for router_name, result in get_fanout_scheduler().run(devices, connect):
+                results[router_name] = result
+                self._check()
+        failed = {name: str(result) for name, result in results.items() if result is not True}
+        return {"connected": len(results) - len(failed), "failed": failed} if failed else {"connected": len(results)}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "session": self.session,
+            "state": self.state,
+            "seconds": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            "steps": self.results
+        }
+
+
+_warmups: Dict[str, Warmup] = {}
+_warmups_lock = threading.Lock()
+
+
+def start_warmup(session: str, alive: Optional[Callable[[], bool]] = None) -> Optional[Warmup]:
+    """
+    Start the warm-up for a new session, or return the one already running for it.
+    Returns None when WARMUP is 0. WARMUP_SSH_ROUTERS (comma separated inventory
+    selectors, default none) and WARMUP_SSH_LIMIT (default 8) pick the routers that
+    get an SSH connection, so no router is logged in to unless one is selected.
+    """
+    if os.environ.get('WARMUP', '1') == '0':
+        return None
+    with _warmups_lock:
+        # Only the latest warm-ups are kept for status, finished ones are dropped
+        for name in [name for name, warmup in _warmups.items() if warmup.state in ("done", "cancelled")]:
+            del _warmups[name]
+        warmup = _warmups.get(session)
+        if warmup is None:
+            selectors = [s.strip() for s in os.environ.get('WARMUP_SSH_ROUTERS', DEFAULT_SSH_ROUTERS).split(',') if s.strip()]
+            warmup = Warmup(
+                session,
+                alive=alive,
+                ssh_routers=selectors,
+                ssh_limit=int(os.environ.get('WARMUP_SSH_LIMIT', DEFAULT_SSH_LIMIT))
+            )
+            _warmups[session] = warmup.start()
+        return warmup
+
+
+def cancel_warmup(session: str):
+    """Stop a session's warm-up after its current step, e.g. when the session is restarted."""
+    with _warmups_lock:
+        warmup = _warmups.pop(session, None)
+    if warmup is not None:
+        warmup.cancel()